@@ -1,5 +1,16 @@
 import psycopg
+from psycopg.copy import QueuedLibpqWriter
+from psycopg_pool import ConnectionPool, PoolTimeout
 import os
+import sys
+import csv
+import json
+import math
+import time
+import shlex
+import random
+import argparse
+from itertools import accumulate, chain, groupby, islice
 
 # --- КОНФІГУРАЦІЯ БАЗИ ДАНИХ (ЗМІНІТЬ НА ВАШІ ДАНІ!) ---
 DB_NAME = os.environ.get('DB_NAME', 'wdb')
@@ -11,33 +22,90 @@ DB_PORT = os.environ.get('DB_PORT', '5432')
 # Рядок підключення у форматі URI
 CONN_STRING = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+# Консольному застосунку достатньо одного-двох з'єднань: вони перевикористовуються
+# між операціями меню замість нового підключення на кожну дію
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', '2'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '10'))
+
+_pool = None
+
+def get_pool():
+    """Повертає пул з'єднань, створюючи його при першому зверненні."""
+    global _pool
+    if _pool is None:
+        _pool = ConnectionPool(
+            CONN_STRING,
+            min_size=1,
+            max_size=DB_POOL_MAX_SIZE,
+            timeout=DB_POOL_TIMEOUT,
+            check=ConnectionPool.check_connection,
+            name=f"{DB_NAME}-grud",
+            open=True
+        )
+    return _pool
+
 def get_connection():
-    """Створює та повертає об'єкт підключення."""
+    """Бере з'єднання з пулу. Повертає None, якщо БД недоступна."""
     try:
-        conn = psycopg.connect(CONN_STRING)
-        return conn
-    except psycopg.OperationalError as e:
+        return get_pool().getconn()
+    except (PoolTimeout, psycopg.OperationalError) as e:
         print(f"Помилка підключення до бази даних: {e}")
         return None
 
+def release_connection(conn):
+    """Повертає з'єднання в пул. Незавершена транзакція відкочується."""
+    if conn is None:
+        return
+    try:
+        if not conn.closed and conn.info.transaction_status != psycopg.pq.TransactionStatus.IDLE:
+            conn.rollback()
+    except psycopg.Error:
+        pass
+    get_pool().putconn(conn)
+
+def close_pool():
+    """Закриває пул при завершенні роботи застосунку."""
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        _pool = None
+
 # =======================================================
 #                    ОПЕРАЦІЇ CRUD
 # =======================================================
 
+# SQL операцій спільний для меню та пакетного режиму (іменовані параметри)
+SQL_CREATE_HELPER = """
+    INSERT INTO public.helperinfo (admin_name, admin_rank, warnings_count) 
+    VALUES (%(admin_name)s, %(admin_rank)s, %(warnings_count)s) 
+    RETURNING helper_id;
+"""
+SQL_UPDATE_RANK = "UPDATE public.helperinfo SET admin_rank = %(admin_rank)s WHERE helper_id = %(helper_id)s;"
+SQL_ADD_WARNINGS = """
+    UPDATE public.helperinfo 
+    SET warnings_count = warnings_count + %(count)s 
+    WHERE helper_id = %(helper_id)s 
+    RETURNING warnings_count;
+"""
+# Використовуємо GREATEST(0, ...) для запобігання від'ємним значенням
+SQL_REMOVE_WARNINGS = """
+    UPDATE public.helperinfo 
+    SET warnings_count = GREATEST(0, warnings_count - %(count)s)
+    WHERE helper_id = %(helper_id)s 
+    RETURNING warnings_count;
+"""
+SQL_DELETE_HELPER = "DELETE FROM public.helperinfo WHERE helper_id = %(helper_id)s;"
+
 ## ➕ CREATE (Створення нового Helper)
 def create_helper(admin_name, admin_rank, warnings_count=0):
     """Додає нового помічника до таблиці helperinfo."""
-    sql = """
-    INSERT INTO public.helperinfo (admin_name, admin_rank, warnings_count) 
-    VALUES (%s, %s, %s) 
-    RETURNING helper_id;
-    """
     conn = get_connection()
     if conn is None: return
 
     try:
         with conn.cursor() as cur:
-            cur.execute(sql, (admin_name, admin_rank, warnings_count))
+            cur.execute(SQL_CREATE_HELPER, {'admin_name': admin_name, 'admin_rank': admin_rank,
+                                            'warnings_count': warnings_count})
             new_id = cur.fetchone()[0]
             conn.commit()  # Застосовуємо зміни
             print(f"✅ Успішно створено нового помічника: ID={new_id}, Ім'я={admin_name}")
@@ -45,7 +113,7 @@ def create_helper(admin_name, admin_rank, warnings_count=0):
         conn.rollback() # Відкочуємо зміни у разі помилки
         print(f"❌ Помилка створення помічника: {e}")
     finally:
-        conn.close()
+        release_connection(conn)
 
 ## 📖 READ (Читання всіх Helper-ів)
 def read_all_helpers():
@@ -72,18 +140,17 @@ def read_all_helpers():
     except Exception as e:
         print(f"❌ Помилка читання даних: {e}")
     finally:
-        conn.close()
+        release_connection(conn)
 
 ## ✏️ UPDATE (Оновлення Helper-а)
 def update_helper_rank(helper_id, new_rank):
     """Оновлює ранг помічника за його ID."""
-    sql = "UPDATE public.helperinfo SET admin_rank = %s WHERE helper_id = %s;"
     conn = get_connection()
     if conn is None: return
 
     try:
         with conn.cursor() as cur:
-            cur.execute(sql, (new_rank, helper_id))
+            cur.execute(SQL_UPDATE_RANK, {'admin_rank': new_rank, 'helper_id': helper_id})
             conn.commit()
             
             if cur.rowcount > 0:
@@ -94,23 +161,17 @@ def update_helper_rank(helper_id, new_rank):
         conn.rollback()
         print(f"❌ Помилка оновлення помічника: {e}")
     finally:
-        conn.close()
+        release_connection(conn)
 
 ## ⬆️ Видати попередження
 def add_warning_to_helper(helper_id, warnings_to_add=1):
     """Збільшує кількість попереджень помічника за його ID."""
-    sql = """
-    UPDATE public.helperinfo 
-    SET warnings_count = warnings_count + %s 
-    WHERE helper_id = %s 
-    RETURNING warnings_count;
-    """
     conn = get_connection()
     if conn is None: return
 
     try:
         with conn.cursor() as cur:
-            cur.execute(sql, (warnings_to_add, helper_id))
+            cur.execute(SQL_ADD_WARNINGS, {'count': warnings_to_add, 'helper_id': helper_id})
             conn.commit()
             
             if cur.rowcount > 0:
@@ -122,24 +183,17 @@ def add_warning_to_helper(helper_id, warnings_to_add=1):
         conn.rollback()
         print(f"❌ Помилка видачі попередження: {e}")
     finally:
-        conn.close()
+        release_connection(conn)
         
 ## ⬇️ Зняти попередження (НОВА ФУНКЦІЯ)
 def remove_warning_from_helper(helper_id, warnings_to_remove=1):
     """Зменшує кількість попереджень помічника за його ID, не дозволяючи опуститися нижче нуля."""
-    # Використовуємо GREATEST(0, ...) для запобігання від'ємним значенням
-    sql = """
-    UPDATE public.helperinfo 
-    SET warnings_count = GREATEST(0, warnings_count - %s)
-    WHERE helper_id = %s 
-    RETURNING warnings_count;
-    """
     conn = get_connection()
     if conn is None: return
 
     try:
         with conn.cursor() as cur:
-            cur.execute(sql, (warnings_to_remove, helper_id))
+            cur.execute(SQL_REMOVE_WARNINGS, {'count': warnings_to_remove, 'helper_id': helper_id})
             conn.commit()
             
             if cur.rowcount > 0:
@@ -151,19 +205,18 @@ def remove_warning_from_helper(helper_id, warnings_to_remove=1):
         conn.rollback()
         print(f"❌ Помилка зняття попередження: {e}")
     finally:
-        conn.close()
+        release_connection(conn)
 
 
 ## 🗑️ DELETE (Видалення Helper-а)
 def delete_helper(helper_id):
     """Видаляє помічника за його ID."""
-    sql = "DELETE FROM public.helperinfo WHERE helper_id = %s;"
     conn = get_connection()
     if conn is None: return
 
     try:
         with conn.cursor() as cur:
-            cur.execute(sql, (helper_id,))
+            cur.execute(SQL_DELETE_HELPER, {'helper_id': helper_id})
             conn.commit()
             
             if cur.rowcount > 0:
@@ -174,7 +227,484 @@ def delete_helper(helper_id):
         conn.rollback()
         print(f"❌ Помилка видалення помічника: {e}")
     finally:
-        conn.close()
+        release_connection(conn)
+
+
+# =======================================================
+#                   ПАКЕТНИЙ РЕЖИМ
+# =======================================================
+
+# Скільки команд виконувати в одній транзакції
+BATCH_CHUNK_SIZE = int(os.environ.get('BATCH_CHUNK_SIZE', '500'))
+
+# Команда -> (SQL, поля у порядку аргументів рядка: (назва, тип, значення за замовчуванням))
+# Поле без значення за замовчуванням (None) - обов'язкове
+BATCH_OPERATIONS = {
+    'create': (SQL_CREATE_HELPER, (('admin_name', str, None), ('admin_rank', str, None), ('warnings_count', int, 0))),
+    'rank': (SQL_UPDATE_RANK, (('helper_id', int, None), ('admin_rank', str, None))),
+    'warn': (SQL_ADD_WARNINGS, (('helper_id', int, None), ('count', int, 1))),
+    'unwarn': (SQL_REMOVE_WARNINGS, (('helper_id', int, None), ('count', int, 1))),
+    'delete': (SQL_DELETE_HELPER, (('helper_id', int, None),)),
+}
+
+def build_batch_command(op, values):
+    """
+    (op, {поле: значення}) -> (op, params) для BATCH_OPERATIONS.
+    ValueError з поясненням, якщо команда невідома чи аргументи некоректні.
+    """
+    op = (op or '').strip().lower()
+    if op not in BATCH_OPERATIONS:
+        raise ValueError(f"невідома команда '{op}' (доступні: {', '.join(BATCH_OPERATIONS)})")
+
+    params = {}
+    for name, kind, default in BATCH_OPERATIONS[op][1]:
+        value = values.get(name)
+        if value is None or (isinstance(value, str) and not value.strip()):
+            if default is None:
+                raise ValueError(f"{op}: не вказано {name}")
+            value = default
+        try:
+            value = kind(value.strip() if isinstance(value, str) else value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{op}: некоректне значення {name}='{value}'")
+        if kind is int and value < 0:
+            raise ValueError(f"{op}: {name} не може бути від'ємним")
+        if kind is str and not value:
+            raise ValueError(f"{op}: не вказано {name}")
+        params[name] = value
+    return op, params
+
+def parse_command_line(line):
+    """'warn 12 2' / 'create "Ім'я Прізвище" Moder' -> (op, {поле: значення})."""
+    parts = shlex.split(line, comments=True)
+    if not parts:
+        return None
+    op = parts[0].lower()
+    if op not in BATCH_OPERATIONS:
+        return op, {}
+    fields = BATCH_OPERATIONS[op][1]
+    if len(parts) - 1 > len(fields):
+        raise ValueError(f"{op}: забагато аргументів")
+    return op, {field[0]: value for field, value in zip(fields, parts[1:])}
+
+def iter_batch_commands(source, fmt):
+    """
+    Генератор (номер рядка, op, params, помилка) з файлу команд.
+    Формати: lines - одна команда на рядок ('warn 12 2', # - коментар);
+    json - масив об'єктів {"op": "warn", "helper_id": 12, "count": 2} або JSON Lines;
+    csv - заголовок op,helper_id,admin_name,admin_rank,warnings_count,count.
+    """
+    if fmt == 'csv':
+        for line_no, row in enumerate(csv.DictReader(source), start=2):
+            try:
+                yield (line_no,) + build_batch_command(row.get('op'), row) + (None,)
+            except ValueError as e:
+                yield line_no, None, None, str(e)
+        return
+
+    if fmt == 'json':
+        first = source.read(1)
+        while first.isspace():
+            first = source.read(1)
+        if first == '[':
+            # Масив цілком: номер рядка - порядковий номер об'єкта
+            items = enumerate(json.loads(first + source.read()), start=1)
+        else:
+            lines = chain([first + source.readline()], source)
+            items = ((line_no, json.loads(line)) for line_no, line in enumerate(lines, start=1) if line.strip())
+        for line_no, item in items:
+            try:
+                if not isinstance(item, dict):
+                    raise ValueError("очікується об'єкт з полем op")
+                yield (line_no,) + build_batch_command(item.get('op'), item) + (None,)
+            except ValueError as e:
+                yield line_no, None, None, str(e)
+        return
+
+    for line_no, line in enumerate(source, start=1):
+        try:
+            parsed = parse_command_line(line)
+            if parsed is None:
+                continue
+            yield (line_no,) + build_batch_command(*parsed) + (None,)
+        except ValueError as e:
+            yield line_no, None, None, str(e)
+
+def chunked(iterable, size):
+    """Розбиває потік на списки по size елементів, не читаючи весь вхід наперед."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def execute_batch_chunk(conn, chunk):
+    """
+    Виконує частину команд в одній транзакції. Послідовні однакові команди
+    відправляються одним executemany (у режимі pipeline, якщо його підтримує libpq).
+    Повертає кількість змінених рядків за видом команди.
+    """
+    affected = {}
+    with conn.transaction():
+        with conn.cursor() as cur:
+            for op, group in groupby(chunk, key=lambda command: command[1]):
+                cur.executemany(BATCH_OPERATIONS[op][0], [params for _, _, params in group])
+                affected[op] = affected.get(op, 0) + cur.rowcount
+    return affected
+
+def run_batch(commands, chunk_size=BATCH_CHUNK_SIZE, stop_on_error=False):
+    """
+    Виконує команди через одне з'єднання частинами по chunk_size у транзакції.
+    Якщо частина падає, її команди повторюються по одній, щоб застосувати
+    коректні і знайти помилкові. Повертає підсумок або None, якщо БД недоступна.
+    """
+    stats = {'commands': 0, 'executed': 0, 'affected': 0, 'not_found': 0,
+             'failed': 0, 'chunks': 0, 'by_op': {}}
+    conn = get_connection()
+    if conn is None: return None
+
+    started = time.perf_counter()
+    try:
+        for raw_chunk in chunked(commands, chunk_size):
+            chunk = []
+            for line_no, op, params, error in raw_chunk:
+                stats['commands'] += 1
+                if error is not None:
+                    stats['failed'] += 1
+                    print(f"❌ Рядок {line_no}: {error}")
+                    continue
+                chunk.append((line_no, op, params))
+            if stats['failed'] and stop_on_error:
+                break
+            if not chunk:
+                continue
+
+            stats['chunks'] += 1
+            try:
+                results = execute_batch_chunk(conn, chunk)
+            except psycopg.Error as e:
+                if stop_on_error:
+                    stats['failed'] += len(chunk)
+                    print(f"❌ Частину з рядків {chunk[0][0]}-{chunk[-1][0]} відкочено: {e}")
+                    break
+                results = {}
+                for line_no, op, params in chunk:
+                    try:
+                        for key, count in execute_batch_chunk(conn, [(line_no, op, params)]).items():
+                            results[key] = results.get(key, 0) + count
+                    except psycopg.Error as row_error:
+                        stats['failed'] += 1
+                        chunk = [command for command in chunk if command[0] != line_no]
+                        print(f"❌ Рядок {line_no} ({op}): {row_error}")
+
+            for op, count in results.items():
+                submitted = sum(1 for command in chunk if command[1] == op)
+                stats['by_op'][op] = stats['by_op'].get(op, 0) + submitted
+                stats['affected'] += count
+                # Оновлення/видалення неіснуючого ID не змінює жодного рядка
+                stats['not_found'] += max(0, submitted - count)
+            stats['executed'] += len(chunk)
+    finally:
+        release_connection(conn)
+
+    stats['elapsed'] = time.perf_counter() - started
+    return stats
+
+def print_batch_summary(stats):
+    elapsed = stats['elapsed']
+    rate = stats['executed'] / elapsed if elapsed > 0 else 0
+    print("\n===============================")
+    print("Підсумок пакетного виконання")
+    print("===============================")
+    print(f"Команд прочитано: {stats['commands']}, виконано: {stats['executed']}, з помилками: {stats['failed']}")
+    for op, count in sorted(stats['by_op'].items()):
+        print(f"  {op}: {count}")
+    print(f"Змінено рядків: {stats['affected']}, ID не знайдено: {stats['not_found']}")
+    print(f"Транзакцій: {stats['chunks']}, час: {elapsed:.3f} с, швидкість: {rate:.1f} команд/с")
+    print("===============================\n")
+
+def batch_main(args):
+    """Точка входу пакетного режиму: python grud.py batch [ФАЙЛ|-] [--format ...]."""
+    fmt = args.format
+    if fmt == 'auto':
+        extension = os.path.splitext(args.file)[1].lower()
+        fmt = {'.json': 'json', '.jsonl': 'json', '.csv': 'csv'}.get(extension, 'lines')
+
+    if args.file == '-':
+        source = sys.stdin
+    else:
+        source = open(args.file, 'r', encoding='utf-8-sig', newline='')
+
+    try:
+        stats = run_batch(iter_batch_commands(source, fmt), args.chunk_size, args.stop_on_error)
+    except json.JSONDecodeError as e:
+        print(f"❌ Некоректний JSON: {e}")
+        return 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        close_pool()
+
+    if stats is None:
+        return 1
+    print_batch_summary(stats)
+    return 1 if stats['failed'] else 0
+
+
+# =======================================================
+#               ГЕНЕРАЦІЯ ТЕСТОВИХ ДАНИХ
+# =======================================================
+
+# Рядки генеруються блоками: генератор кожного блоку ініціалізується з (seed, таблиця,
+# номер блоку), тому той самий seed дає ті самі рядки незалежно від того, чи таблиця
+# заповнюється за один запуск, чи дозаповнюється кількома
+GENERATE_BLOCK_SIZE = 10000
+
+# Розподіли значень: значення -> вага
+GENERATE_RANK_WEIGHTS = {'Moder': 50, 'Admin': 25, 'Curator': 12, 'Manager': 8, 'SuperAdmin': 5}
+GENERATE_WARNING_WEIGHTS = {0: 62, 1: 18, 2: 9, 3: 5, 4: 3, 5: 2, 6: 1}
+# Оцінка вирішення: переважно 4-5, кожен десятий тікет без оцінки (None)
+GENERATE_RATING_WEIGHTS = {None: 10, 1: 4, 2: 5, 3: 11, 4: 27, 5: 43}
+# Тікети без хендлера (time_spent = 0, без оцінки)
+GENERATE_UNASSIGNED_SHARE = 0.03
+# time_spent (хвилини) - логнормальний: медіана ~15 хв, довгий хвіст до 8 годин
+GENERATE_TIME_MU = 2.7
+GENERATE_TIME_SIGMA = 0.9
+GENERATE_TIME_MAX = 480
+# Нерівномірність (показник Ципфа): кілька хендлерів беруть більшість тікетів,
+# кілька користувачів пишуть найчастіше
+GENERATE_HANDLER_SKEW = 0.9
+GENERATE_SUBMITTER_SKEW = 0.8
+
+FIRST_NAMES_UK = ('Олександр', 'Андрій', 'Дмитро', 'Максим', 'Іван', 'Богдан', 'Тарас', 'Юрій', 'Назар',
+                  'Олена', 'Ірина', 'Марія', 'Анна', 'Софія', 'Дарина', 'Катерина', 'Вікторія', 'Євгенія')
+LAST_NAMES_UK = ('Коваленко', 'Шевченко', 'Бондаренко', 'Ткаченко', 'Кравченко', 'Олійник', 'Мельник',
+                 'Поліщук', 'Лисенко', 'Гончар', "Григор'єв", 'Савчук', 'Руденко', 'Мороз', 'Журавльов')
+FIRST_NAMES_EN = ('Alex', 'Max', 'Daniel', 'Mark', 'Leo', 'Victor', 'Oliver', 'Nick', 'Anna', 'Kate',
+                  'Sophie', 'Emily', 'Maria', 'Eva', 'Julia', 'Lina')
+LAST_NAMES_EN = ('Smith', 'Turner', 'Walker', 'Miller', 'Novak', 'Fisher', 'Carter', 'Brooks', 'Hayes',
+                 'Foster', 'Reed', 'Stone', 'Frost', 'Gray')
+NICK_WORDS_UK = ('котик', 'козак', 'вовк', 'зірка', 'тінь', 'лис', 'мрія', 'сонечко', 'дракон', 'сокіл')
+NICK_WORDS_EN = ('shadow', 'wolf', 'pixel', 'storm', 'ghost', 'dragon', 'nova', 'frost', 'raven', 'blaze')
+
+def cumulative_weights(weights):
+    """{значення: вага} -> (значення, накопичені ваги) для random.choices."""
+    return tuple(weights), list(accumulate(weights.values()))
+
+def lognormal_minute_weights(mu, sigma, max_minutes):
+    """
+    (хвилини 1..max_minutes, накопичені ймовірності) логнормального розподілу,
+    округленого до хвилини; усе, що довше max_minutes, потрапляє в останнє значення.
+    Вибір через random.choices у рази швидший за lognormvariate на кожен рядок.
+    """
+    def cdf(x):
+        return 0.5 * (1 + math.erf((math.log(x) - mu) / (sigma * math.sqrt(2))))
+    return tuple(range(1, max_minutes + 1)), [cdf(m + 0.5) for m in range(1, max_minutes)] + [1.0]
+
+def zipf_cumulative_weights(count, skew):
+    """Накопичені ваги 1/k^skew для k = 1..count (k-й елемент обирається у k^skew разів рідше за перший)."""
+    return list(accumulate(1.0 / k ** skew for k in range(1, count + 1)))
+
+def block_random(seed, table, block):
+    return random.Random(f"{seed}:{table}:{block}")
+
+def iter_row_blocks(seed, table, start, stop, make_block):
+    """
+    Рядки з номерами [start, stop) блоками по GENERATE_BLOCK_SIZE.
+    make_block(rng) завжди генерує повний блок, а зайве відкидається - так
+    рядок з певним номером не залежить від того, з якого номера почато.
+    """
+    first_block = start // GENERATE_BLOCK_SIZE
+    for block in range(first_block, (stop - 1) // GENERATE_BLOCK_SIZE + 1):
+        block_start = block * GENERATE_BLOCK_SIZE
+        lines = make_block(block_random(seed, table, block))
+        yield lines[max(0, start - block_start):stop - block_start]
+
+def make_person_name(rng):
+    if rng.random() < 0.55:
+        return f"{rng.choice(FIRST_NAMES_UK)} {rng.choice(LAST_NAMES_UK)}"
+    return f"{rng.choice(FIRST_NAMES_EN)} {rng.choice(LAST_NAMES_EN)}"
+
+def make_username(rng):
+    """Нікнейм кирилицею або латиницею: 'Олена_Мороз', 'вовк1998', 'kate.frost7'."""
+    if rng.random() < 0.5:
+        first_names, last_names, words = FIRST_NAMES_UK, LAST_NAMES_UK, NICK_WORDS_UK
+    else:
+        first_names, last_names, words = FIRST_NAMES_EN, LAST_NAMES_EN, NICK_WORDS_EN
+    style = rng.random()
+    if style < 0.4:
+        return f"{rng.choice(first_names)}_{rng.choice(last_names)}"
+    if style < 0.75:
+        return f"{rng.choice(words)}{rng.randint(1, 2010)}"
+    return f"{rng.choice(first_names).lower()}.{rng.choice(last_names).lower()}{rng.randint(1, 99)}"
+
+def helper_block_maker():
+    ranks, rank_weights = cumulative_weights(GENERATE_RANK_WEIGHTS)
+    warnings, warning_weights = cumulative_weights(GENERATE_WARNING_WEIGHTS)
+
+    def make_block(rng):
+        size = GENERATE_BLOCK_SIZE
+        block_ranks = rng.choices(ranks, cum_weights=rank_weights, k=size)
+        block_warnings = rng.choices(warnings, cum_weights=warning_weights, k=size)
+        # Рядки у текстовому форматі COPY: у згенерованих іменах немає табуляцій і зворотних скісних
+        return [f"{make_person_name(rng)}\t{rank}\t{count}\n"
+                for rank, count in zip(block_ranks, block_warnings)]
+    return make_block
+
+def ticket_block_maker(seed, helper_ids, users_count, handler_skew, submitter_skew):
+    # Хто з хендлерів "популярний" - випадкова перестановка, а не порядок ID
+    handlers = list(helper_ids)
+    random.Random(f"{seed}:handlers").shuffle(handlers)
+    handler_weights = zipf_cumulative_weights(len(handlers), handler_skew)
+
+    users_rng = random.Random(f"{seed}:users")
+    users = [make_username(users_rng) for _ in range(users_count)]
+    user_weights = zipf_cumulative_weights(len(users), submitter_skew)
+
+    ratings, rating_weights = cumulative_weights(GENERATE_RATING_WEIGHTS)
+    ratings = tuple('\\N' if rating is None else rating for rating in ratings)
+    minutes, minute_weights = lognormal_minute_weights(GENERATE_TIME_MU, GENERATE_TIME_SIGMA, GENERATE_TIME_MAX)
+
+    def make_block(rng):
+        size = GENERATE_BLOCK_SIZE
+        block_handlers = rng.choices(handlers, cum_weights=handler_weights, k=size)
+        block_users = rng.choices(users, cum_weights=user_weights, k=size)
+        block_minutes = rng.choices(minutes, cum_weights=minute_weights, k=size)
+        block_ratings = rng.choices(ratings, cum_weights=rating_weights, k=size)
+        unassigned = [rng.random() < GENERATE_UNASSIGNED_SHARE for _ in range(size)]
+        return [
+            f"{user}\t\\N\t0\t\\N\n" if no_handler else f"{user}\t{handler}\t{spent}\t{rating}\n"
+            for handler, user, spent, rating, no_handler
+            in zip(block_handlers, block_users, block_minutes, block_ratings, unassigned)
+        ]
+    return make_block
+
+def copy_row_blocks(cur, copy_sql, blocks):
+    """
+    COPY FROM STDIN готовими текстовими рядками. Повертає кількість рядків.
+    QueuedLibpqWriter надсилає дані з окремого потоку, тож наступний блок
+    генерується, поки сервер приймає попередній.
+    """
+    rows = 0
+    with cur.copy(copy_sql, writer=QueuedLibpqWriter(cur)) as copy:
+        for lines in blocks:
+            copy.write(''.join(lines))
+            rows += len(lines)
+    return rows
+
+def drop_ticket_foreign_keys(cur):
+    """
+    Знімає зовнішні ключі ticketinfo на час COPY: перевірка кожного рядка тригером
+    у кілька разів повільніша за саме завантаження. Повертає [(назва, визначення)].
+    DROP CONSTRAINT блокує ticketinfo і helperinfo до кінця транзакції, тож
+    помічника не можна видалити, поки тікети на нього завантажуються.
+    """
+    cur.execute("""
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = 'public.ticketinfo'::regclass AND contype = 'f';
+    """)
+    foreign_keys = cur.fetchall()
+    for name, _ in foreign_keys:
+        cur.execute(psycopg.sql.SQL("ALTER TABLE public.ticketinfo DROP CONSTRAINT {};")
+                    .format(psycopg.sql.Identifier(name)))
+    return foreign_keys
+
+def restore_foreign_keys(cur, foreign_keys):
+    """
+    Створює ключі знову з тим самим визначенням: NOT VALID лишається NOT VALID
+    (нові рядки посилаються лише на наявні helper_id), а перевірений ключ
+    перевіряється знову одним запитом по всій таблиці.
+    """
+    for name, definition in foreign_keys:
+        cur.execute(psycopg.sql.SQL("ALTER TABLE public.ticketinfo ADD CONSTRAINT {} {};")
+                    .format(psycopg.sql.Identifier(name), psycopg.sql.SQL(definition)))
+
+def generate_data(helpers, tickets, seed=42, handler_skew=GENERATE_HANDLER_SKEW,
+                  submitter_skew=GENERATE_SUBMITTER_SKEW, users=None, truncate=False, row_fk_checks=False):
+    """
+    Дозаповнює helperinfo до helpers рядків і ticketinfo до tickets рядків
+    синтетичними даними (COPY в одній транзакції), після чого виконує ANALYZE.
+    Хендлери тікетів обираються лише з наявних helper_id (зовнішній ключ
+    "HelperInfo.helper_id"); на час COPY ключ знімається і створюється знову,
+    row_fk_checks=True лишає перевірку кожного рядка (довше, але без блокування
+    helperinfo). truncate=True спершу очищає обидві таблиці.
+    Повертає підсумок або None, якщо БД недоступна.
+    """
+    stats = {'helpers': 0, 'tickets': 0, 'helpers_elapsed': 0.0, 'tickets_elapsed': 0.0}
+    conn = get_connection()
+    if conn is None: return None
+
+    started = time.perf_counter()
+    try:
+        with conn.transaction():
+            with conn.cursor() as cur:
+                if truncate:
+                    cur.execute("TRUNCATE public.ticketinfo, public.helperinfo RESTART IDENTITY;")
+
+                cur.execute("SELECT count(*) FROM public.helperinfo;")
+                have = cur.fetchone()[0]
+                if have < helpers:
+                    table_started = time.perf_counter()
+                    stats['helpers'] = copy_row_blocks(
+                        cur, "COPY public.helperinfo (admin_name, admin_rank, warnings_count) FROM STDIN",
+                        iter_row_blocks(seed, 'helperinfo', have, helpers, helper_block_maker())
+                    )
+                    stats['helpers_elapsed'] = time.perf_counter() - table_started
+
+                cur.execute("SELECT count(*) FROM public.ticketinfo;")
+                have = cur.fetchone()[0]
+                if have < tickets:
+                    table_started = time.perf_counter()
+                    foreign_keys = [] if row_fk_checks else drop_ticket_foreign_keys(cur)
+                    cur.execute("SELECT helper_id FROM public.helperinfo ORDER BY helper_id;")
+                    helper_ids = [row[0] for row in cur.fetchall()]
+                    if not helper_ids:
+                        raise ValueError("у helperinfo немає помічників - тікетам нема кого призначити (вкажіть --helpers)")
+                    make_block = ticket_block_maker(seed, helper_ids, users or max(100, tickets // 5),
+                                                    handler_skew, submitter_skew)
+                    stats['tickets'] = copy_row_blocks(
+                        cur, "COPY public.ticketinfo (submitter_username, handler_helper_id, time_spent, "
+                             "resolution_rating) FROM STDIN",
+                        iter_row_blocks(seed, 'ticketinfo', have, tickets, make_block)
+                    )
+                    restore_foreign_keys(cur, foreign_keys)
+                    stats['tickets_elapsed'] = time.perf_counter() - table_started
+
+                if stats['helpers'] or stats['tickets'] or truncate:
+                    cur.execute("ANALYZE public.helperinfo, public.ticketinfo;")
+    finally:
+        release_connection(conn)
+
+    stats['elapsed'] = time.perf_counter() - started
+    return stats
+
+def print_generate_summary(stats):
+    print("\n===============================")
+    print("Підсумок генерації даних")
+    print("===============================")
+    for table in ('helpers', 'tickets'):
+        rows, elapsed = stats[table], stats[f'{table}_elapsed']
+        rate = rows / elapsed if elapsed > 0 else 0
+        print(f"{table}: додано {rows} рядків за {elapsed:.3f} с ({rate:.0f} рядків/с)")
+    print(f"Загальний час (з ANALYZE): {stats['elapsed']:.3f} с")
+    print("===============================\n")
+
+def generate_main(args):
+    """Точка входу генератора: python grud.py generate --helpers N --tickets N [--seed S]."""
+    try:
+        stats = generate_data(args.helpers, args.tickets, args.seed, args.handler_skew,
+                              args.submitter_skew, args.users, args.truncate, args.row_fk_checks)
+    except (ValueError, psycopg.Error) as e:
+        print(f"❌ Помилка генерації даних (зміни відкочено): {e}")
+        return 1
+    finally:
+        close_pool()
+
+    if stats is None:
+        return 1
+    print_generate_summary(stats)
+    return 0
 
 
 # =======================================================
@@ -242,10 +772,53 @@ def main_menu():
             
         elif choice == '7':
             print("Завершення роботи застосунку.")
+            close_pool()
             break
             
         else:
             print("Невірна опція. Спробуйте ще раз.")
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Консольний CRUD для HelperInfo. Без аргументів запускається інтерактивне меню."
+    )
+    subparsers = parser.add_subparsers(dest='command')
+    batch = subparsers.add_parser('batch', help="виконати команди з файлу або stdin через одне з'єднання")
+    batch.add_argument('file', nargs='?', default='-', help="файл команд (- або без аргументу - stdin)")
+    batch.add_argument('--format', choices=('auto', 'lines', 'json', 'csv'), default='auto',
+                       help="формат команд (auto - за розширенням файлу, інакше lines)")
+    batch.add_argument('--chunk-size', type=int, default=BATCH_CHUNK_SIZE,
+                       help="кількість команд в одній транзакції")
+    batch.add_argument('--stop-on-error', action='store_true',
+                       help="зупинитися на першій помилці (частину з помилкою буде відкочено)")
+    generate = subparsers.add_parser('generate', help="заповнити helperinfo/ticketinfo синтетичними даними (COPY)")
+    generate.add_argument('--helpers', type=int, default=1000, help="скільки помічників має бути в таблиці")
+    generate.add_argument('--tickets', type=int, default=100000, help="скільки тікетів має бути в таблиці")
+    generate.add_argument('--seed', type=int, default=42, help="той самий seed дає ті самі дані")
+    generate.add_argument('--users', type=int, default=None,
+                          help="кількість різних авторів тікетів (за замовчуванням tickets/5)")
+    generate.add_argument('--handler-skew', type=float, default=GENERATE_HANDLER_SKEW,
+                          help="нерівномірність тікетів між хендлерами (0 - рівномірно)")
+    generate.add_argument('--submitter-skew', type=float, default=GENERATE_SUBMITTER_SKEW,
+                          help="нерівномірність тікетів між авторами (0 - рівномірно)")
+    generate.add_argument('--truncate', action='store_true',
+                          help="спершу очистити helperinfo і ticketinfo (ID починаються з 1)")
+    generate.add_argument('--row-fk-checks', action='store_true',
+                          help="не знімати зовнішній ключ на час COPY (повільніше, але helperinfo не блокується)")
+    args = parser.parse_args(argv)
+    if args.command == 'batch' and args.chunk_size < 1:
+        parser.error("--chunk-size має бути додатним")
+    if args.command == 'generate':
+        if args.helpers < 0 or args.tickets < 0 or (args.users is not None and args.users < 1):
+            parser.error("--helpers і --tickets не можуть бути від'ємними, --users - додатне")
+        if args.handler_skew < 0 or args.submitter_skew < 0:
+            parser.error("--handler-skew і --submitter-skew не можуть бути від'ємними")
+    return args
+
 if __name__ == "__main__":
+    args = parse_args()
+    if args.command == 'batch':
+        sys.exit(batch_main(args))
+    if args.command == 'generate':
+        sys.exit(generate_main(args))
     main_menu()
\ No newline at end of file
@@ -1,12 +1,36 @@
 import io 
 import csv
-from flask import Flask, render_template, request, redirect, url_for, session, send_from_directory, send_file, flash, jsonify
+import asyncio
+from flask import Flask, current_app, render_template, request, redirect, url_for, session, send_from_directory, send_file, flash, jsonify, Response, stream_with_context, make_response, g, has_request_context, got_request_exception
 import psycopg
+from psycopg_pool import ConnectionPool, PoolTimeout
 import os
+import re
+import json
+import base64
+import hashlib
+import threading
+import time
+import hmac
+import uuid
 from functools import wraps
-from werkzeug.security import generate_password_hash, check_password_hash
+import click
 import subprocess
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from xlsx_stream import stream_xlsx, iter_xlsx_rows, XLSX_MIMETYPE
+from audit_log import AuditLogWriter, query_log
+from cache import ResultCache
+from fragment_cache import FragmentCache
+from table_versions import TableVersionTracker
+from db_session import DbSession, UnitConnection
+from passwords import PasswordHasher, is_password_hash
+from async_db import AsyncReader
+from metrics import MetricsRegistry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from slow_queries import SlowQueryLog
+from werkzeug.http import is_resource_modified
+from datetime import timedelta
 
 # DB_NAME - назва бд, DB_USER - Логін DB_PASSWORD - Пароль, DB_HOST - IP хоста DB_PORT - Порт
 DB_NAME = os.environ.get('DB_NAME', 'wdb')
@@ -19,23 +43,188 @@ PG_DUMP_PATH = os.environ.get('PG_DUMP_PATH', 'I:/code/postgresql/bin/pg_dump.ex
 
 CONN_STRING = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+# Параметри пулу з'єднань: мін./макс. розмір, час простою та життя з'єднання (сек),
+# час очікування вільного з'єднання (сек)
+DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', '2'))
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', '10'))
+DB_POOL_MAX_IDLE = float(os.environ.get('DB_POOL_MAX_IDLE', '300'))
+DB_POOL_MAX_LIFETIME = float(os.environ.get('DB_POOL_MAX_LIFETIME', '1800'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '10'))
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+# Пул з'єднань з бд
+def get_pool():
+    """
+    Повертає спільний пул з'єднань поточного процесу.
+    Пул створюється при першому зверненні (і заново після fork), тому
+    кожен процес-воркер має власні з'єднання.
+    """
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                pool = ConnectionPool(
+                    CONN_STRING,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    max_idle=DB_POOL_MAX_IDLE,
+                    max_lifetime=DB_POOL_MAX_LIFETIME,
+                    timeout=DB_POOL_TIMEOUT,
+                    # Перевірка з'єднання (SELECT 1 без транзакції) при кожній видачі з пулу
+                    check=ConnectionPool.check_connection,
+                    name=f"{DB_NAME}-pool",
+                    open=False
+                )
+                # Не блокуємо старт застосунку, якщо БД ще недоступна
+                pool.open(wait=False)
+                _pool, _pool_pid = pool, pid
+    return _pool
+
 # Підключення до бд
-def get_connection():
-    """Створює та повертає об'єкт підключення."""
+def get_pool_connection():
+    """Бере окреме з'єднання з пулу. Повертає None, якщо вільного з'єднання немає або БД недоступна."""
     try:
-        conn = psycopg.connect(CONN_STRING)
-        return conn
-    except psycopg.OperationalError as e:
+        return get_pool().getconn()
+    except (PoolTimeout, psycopg.OperationalError) as e:
         # print(f"Помилка підключення до бази даних: {e}")
         return None
 
+def put_pool_connection(conn):
+    """Повертає з'єднання в пул. Незавершена транзакція відкочується."""
+    if conn is None:
+        return
+    try:
+        if not conn.closed and conn.info.transaction_status != psycopg.pq.TransactionStatus.IDLE:
+            conn.rollback()
+    except psycopg.Error:
+        # Зламане з'єднання пул сам закриє та замінить новим
+        pass
+    get_pool().putconn(conn)
+
+def close_pool():
+    """Закриває пул з'єднань поточного процесу (при завершенні воркера)."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.close()
+        _pool, _pool_pid = None, None
+
+def get_db_session():
+    """Одиниця роботи поточного запиту (див. db_session.py); створюється при першому зверненні."""
+    if 'db_session' not in g:
+        g.db_session = DbSession(
+            get_pool_connection, put_pool_connection,
+            on_statement=observe_statement if slow_query_log.enabled else None
+        )
+    return g.db_session
+
+def get_connection():
+    """
+    З'єднання для функції доступу до даних. Під час HTTP-запиту всі функції
+    працюють через одне з'єднання запиту, а зміни фіксуються один раз після
+    обробки запиту; поза запитом (CLI, фонові потоки) - окреме з'єднання з пулу.
+    """
+    if has_request_context():
+        return get_db_session().unit()
+    return get_pool_connection()
+
+def release_connection(conn):
+    """Завершує роботу функції із з'єднанням (з'єднання запиту лишається до кінця запиту)."""
+    if isinstance(conn, UnitConnection):
+        return
+    put_pool_connection(conn)
+
+def after_commit(callback, *args):
+    """
+    Виконує callback(*args) після фіксації змін запиту (запис у журнал, скидання
+    кешу), щоб вони не випереджали COMMIT і не виконувалися, якщо зміни відкочено.
+    Якщо незафіксованих змін немає - виконує одразу.
+    """
+    if has_request_context() and 'db_session' in g and g.db_session.in_transaction:
+        g.db_session.after_commit(callback, *args)
+    else:
+        callback(*args)
+
+def get_pool_stats():
+    """Повертає статистику пулу з'єднань (розмір, очікування, помилки тощо) для моніторингу."""
+    pool = get_pool()
+    stats = pool.get_stats()
+    stats.update({
+        'pool_name': pool.name,
+        'max_idle': DB_POOL_MAX_IDLE,
+        'max_lifetime': DB_POOL_MAX_LIFETIME,
+        'timeout': DB_POOL_TIMEOUT
+    })
+    if ASYNC_READS:
+        stats['async'] = async_reader.get_stats()
+    return stats
+
+# Асинхронний шлях читання (див. async_db.py): сторінки списків та API читають дані
+# через окремий пул AsyncConnectionPool; запис завжди йде синхронним пулом
+ASYNC_READS = os.environ.get('ASYNC_READS', '0') == '1'
+ASYNC_DB_POOL_MIN_SIZE = int(os.environ.get('ASYNC_DB_POOL_MIN_SIZE', '1'))
+ASYNC_DB_POOL_MAX_SIZE = int(os.environ.get('ASYNC_DB_POOL_MAX_SIZE', str(DB_POOL_MAX_SIZE)))
+
+# Метрики Prometheus (GET /metrics): при METRICS_ENABLED=0 хуки запитів не реєструються
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+# Токен для збирача метрик (Authorization: Bearer ...); без нього - лише сесія SuperAdmin
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+metrics = MetricsRegistry()
+
+# Журнал повільних запитів (slow_queries.py): поріг у мс (0 - вимкнено), частка
+# повільних SELECT, для яких знімається EXPLAIN (ANALYZE, BUFFERS), та ротація файлу
+SLOW_QUERY_LOG_PATH = os.environ.get('SLOW_QUERY_LOG_PATH', 'slow_queries.log')
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '500'))
+SLOW_QUERY_EXPLAIN_SAMPLE = float(os.environ.get('SLOW_QUERY_EXPLAIN_SAMPLE', '0.1'))
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.environ.get('SLOW_QUERY_EXPLAIN_INTERVAL', '300'))
+SLOW_QUERY_LOG_MAX_BYTES = int(os.environ.get('SLOW_QUERY_LOG_MAX_BYTES', str(5 * 1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = int(os.environ.get('SLOW_QUERY_LOG_BACKUPS', '3'))
+
+slow_query_log = SlowQueryLog(
+    SLOW_QUERY_LOG_PATH,
+    CONN_STRING,
+    threshold_ms=SLOW_QUERY_MS,
+    explain_sample=SLOW_QUERY_EXPLAIN_SAMPLE,
+    explain_interval=SLOW_QUERY_EXPLAIN_INTERVAL,
+    max_bytes=SLOW_QUERY_LOG_MAX_BYTES,
+    backup_count=SLOW_QUERY_LOG_BACKUPS
+)
+
+def observe_statement(sql, params, seconds):
+    """Передає виконану інструкцію в журнал повільних запитів з маршрутом поточного HTTP-запиту."""
+    slow_query_log.observe(sql, params, seconds, request.endpoint if has_request_context() else None)
+
+def record_async_query(sql, params, seconds):
+    """Додає запит асинхронного пулу до статистики БД поточного HTTP-запиту та журналу повільних."""
+    if has_request_context():
+        queries, db_seconds = g.get('async_db_stats', (0, 0.0))
+        g.async_db_stats = (queries + 1, db_seconds + seconds)
+    observe_statement(sql, params, seconds)
+
+async_reader = AsyncReader(
+    CONN_STRING,
+    min_size=ASYNC_DB_POOL_MIN_SIZE,
+    max_size=ASYNC_DB_POOL_MAX_SIZE,
+    max_idle=DB_POOL_MAX_IDLE,
+    max_lifetime=DB_POOL_MAX_LIFETIME,
+    timeout=DB_POOL_TIMEOUT,
+    name=f"{DB_NAME}-async-pool",
+    on_query=record_async_query if METRICS_ENABLED or slow_query_log.enabled else None
+)
+
 # Декоратор для перевірки авторизації
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if 'logged_in' not in session or not session.get('logged_in'):
             return redirect(url_for('login'))
-        return f(*args, **kwargs)
+        # ensure_sync: декоратор підходить і для async-маршрутів
+        return current_app.ensure_sync(f)(*args, **kwargs)
     return decorated_function
 
 def admin_required(required_rank):
@@ -61,7 +250,7 @@ def admin_required(required_rank):
                 # Можна перенаправити на головну сторінку або сторінку 403
                 return redirect(url_for('home'))
             
-            return f(*args, **kwargs)
+            return current_app.ensure_sync(f)(*args, **kwargs)
         return decorated_function
     return wrapper
 
@@ -98,59 +287,456 @@ def manager_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# Ієрархія рангів: ранг -> рівень (більший рівень може редагувати менший)
+RANK_HIERARCHY = {
+    'Moder': 1,
+    'Admin': 2,
+    'Curator': 3,
+    'Manager': 4,
+    'SuperAdmin': 5
+}
+
 def can_edit_rank(user_rank, target_rank):
     """Перевіряє, чи може користувач редагувати співробітника з вказаним рангом"""
-    rank_hierarchy = {
-        'Moder': 1,
-        'Admin': 2,
-        'Curator': 3,
-        'Manager': 4,
-        'SuperAdmin': 5
-    }
-    
-    user_level = rank_hierarchy.get(user_rank, 0)
-    target_level = rank_hierarchy.get(target_rank, 0)
+    user_level = RANK_HIERARCHY.get(user_rank, 0)
+    target_level = RANK_HIERARCHY.get(target_rank, 0)
     
     # Користувач може редагувати тільки співробітників з рівнем <= його рівню
     return target_level <= user_level
 
 # ==========================================================
-# Функцій для табліци HelperInfo
+# Кеш результатів сторінок зі списками (див. cache.py)
 # ==========================================================
 
-# --- ФУНКЦІЯ H1: Для отримання всіх помічників (для головної сторінки) ---
-def get_all_helpers(query=None, sort_by=None, sort_type='ASC', rank_filter=None):
-    """Повертає всіх помічників з таблиці helperinfo, з можливістю сортування та пошуку."""
-    
+# TTL у секундах (0 - кеш вимкнено) та максимальний обсяг кешу одного процесу
+RESULT_CACHE_TTL = float(os.environ.get('RESULT_CACHE_TTL', '30'))
+RESULT_CACHE_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+
+result_cache = ResultCache(max_bytes=RESULT_CACHE_MAX_BYTES, ttl=RESULT_CACHE_TTL)
+
+def page_loaded(page):
+    """Сторінку кешуємо лише якщо запит до БД успішний."""
+    return not page.get('failed')
+
+# Кеш відрендерених <tbody> сторінок зі списками (див. fragment_cache.py); 0 - вимкнено
+FRAGMENT_CACHE_MAX_BYTES = int(os.environ.get('FRAGMENT_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+
+fragment_cache = FragmentCache(max_bytes=FRAGMENT_CACHE_MAX_BYTES)
+
+def invalidate_cached(*tables):
+    """Скидає закешовані результати та відрендерені фрагменти, що залежать від таблиць."""
+    result_cache.invalidate(*tables)
+    fragment_cache.invalidate(*tables)
+
+def cached_tbody(template, tables, versions, key, cacheable=True, **context):
+    """
+    <tbody> сторінки списку з кешу фрагментів; при промаху рендерить шаблон фрагмента.
+    versions - версії таблиць, отримані ДО читання рядків (current_versions): дані,
+    змінені в іншому воркері, дають новий ключ. Без версій фрагмент не кешується.
+    key має однозначно визначати рядки сторінки за цих версій та все, від чого
+    залежить їх HTML (параметри запиту, токен сторінки, ранг користувача).
+    """
+    return fragment_cache.render(
+        tables, (template, versions) + tuple(key),
+        lambda: render_template(template, **context),
+        cacheable=cacheable and versions is not None
+    )
+
+# ==========================================================
+# Версії таблиць (LISTEN/NOTIFY) для ETag/Last-Modified без запитів до БД
+# ==========================================================
+
+# 0 - не запускати слухача (ETag API тоді рахується за вмістом відповіді)
+TABLE_VERSIONS_ENABLED = os.environ.get('TABLE_VERSIONS_ENABLED', '1') == '1'
+
+table_versions = TableVersionTracker(CONN_STRING)
+# Зміна таблиці в будь-якому воркері (або в обхід панелі) скидає кеш списків і фрагментів цього процесу
+table_versions.add_listener(invalidate_cached)
+
+def tables_changed(*tables):
+    """
+    Після COMMIT власних змін: скидає кеш та одразу перечитує версії таблиць,
+    не чекаючи NOTIFY, щоб клієнт, який перевіряє сторінку відразу після свого
+    запису, не отримав застарілу відповідь 304.
+    """
+    invalidate_cached(*tables)
+    if not TABLE_VERSIONS_ENABLED or not has_request_context():
+        return
+    conn = get_pool_connection()
+    if conn is None:
+        return
+    try:
+        table_versions.refresh(conn, tables)
+        conn.commit()
+    except psycopg.Error as e:
+        print(f"⚠️ Не вдалося перечитати версії таблиць {tables}: {e}")
+        conn.rollback()
+    finally:
+        put_pool_connection(conn)
+
+def get_build_id():
+    """
+    Ідентифікатор версії коду та шаблонів для ETag: змінюється після оновлення
+    застосунку і збігається в усіх воркерах одного розгортання.
+    """
+    if os.environ.get('APP_BUILD_ID'):
+        return os.environ['APP_BUILD_ID']
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    templates_dir = os.path.join(base_dir, 'templates')
+    paths = [os.path.abspath(__file__)] + [
+        os.path.join(templates_dir, name) for name in os.listdir(templates_dir)
+    ]
+    return str(int(max(os.path.getmtime(path) for path in paths)))
+
+APP_BUILD_ID = get_build_id()
+
+def current_versions(*tables):
+    """Кортеж версій таблиць з пам'яті процесу або None, якщо версії невідомі."""
+    if not TABLE_VERSIONS_ENABLED:
+        return None
+    versions = table_versions.snapshot(tables)
+    if versions is None:
+        return None
+    return tuple(version for version, _ in versions)
+
+def versioned_validators(tables, *parts):
+    """
+    ETag та Last-Modified за версіями таблиць з пам'яті процесу.
+    parts - усе інше, від чого залежить відповідь (URL з параметрами, користувач).
+    Повертає (None, None), якщо версії невідомі - тоді відповідь формується як зазвичай.
+    """
+    if not TABLE_VERSIONS_ENABLED:
+        return None, None
+    versions = table_versions.snapshot(tables)
+    if versions is None:
+        return None, None
+    payload = json.dumps([APP_BUILD_ID, list(tables), [v for v, _ in versions], list(parts)],
+                         ensure_ascii=False, default=str)
+    etag = hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+    return etag, max(modified_at for _, modified_at in versions)
+
+def page_validators(*tables):
+    """Валідатори HTML-сторінки: вміст залежить також від користувача (ранг, кнопки)."""
+    return versioned_validators(tables, request.full_path, session.get('webadmin_id'), session.get('user_rank'))
+
+def not_modified(etag, last_modified):
+    """Готова відповідь 304, якщо копія клієнта актуальна, інакше None."""
+    if etag is None:
+        return None
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return None
+    return add_validators(Response(status=304), etag, last_modified)
+
+def add_validators(response, etag, last_modified):
+    """Додає ETag/Last-Modified; клієнт має перевіряти актуальність копії при кожному запиті."""
+    if etag is not None:
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.vary.add('Cookie')
+    return response
+
+# ==========================================================
+# Пагінація за ключем (keyset) для сторінок зі списками
+# ==========================================================
+
+# Розмір сторінки за замовчуванням та максимально дозволений
+PAGE_SIZE_DEFAULT = int(os.environ.get('PAGE_SIZE_DEFAULT', '50'))
+PAGE_SIZE_MAX = int(os.environ.get('PAGE_SIZE_MAX', '500'))
+
+def parse_page_size(value):
+    """Перетворює параметр page_size з URL на число в межах [1, PAGE_SIZE_MAX]."""
+    try:
+        page_size = int(value)
+    except (TypeError, ValueError):
+        return PAGE_SIZE_DEFAULT
+    return max(1, min(page_size, PAGE_SIZE_MAX))
+
+def encode_page_token(sort_by, sort_type, key):
+    """
+    Кодує позицію на сторінці (значення колонки сортування + первинний ключ)
+    у непрозорий токен для URL. Токен прив'язаний до поточного сортування.
+    """
+    payload = json.dumps([sort_by, sort_type, list(key)], ensure_ascii=False, default=str)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_page_token(token, sort_by, sort_type):
+    """
+    Повертає позицію (sort_value, pk) з токена або None, якщо токен пошкоджений
+    чи створений для іншого сортування (тоді показується перша сторінка).
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        token_sort_by, token_sort_type, key = json.loads(base64.urlsafe_b64decode(padded).decode('utf-8'))
+    except (ValueError, TypeError):
+        return None
+    if token_sort_by != sort_by or token_sort_type != sort_type or len(key) != 2:
+        return None
+    return tuple(key)
+
+def plan_keyset_page(from_sql, columns_sql, conditions, params, sort_expr, pk_expr,
+                     sort_by, sort_type, page_size, after=None, before=None, count_from_sql=None):
+    """
+    Будує запити сторінки для keyset-пагінації: лічильник рядків за фільтром
+    (count_sql) та сторінку (rows_sql), спільні для синхронного й асинхронного шляху.
+
+    Порядок стабільний: ORDER BY <колонка сортування>, <первинний ключ>, тому рядки
+    з однаковими значеннями не губляться і не дублюються між сторінками.
+    after/before - токени наступної/попередньої сторінки.
+    count_from_sql - FROM для лічильника, якщо кількість рядків відома без JOIN зі сторінки.
+    """
+    sort_direction = 'DESC' if (sort_type or '').upper() == 'DESC' else 'ASC'
+    after_key = decode_page_token(after, sort_by, sort_direction)
+    before_key = decode_page_token(before, sort_by, sort_direction) if after_key is None else None
+
+    # Для попередньої сторінки йдемо у зворотному напрямку і потім розвертаємо результат
+    backwards = before_key is not None
+    scan_direction = sort_direction
+    if backwards:
+        scan_direction = 'ASC' if sort_direction == 'DESC' else 'DESC'
+
+    filter_sql = (" WHERE " + " AND ".join(conditions)) if conditions else ""
+
+    page_conditions = list(conditions)
+    page_params = list(params)
+    cursor_key = before_key if backwards else after_key
+    if cursor_key is not None:
+        comparison = '>' if scan_direction == 'ASC' else '<'
+        page_conditions.append(f"({sort_expr}, {pk_expr}) {comparison} (%s, %s)")
+        page_params.extend(cursor_key)
+    page_filter_sql = (" WHERE " + " AND ".join(page_conditions)) if page_conditions else ""
+
+    return {
+        'sort_by': sort_by,
+        'sort_direction': sort_direction,
+        'scan_direction': scan_direction,
+        'backwards': backwards,
+        'after_key': after_key,
+        'page_size': page_size,
+        'count_sql': f"SELECT count(*) AS total_count FROM {count_from_sql or from_sql}{filter_sql}",
+        'count_params': list(params),
+        'rows_sql': f"""
+        SELECT {columns_sql}, {sort_expr} AS _sort_key, {pk_expr} AS _pk_key
+        FROM {from_sql}{page_filter_sql}
+        ORDER BY {sort_expr} {scan_direction}, {pk_expr} {scan_direction}
+        LIMIT %s""",
+        # На один рядок більше за сторінку - щоб дізнатися, чи є наступна
+        'rows_params': page_params + [page_size + 1]
+    }
+
+def finish_keyset_page(plan, records, total_count):
+    """Розкладає рядки запиту сторінки (з _sort_key/_pk_key) у словник сторінки з токенами."""
+    page = {'rows': [], 'total_count': total_count, 'next_token': None, 'prev_token': None}
+    backwards = plan['backwards']
+
+    has_more = len(records) > plan['page_size']
+    records = records[:plan['page_size']]
+    if backwards:
+        records.reverse()
+
+    keys = [(r.pop('_sort_key'), r.pop('_pk_key')) for r in records]
+    page['rows'] = records
+
+    if keys:
+        sort_by, sort_direction = plan['sort_by'], plan['sort_direction']
+        # Наступна сторінка є, якщо знайшли зайвий рядок вперед або прийшли сюди "назад"
+        if (has_more and not backwards) or backwards:
+            page['next_token'] = encode_page_token(sort_by, sort_direction, keys[-1])
+        # Попередня сторінка є, якщо прийшли сюди "вперед" або знайшли зайвий рядок назад
+        if (has_more and backwards) or plan['after_key'] is not None:
+            page['prev_token'] = encode_page_token(sort_by, sort_direction, keys[0])
+
+    return page
+
+def fetch_keyset_page(from_sql, columns_sql, conditions, params, sort_expr, pk_expr,
+                      sort_by, sort_type, page_size, after=None, before=None, count_from_sql=None):
+    """
+    Виконує один запит, що повертає сторінку рядків та загальну кількість рядків за фільтром.
+
+    Повертає словник: rows, total_count, next_token, prev_token
+    (та failed=True, якщо запит не вдався - такий результат не кешується).
+    """
+    plan = plan_keyset_page(from_sql, columns_sql, conditions, params, sort_expr, pk_expr,
+                            sort_by, sort_type, page_size, after, before, count_from_sql)
+    scan_direction = plan['scan_direction']
+
+    # Лічильник і сторінка в одному запиті: LEFT JOIN гарантує рядок з total_count навіть для порожньої сторінки
+    sql = f"""
+    SELECT c.total_count, p.*
+    FROM ({plan['count_sql']}) AS c
+    LEFT JOIN LATERAL ({plan['rows_sql']}
+    ) AS p ON TRUE
+    ORDER BY p._sort_key {scan_direction}, p._pk_key {scan_direction};
+    """
+    all_params = plan['count_params'] + plan['rows_params']
+
     conn = get_connection()
     if conn is None:
-        return []
+        return {'rows': [], 'total_count': 0, 'next_token': None, 'prev_token': None, 'failed': True}
 
-    # Базовий SQL запит
-    sql = "SELECT helper_id, admin_name, admin_rank, warnings_count FROM helperinfo"
+    try:
+        with conn.cursor(row_factory=psycopg.rows.dict_row) as cur:
+            cur.execute(sql, all_params)
+            records = cur.fetchall()
+    except Exception as e:
+        print(f"❌ Помилка читання сторінки даних: {e}")
+        return {'rows': [], 'total_count': 0, 'next_token': None, 'prev_token': None, 'failed': True}
+    finally:
+        release_connection(conn)
+
+    total_count = records[0]['total_count'] if records else 0
+    records = [r for r in records if r['_pk_key'] is not None]
+    for r in records:
+        r.pop('total_count', None)
+    return finish_keyset_page(plan, records, total_count)
+
+async def fetch_keyset_page_async(from_sql, columns_sql, conditions, params, sort_expr, pk_expr,
+                                  sort_by, sort_type, page_size, after=None, before=None,
+                                  count_from_sql=None):
+    """
+    Асинхронний варіант fetch_keyset_page: лічильник і сторінка виконуються
+    одночасно на двох з'єднаннях асинхронного пулу. Результат - той самий словник.
+    """
+    plan = plan_keyset_page(from_sql, columns_sql, conditions, params, sort_expr, pk_expr,
+                            sort_by, sort_type, page_size, after, before, count_from_sql)
+    try:
+        count_row, records = await asyncio.gather(
+            async_reader.fetch_one(plan['count_sql'], plan['count_params']),
+            async_reader.fetch_all(plan['rows_sql'], plan['rows_params'])
+        )
+    except Exception as e:
+        print(f"❌ Помилка читання сторінки даних (async): {e}")
+        return {'rows': [], 'total_count': 0, 'next_token': None, 'prev_token': None, 'failed': True}
+
+    return finish_keyset_page(plan, records, count_row['total_count'])
+
+# ==========================================================
+# Пошуковий рушій: умови пошуку, що використовують індекси
+# ==========================================================
+# Текстові колонки шукаються через ILIKE '%...%' - для них міграція
+# 0001_search_trgm_indexes.sql створює GIN-індекси pg_trgm, тож умови,
+# об'єднані через OR, виконуються як BitmapOr по індексах.
+# Числові запити ("15" або діапазон "10-20") порівнюються з цілими колонками
+# напряму (= / BETWEEN) замість CAST(колонка AS TEXT) ILIKE, що вимагало
+# послідовного сканування з перетворенням кожного рядка.
+
+def escape_like(value):
+    """Екранує спецсимволи LIKE (%, _ та \\), щоб вони шукались як звичайні символи."""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def parse_numeric_search(query):
+    """
+    Розпізнає числовий пошуковий запит.
+    '15' -> (15, 15), '10-20' або '10..20' -> (10, 20), інакше None.
+    """
+    match = re.fullmatch(r'(\d+)(?:\s*(?:-|\.\.)\s*(\d+))?', query.strip(), re.ASCII)
+    if not match:
+        return None
+    low = int(match.group(1))
+    high = int(match.group(2)) if match.group(2) else low
+    return min(low, high), max(low, high)
+
+def build_search_predicate(query, text_columns, int_columns=(), extra_text_predicates=()):
+    """
+    Будує одну умову пошуку (SQL, параметри) для рядка query.
+
+    text_columns - колонки для ILIKE '%query%' (індексуються pg_trgm);
+    int_columns - цілі колонки, які порівнюються лише з числовим запитом;
+    extra_text_predicates - додаткові умови з одним %s для шаблону ILIKE
+    (наприклад, пошук по імені хендлера через підзапит).
+    """
+    query = (query or '').strip()
+    if not query:
+        return None, []
+
+    predicates = []
+    params = []
+
+    pattern = f"%{escape_like(query)}%"
+    for column in text_columns:
+        predicates.append(f"{column} ILIKE %s")
+        params.append(pattern)
+    for predicate in extra_text_predicates:
+        predicates.append(predicate)
+        params.append(pattern)
+
+    numeric_range = parse_numeric_search(query)
+    if numeric_range:
+        low, high = numeric_range
+        for column in int_columns:
+            if low == high:
+                predicates.append(f"{column} = %s")
+                params.append(low)
+            else:
+                predicates.append(f"{column} BETWEEN %s AND %s")
+                params.extend([low, high])
+
+    return "(" + " OR ".join(predicates) + ")", params
+
+# ==========================================================
+# Функцій для табліци HelperInfo
+# ==========================================================
+
+# Поля сортування HelperInfo -> SQL-вираз (NULL у warnings_count рахуємо як 0, щоб ключ сторінки був порівнюваним)
+HELPER_SORT_FIELDS = {
+    'helper_id': 'helper_id',
+    'admin_name': 'admin_name',
+    'admin_rank': 'admin_rank',
+    'warnings_count': 'COALESCE(warnings_count, 0)'
+}
+
+def build_helpers_filter(query=None, rank_filter=None):
+    """Будує умови WHERE та параметри для пошуку і фільтра за рангом у helperinfo."""
     params = []
     conditions = []
     
     # Додаємо пошук якщо є query
-    if query:
-        conditions.append("(admin_name ILIKE %s OR admin_rank ILIKE %s OR CAST(warnings_count AS TEXT) ILIKE %s OR CAST(helper_id AS TEXT) ILIKE %s)")
-        search_pattern = f"%{query}%"
-        params.extend([search_pattern, search_pattern, search_pattern, search_pattern])
+    search_sql, search_params = build_search_predicate(
+        query,
+        text_columns=['admin_name', 'admin_rank'],
+        int_columns=['helper_id', 'warnings_count']
+    )
+    if search_sql:
+        conditions.append(search_sql)
+        params.extend(search_params)
     
     # Додаємо фільтр по рангу якщо вказано
     if rank_filter:
         conditions.append("admin_rank = %s")
         params.append(rank_filter)
+
+    return conditions, params
+
+def build_helpers_list_sql(query=None, sort_by=None, sort_type='ASC', rank_filter=None):
+    """Повертає (SQL, параметри) повного списку помічників з пошуком, фільтром та сортуванням."""
+    # Базовий SQL запит
+    sql = "SELECT helper_id, admin_name, admin_rank, warnings_count FROM helperinfo"
+    conditions, params = build_helpers_filter(query, rank_filter)
     
     # Додаємо WHERE якщо є умови
     if conditions:
         sql += " WHERE " + " AND ".join(conditions)
     
-    # Додаємо сортування якщо вказано
-    valid_sort_fields = ['helper_id', 'admin_name', 'admin_rank', 'warnings_count']
-    if sort_by and sort_by in valid_sort_fields:
-        sort_direction = 'DESC' if sort_type.upper() == 'DESC' else 'ASC'
-        sql += f" ORDER BY {sort_by} {sort_direction}"
+    # Додаємо сортування якщо вказано (helper_id - для стабільного порядку однакових значень)
+    if sort_by and sort_by in HELPER_SORT_FIELDS:
+        sort_direction = 'DESC' if (sort_type or '').upper() == 'DESC' else 'ASC'
+        sql += f" ORDER BY {sort_by} {sort_direction}, helper_id {sort_direction}"
+    else:
+        sql += " ORDER BY helper_id"
+
+    return sql, params
+
+# --- ФУНКЦІЯ H1: Для отримання всіх помічників (для головної сторінки) ---
+def get_all_helpers(query=None, sort_by=None, sort_type='ASC', rank_filter=None):
+    """Повертає всіх помічників з таблиці helperinfo, з можливістю сортування та пошуку."""
+    
+    conn = get_connection()
+    if conn is None:
+        return []
+
+    sql, params = build_helpers_list_sql(query, sort_by, sort_type, rank_filter)
     
     results = []
     try:
@@ -163,10 +749,96 @@ def get_all_helpers(query=None, sort_by=None, sort_type='ASC', rank_filter=None)
     except Exception as e:
         print(f"Помилка при отриманні даних HelperInfo: {e}")
     finally:
-        conn.close()
+        release_connection(conn)
         
     return results
 
+# --- ФУНКЦІЯ H1 (async): Усі помічники через асинхронний пул ---
+async def get_all_helpers_async(query=None, sort_by=None, sort_type='ASC', rank_filter=None):
+    """Асинхронний варіант get_all_helpers (той самий SQL)."""
+    sql, params = build_helpers_list_sql(query, sort_by, sort_type, rank_filter)
+    try:
+        return await async_reader.fetch_all(sql, params)
+    except Exception as e:
+        print(f"Помилка при отриманні даних HelperInfo (async): {e}")
+        return []
+
+# --- ФУНКЦІЯ H1a: Сторінка помічників (keyset-пагінація) ---
+def get_helpers_page(query=None, sort_by=None, sort_type='ASC', rank_filter=None,
+                     page_size=PAGE_SIZE_DEFAULT, after=None, before=None):
+    """
+    Повертає одну сторінку помічників з урахуванням пошуку, фільтра та сортування.
+    Результат: словник rows, total_count, next_token, prev_token.
+    """
+    if sort_by not in HELPER_SORT_FIELDS:
+        sort_by = 'helper_id'
+    conditions, params = build_helpers_filter(query, rank_filter)
+
+    return fetch_keyset_page(
+        from_sql="helperinfo",
+        columns_sql="helper_id, admin_name, admin_rank, warnings_count",
+        conditions=conditions,
+        params=params,
+        sort_expr=HELPER_SORT_FIELDS[sort_by],
+        pk_expr="helper_id",
+        sort_by=sort_by,
+        sort_type=sort_type,
+        page_size=page_size,
+        after=after,
+        before=before
+    )
+
+# --- ФУНКЦІЯ H1b: СТОРІНКА ПОМІЧНИКІВ ЧЕРЕЗ КЕШ (головна сторінка та API) ---
+def get_helpers_page_cached(query=None, sort_by=None, sort_type='ASC', rank_filter=None,
+                            page_size=PAGE_SIZE_DEFAULT, after=None, before=None):
+    """get_helpers_page() через кеш результатів; записи спільні для HTML-сторінки та API."""
+    return result_cache.get_or_load(
+        ('helperinfo',),
+        ('helperinfo', query, sort_by, sort_type, rank_filter, (page_size, after, before)),
+        lambda: get_helpers_page(
+            query=query, sort_by=sort_by, sort_type=sort_type, rank_filter=rank_filter,
+            page_size=page_size, after=after, before=before
+        ),
+        cacheable=page_loaded
+    )
+
+# --- ФУНКЦІЯ H1c: Сторінка помічників через асинхронний пул ---
+async def get_helpers_page_async(query=None, sort_by=None, sort_type='ASC', rank_filter=None,
+                                 page_size=PAGE_SIZE_DEFAULT, after=None, before=None):
+    """Асинхронний варіант get_helpers_page: лічильник і сторінка виконуються одночасно."""
+    if sort_by not in HELPER_SORT_FIELDS:
+        sort_by = 'helper_id'
+    conditions, params = build_helpers_filter(query, rank_filter)
+
+    return await fetch_keyset_page_async(
+        from_sql="helperinfo",
+        columns_sql="helper_id, admin_name, admin_rank, warnings_count",
+        conditions=conditions,
+        params=params,
+        sort_expr=HELPER_SORT_FIELDS[sort_by],
+        pk_expr="helper_id",
+        sort_by=sort_by,
+        sort_type=sort_type,
+        page_size=page_size,
+        after=after,
+        before=before
+    )
+
+# --- ФУНКЦІЯ H1d: СТОРІНКА ПОМІЧНИКІВ ДЛЯ МАРШРУТІВ (кеш + вибір шляху читання) ---
+def read_helpers_page(query=None, sort_by=None, sort_type='ASC', rank_filter=None,
+                      page_size=PAGE_SIZE_DEFAULT, after=None, before=None):
+    """Сторінка помічників з кешу; промах читається асинхронним пулом, якщо ASYNC_READS=1."""
+    if not ASYNC_READS:
+        return get_helpers_page_cached(query, sort_by, sort_type, rank_filter, page_size, after, before)
+    return result_cache.get_or_load(
+        ('helperinfo',),
+        ('helperinfo', query, sort_by, sort_type, rank_filter, (page_size, after, before)),
+        lambda: async_reader.run(
+            get_helpers_page_async(query, sort_by, sort_type, rank_filter, page_size, after, before)
+        ),
+        cacheable=page_loaded
+    )
+
 # --- ФУНКЦІЯ H2: Для фільтра Helperinfo ---
 def get_helpers_by_search(search_query, sort_by=None, sort_type='ASC'): # <--- ДОДАТИ: параметри сортування
     """Повертає помічників, які відповідають search_query у будь-якому текстовому полі, з сортуванням."""
@@ -177,19 +849,16 @@ def get_helpers_by_search(search_query, sort_by=None, sort_type='ASC'): # <--- 
     order_column = sort_by if sort_by in valid_sort_fields else 'helper_id'
     order_direction = sort_type if sort_type in ('ASC', 'DESC') else 'ASC'
 
+    # Умови пошуку ті ж, що й на головній сторінці
+    conditions, params = build_helpers_filter(search_query)
+    where_sql = (" WHERE " + " AND ".join(conditions)) if conditions else ""
+
     # !!! ЗМІНА В SQL-ЗАПИТІ: Додаємо ORDER BY
     sql = f"""
     SELECT helper_id, admin_name, admin_rank, warnings_count 
-    FROM public.helperinfo 
-    WHERE 
-        admin_name ILIKE %s OR 
-        admin_rank ILIKE %s OR
-        CAST(warnings_count AS TEXT) ILIKE %s OR
-        CAST(helper_id AS TEXT) ILIKE %s 
+    FROM public.helperinfo{where_sql}
     ORDER BY {order_column} {order_direction}; 
     """
-    search_pattern = f"%{search_query}%" 
-    params = (search_pattern, search_pattern, search_pattern, search_pattern)
 
     try:
         with conn.cursor() as cur:
@@ -206,11 +875,14 @@ def get_helpers_by_search(search_query, sort_by=None, sort_type='ASC'): # <--- 
         print(f"❌ Помилка читання даних helperinfo з пошуком: {e}")
         return []
     finally:
-        if conn: conn.close()
+        release_connection(conn)
 
 # --- ФУНКЦІЯ H3: Оновлення даних помічників ---
 def update_helper_data(helper_id, name, rank, warnings):
-    """Оновлює дані співробітника в таблиці helperinfo."""
+    """
+    Оновлює дані співробітника в таблиці helperinfo.
+    Повертає True, якщо рядок оновлено, False - якщо його не знайдено або помилка БД.
+    """
     sql = """
     UPDATE public.helperinfo
     SET admin_name = %s, admin_rank = %s, warnings_count = %s
@@ -222,67 +894,117 @@ def update_helper_data(helper_id, name, rank, warnings):
     try:
         with conn.cursor() as cur:
             cur.execute(sql, (name, rank, warnings, helper_id))
+            updated = cur.rowcount > 0
         conn.commit()
-        return True
+        return updated
     except Exception as e:
         print(f"❌ Помилка оновлення даних співробітника ID {helper_id}: {e}")
         conn.rollback()
         return False
     finally:
-        if conn: conn.close()
+        release_connection(conn)
 
-# --- ФУНКЦІЯ H4: Видалення помічників ---
-def delete_helper_data(helper_id):
-    """Видаляє співробітника з таблиці helperinfo за ID, попередньо видаливши всі пов'язані тікети."""
-    conn = get_connection()
-    if conn is None: return False
+# Скільки тікетів видаляти в одній транзакції при видаленні помічника
+HELPER_DELETE_BATCH_SIZE = int(os.environ.get('HELPER_DELETE_BATCH_SIZE', '5000'))
+
+# --- ФУНКЦІЯ H4: Видалення помічника разом з його тікетами ---
+def delete_helper_data(helper_id, batch_size=None, on_progress=None):
+    """
+    Видаляє співробітника з helperinfo разом з усіма його тікетами (handler_helper_id).
+
+    Тікети видаляються частинами по batch_size, кожна в окремій транзакції на
+    окремому з'єднанні з пулу: блокування тримаються недовго, і таблиця лишається
+    доступною навіть під час видалення помічника з сотнями тисяч тікетів.
+    on_progress(видалено, усього) викликається після кожної частини.
+    Остання транзакція блокує рядок помічника (нові тікети на нього вже не
+    призначаться), видаляє тікети, що встигли з'явитися, і самого помічника.
 
+    Повертає {'found': bool, 'tickets': кількість видалених тікетів} або None при
+    помилці БД (уже зафіксовані частини тікетів лишаються видаленими).
+    """
+    batch_size = batch_size or HELPER_DELETE_BATCH_SIZE
+    # Частини фіксуються по ходу видалення - з'єднання запиту (одиниця роботи) для цього не підходить
+    conn = get_pool_connection()
+    if conn is None: return None
+
+    deleted = 0
     try:
         with conn.cursor() as cur:
-            # 1. Видаляємо всі тікети, пов'язані з цим співробітником (handler_helper_id)
-            # Примітка: Тікети, де helper був призначений (handler_helper_id), будуть видалені.
-            sql_delete_tickets = "DELETE FROM public.ticketinfo WHERE handler_helper_id = %s;"
-            cur.execute(sql_delete_tickets, (helper_id,))
-            deleted_tickets_count = cur.rowcount
-            print(f"✅ Видалено {deleted_tickets_count} пов'язаних тікетів для Helper ID {helper_id}.")
-            
-            # 2. Видаляємо самого співробітника з helperinfo
-            sql_delete_helper = "DELETE FROM public.helperinfo WHERE helper_id = %s;"
-            cur.execute(sql_delete_helper, (helper_id,))
-        
-        conn.commit()
-        # Повертаємо True, якщо видалено принаймні один рядок співробітника
-        return cur.rowcount > 0 
-        
-    except Exception as e:
-        # Обробляємо будь-яку іншу помилку і відкочуємо транзакцію
-        print(f"❌ Помилка видалення співробітника ID {helper_id} або пов'язаних тікетів: {e}")
+            cur.execute("""
+                SELECT EXISTS (SELECT 1 FROM public.helperinfo WHERE helper_id = %s),
+                       (SELECT count(*) FROM public.ticketinfo WHERE handler_helper_id = %s);
+            """, (helper_id, helper_id))
+            found, total = cur.fetchone()
+            conn.commit()
+            if not found:
+                return {'found': False, 'tickets': 0}
+
+            while deleted < total:
+                cur.execute("""
+                    DELETE FROM public.ticketinfo
+                    WHERE ticket_id IN (
+                        SELECT ticket_id FROM public.ticketinfo
+                        WHERE handler_helper_id = %s
+                        LIMIT %s
+                    );
+                """, (helper_id, batch_size))
+                batch = cur.rowcount
+                conn.commit()
+                deleted += batch
+                if on_progress:
+                    on_progress(deleted, max(total, deleted))
+                if batch < batch_size:
+                    break
+
+            cur.execute("SELECT 1 FROM public.helperinfo WHERE helper_id = %s FOR UPDATE;", (helper_id,))
+            found = cur.fetchone() is not None
+            if found:
+                cur.execute("DELETE FROM public.ticketinfo WHERE handler_helper_id = %s;", (helper_id,))
+                deleted += cur.rowcount
+                cur.execute("DELETE FROM public.helperinfo WHERE helper_id = %s;", (helper_id,))
+            conn.commit()
+        return {'found': found, 'tickets': deleted}
+    except psycopg.Error as e:
+        print(f"❌ Помилка видалення співробітника ID {helper_id} (уже видалено тікетів: {deleted}): {e}")
         conn.rollback()
-        return False
+        return None
     finally:
-        if conn: conn.close()
+        put_pool_connection(conn)
+
+def helper_delete_progress_printer(helper_id, step=10):
+    """on_progress для delete_helper_data: друкує в лог сервера кожні step відсотків."""
+    reported = [0]
+
+    def report(deleted, total):
+        percent = deleted * 100 // total if total else 100
+        if percent >= reported[0] + step or deleted == total:
+            reported[0] = percent
+            print(f"🗑️ Видалення тікетів помічника ID {helper_id}: {deleted}/{total} ({percent}%)")
+    return report
 
 # --- ФУНКЦІЯ H5: Додавання нового помічників ---
 def insert_helper_data(name, rank, warnings):
-    """Додає нового співробітника в таблицю helperinfo."""
+    """Додає нового співробітника в таблицю helperinfo. Повертає його helper_id або None при помилці."""
     sql = """
     INSERT INTO public.helperinfo (admin_name, admin_rank, warnings_count)
-    VALUES (%s, %s, %s);
+    VALUES (%s, %s, %s)
+    RETURNING helper_id;
     """
     conn = get_connection()
-    if conn is None: return False
+    if conn is None: return None
 
     try:
         with conn.cursor() as cur:
             cur.execute(sql, (name, rank, warnings))
+            helper_id = cur.fetchone()[0]
         conn.commit()
-        return True
+        return helper_id
     except Exception as e:
         print(f"❌ Помилка додавання нового співробітника: {e}")
         conn.rollback()
-        return False
+        return None
     finally:
-        if conn: conn.close()
+        release_connection(conn)
 
 # --- ФУНКЦІЯ H6: Отримання Одиничного Запису (Helper) ---
 def get_helper_by_id(helper_id):
@@ -302,71 +1024,233 @@ def get_helper_by_id(helper_id):
     except psycopg.Error as e:
         print(f"Помилка отримання помічника: {e}")
     finally:
-        conn.close()
+        release_connection(conn)
     
     return helper
 
 
+# --- ФУНКЦІЯ H6 (async): Одиничний запис через асинхронний пул ---
+async def get_helper_by_id_async(helper_id):
+    """Асинхронний варіант get_helper_by_id."""
+    try:
+        return await async_reader.fetch_one(
+            "SELECT helper_id, admin_name, admin_rank, warnings_count FROM helperinfo WHERE helper_id = %s;",
+            (helper_id,)
+        )
+    except Exception as e:
+        print(f"Помилка отримання помічника (async): {e}")
+        return None
+
+def read_helper_by_id(helper_id):
+    """Помічник для маршрутів читання: асинхронний пул, якщо ASYNC_READS=1, інакше синхронний."""
+    if ASYNC_READS:
+        return async_reader.run(get_helper_by_id_async(helper_id))
+    return get_helper_by_id(helper_id)
+
+# ==========================================================
+# Статистика співробітників (дашборд)
+# ==========================================================
+# Кількість тікетів, суми time_spent та resolution_rating по кожному співробітнику
+# зберігаються в helper_ticket_stats; її підтримують тригери ticketinfo
+# (міграція 0005_helper_ticket_stats.sql). Сторінка читає готові рядки замість
+# групування всієї ticketinfo, а середні рахуються з сум при читанні.
+
+# Рядок статистики є в кожного співробітника (тригери helperinfo, міграція 0008), тому JOIN,
+# а не LEFT JOIN: сторінку за колонкою статистики читає індекс helper_ticket_stats, а
+# helperinfo з'єднується лише для рядків сторінки. Умови пошуку - по колонках helperinfo
+# (USING робить helper_id однозначним)
+HELPER_STATS_FROM_SQL = "helperinfo h JOIN helper_ticket_stats s USING (helper_id)"
+# Лічильник рахує лише helperinfo: рядків стільки ж, а статистика для нього не потрібна
+HELPER_STATS_COUNT_FROM_SQL = "helperinfo h"
+
+HELPER_STATS_COLUMNS_SQL = """helper_id, h.admin_name, h.admin_rank,
+    COALESCE(h.warnings_count, 0) AS warnings_count, s.tickets_count,
+    CASE WHEN s.time_spent_count > 0 THEN s.avg_time_spent_key END AS avg_time_spent,
+    CASE WHEN s.rated_count > 0 THEN s.avg_rating_key END AS avg_rating"""
+
+# Поля сортування дашборду -> (SQL-вираз, первинний ключ з тієї ж таблиці).
+# Кожній парі відповідає індекс (міграції 0008, 0009); середні - збережені колонки
+# з -1 для співробітників без даних (в кінці при сортуванні за спаданням)
+HELPER_STATS_SORT_FIELDS = {
+    'helper_id': ('h.helper_id', 'h.helper_id'),
+    'admin_name': ('h.admin_name', 'h.helper_id'),
+    'admin_rank': ('h.admin_rank', 'h.helper_id'),
+    'warnings_count': ('COALESCE(h.warnings_count, 0)', 'h.helper_id'),
+    'tickets_count': ('s.tickets_count', 's.helper_id'),
+    'avg_time_spent': ('s.avg_time_spent_key', 's.helper_id'),
+    'avg_rating': ('s.avg_rating_key', 's.helper_id')
+}
+
+# --- ФУНКЦІЯ S1: Сторінка статистики співробітників (keyset-пагінація) ---
+def get_helper_stats_page(query=None, sort_by=None, sort_type='DESC', rank_filter=None,
+                          page_size=PAGE_SIZE_DEFAULT, after=None, before=None):
+    """
+    Повертає сторінку статистики співробітників; пошук і фільтр за рангом - як на головній.
+    За замовчуванням - за кількістю тікетів. Результат: словник rows, total_count, next_token, prev_token.
+    """
+    if sort_by not in HELPER_STATS_SORT_FIELDS:
+        sort_by = 'tickets_count'
+    conditions, params = build_helpers_filter(query, rank_filter)
+    sort_expr, pk_expr = HELPER_STATS_SORT_FIELDS[sort_by]
+
+    return fetch_keyset_page(
+        from_sql=HELPER_STATS_FROM_SQL,
+        count_from_sql=HELPER_STATS_COUNT_FROM_SQL,
+        columns_sql=HELPER_STATS_COLUMNS_SQL,
+        conditions=conditions,
+        params=params,
+        sort_expr=sort_expr,
+        pk_expr=pk_expr,
+        sort_by=sort_by,
+        sort_type=sort_type,
+        page_size=page_size,
+        after=after,
+        before=before
+    )
+
+# --- ФУНКЦІЯ S1a: СТОРІНКА СТАТИСТИКИ ЧЕРЕЗ КЕШ (дашборд та API) ---
+def get_helper_stats_page_cached(query=None, sort_by=None, sort_type='DESC', rank_filter=None,
+                                 page_size=PAGE_SIZE_DEFAULT, after=None, before=None):
+    """get_helper_stats_page() через кеш результатів; застаріває при зміні helperinfo або ticketinfo."""
+    return result_cache.get_or_load(
+        ('helperinfo', 'ticketinfo'),
+        ('helper_stats', query, sort_by, sort_type, rank_filter, (page_size, after, before)),
+        lambda: get_helper_stats_page(
+            query=query, sort_by=sort_by, sort_type=sort_type, rank_filter=rank_filter,
+            page_size=page_size, after=after, before=before
+        ),
+        cacheable=page_loaded
+    )
+
+# Скільки співробітників перераховувати в одній транзакції refresh-helper-stats
+HELPER_STATS_REFRESH_BATCH = int(os.environ.get('HELPER_STATS_REFRESH_BATCH', '500'))
+
+# --- ФУНКЦІЯ S2: Повний перерахунок статистики з ticketinfo ---
+def refresh_helper_stats(batch_size=HELPER_STATS_REFRESH_BATCH):
+    """
+    Перераховує helper_ticket_stats з ticketinfo (виправлення після змін в обхід тригерів)
+    партіями по batch_size співробітників, кожна в окремій транзакції: блокуються лише
+    рядки статистики поточної партії, читання дашборду не блокуються зовсім.
+    Повертає кількість виправлених рядків або None.
+    """
+    conn = get_pool_connection()
+    if conn is None:
+        return None
+    changed = 0
+    last_id = None
+    try:
+        with conn.cursor() as cur:
+            while True:
+                # Співробітники та рядки статистики без співробітника (їх функція видаляє)
+                cur.execute("""
+                    SELECT helper_id FROM (
+                        SELECT helper_id FROM helperinfo
+                        UNION
+                        SELECT helper_id FROM helper_ticket_stats
+                    ) AS ids
+                    WHERE %s::integer IS NULL OR helper_id > %s
+                    ORDER BY helper_id
+                    LIMIT %s;
+                """, (last_id, last_id, batch_size))
+                helper_ids = [row[0] for row in cur.fetchall()]
+                if not helper_ids:
+                    break
+                cur.execute("SELECT public.refresh_helper_ticket_stats(%s::integer[]);", (helper_ids,))
+                changed += cur.fetchone()[0]
+                conn.commit()
+                last_id = helper_ids[-1]
+        conn.commit()
+        return changed
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Помилка перерахунку статистики співробітників: {e}")
+        return None
+    finally:
+        put_pool_connection(conn)
+
 # ==========================================================
 # Функцій для табліци TicketInfo
 # ==========================================================
 
-# --- ФУНКЦІЯ T1: Для отримання всіх тікетів
-def get_all_tickets(query=None, sort_by=None, sort_type='ASC'):
-    """Повертає всі тікети з таблиці ticketinfo, з можливістю пошуку та сортування."""
-    ticket_list = []
-    
-    # Визначення поля для сортування за замовчуванням
-    if not sort_by:
-        sort_by = 'ticket_id' # Сортуємо за ID за замовчуванням
-    
-    # Перевірка безпеки сортування: дозволені поля
-    allowed_sort_fields = {
-        'ticket_id': 't.ticket_id',
-        'submitter_username': 't.submitter_username',
-        'handler_name': 'h.admin_name',
-        'time_spent': 't.time_spent',
-        'resolution_rating': 't.resolution_rating'
-    }
-    
-    # Перевіряємо чи вибране поле для сортування дозволено
-    sort_column = allowed_sort_fields.get(sort_by, 't.ticket_id')
-    sort_direction = 'DESC' if sort_type.upper() == 'DESC' else 'ASC'
-    
-    # Базовий запит із приєднанням (JOIN) для отримання імені хендлера
-    base_query = """
-        SELECT 
+# Поля сортування TicketInfo -> SQL-вираз (NULL замінюємо, щоб ключ сторінки був порівнюваним)
+TICKET_SORT_FIELDS = {
+    'ticket_id': 't.ticket_id',
+    'submitter_username': 't.submitter_username',
+    'handler_name': "COALESCE(h.admin_name, '')",
+    'time_spent': 'COALESCE(t.time_spent, 0)',
+    'resolution_rating': 'COALESCE(t.resolution_rating, 0)'
+}
+
+TICKET_COLUMNS_SQL = """
             t.ticket_id, 
             t.submitter_username, 
             t.handler_helper_id, 
             t.time_spent, 
             t.resolution_rating,
-            h.admin_name AS handler_name
-        FROM 
-            ticketinfo t
-        LEFT JOIN 
-            helperinfo h ON t.handler_helper_id = h.helper_id
+            h.admin_name AS handler_name"""
+
+TICKET_FROM_SQL = "ticketinfo t LEFT JOIN helperinfo h ON t.handler_helper_id = h.helper_id"
+
+def build_tickets_filter(query=None):
+    """Будує умови WHERE та параметри для пошуку тікетів у всіх полях (ID, username, хендлер, час, оцінка)."""
+    conditions = []
+    params = []
+    # Ім'я хендлера шукаємо в helperinfo окремо (ARRAY(...) виконується один раз), щоб
+    # усі умови OR стосувались колонок ticketinfo і могли об'єднатись через BitmapOr
+    search_sql, search_params = build_search_predicate(
+        query,
+        text_columns=['t.submitter_username'],
+        int_columns=['t.ticket_id', 't.time_spent', 't.resolution_rating'],
+        extra_text_predicates=[
+            "t.handler_helper_id = ANY(ARRAY(SELECT helper_id FROM helperinfo WHERE admin_name ILIKE %s))"
+        ]
+    )
+    if search_sql:
+        conditions.append(search_sql)
+        params.extend(search_params)
+    return conditions, params
+
+def plan_ticket_query(query=None, sort_by=None, sort_type='ASC'):
     """
-    
-    # Логіка для додавання фільтра (WHERE)
-    where_clauses = []
-    params = {}
-    
-    if query:
-        # Додаємо фільтр для пошуку по username та імені хендлера
-        where_clauses.append("(t.submitter_username ILIKE %(query_param)s OR h.admin_name ILIKE %(query_param)s)")
-        params['query_param'] = f"%{query}%"
+    Єдина точка побудови запиту до ticketinfo: пошук, сортування та колонки.
+    Повний список, сторінка та експорт отримують однакові умови і порядок рядків.
+    """
+    # Перевірка безпеки сортування: дозволені лише поля з TICKET_SORT_FIELDS
+    if sort_by not in TICKET_SORT_FIELDS:
+        sort_by = 'ticket_id' # Сортуємо за ID за замовчуванням
+    conditions, params = build_tickets_filter(query)
+
+    return {
+        'from_sql': TICKET_FROM_SQL,
+        'columns_sql': TICKET_COLUMNS_SQL,
+        'conditions': conditions,
+        'params': params,
+        'sort_by': sort_by,
+        'sort_expr': TICKET_SORT_FIELDS[sort_by],
+        'sort_direction': 'DESC' if (sort_type or '').upper() == 'DESC' else 'ASC',
+        'pk_expr': 't.ticket_id'
+    }
 
-    full_query = base_query
-    if where_clauses:
-        full_query += " WHERE " + " AND ".join(where_clauses)
+def build_tickets_list_sql(plan):
+    """Повертає (SQL, параметри) повного списку тікетів за планом з plan_ticket_query."""
+    # Базовий запит із приєднанням (JOIN) для отримання імені хендлера
+    full_query = f"SELECT {plan['columns_sql']} FROM {plan['from_sql']}"
+    if plan['conditions']:
+        full_query += " WHERE " + " AND ".join(plan['conditions'])
         
-    # Додаємо сортування
-    full_query += f" ORDER BY {sort_column} {sort_direction}"
-    
-    conn = get_connection()
-    if conn is None:
-        return ticket_list
+    # Додаємо сортування (первинний ключ - для стабільного порядку однакових значень)
+    full_query += f" ORDER BY {plan['sort_expr']} {plan['sort_direction']}, {plan['pk_expr']} {plan['sort_direction']}"
+    return full_query, plan['params']
+
+# --- ФУНКЦІЯ T1: Для отримання всіх тікетів
+def get_all_tickets(query=None, sort_by=None, sort_type='ASC'):
+    """Повертає всі тікети з таблиці ticketinfo, з можливістю пошуку та сортування."""
+    ticket_list = []
+    full_query, params = build_tickets_list_sql(plan_ticket_query(query, sort_by, sort_type))
+    
+    conn = get_connection()
+    if conn is None:
+        return ticket_list
         
     try:
         with conn.cursor() as cur:
@@ -382,82 +1266,99 @@ def get_all_tickets(query=None, sort_by=None, sort_type='ASC'):
         # print(f"Помилка при отриманні тікетів: {e}")
         pass
     finally:
-        if conn:
-            conn.close()
+        release_connection(conn)
             
     return ticket_list
 
-# --- ФУНКЦІЯ T2: Пошук тікетів за іменем заявника
-def get_tickets_by_multi_search(search_query, sort_by=None, sort_type='ASC'): # <--- ЗМІНА: Додано параметри сортування
-    """Повертає тікети, які відповідають search_query у кількох полях, з сортуванням."""
-    conn = get_connection()
-    if conn is None: return []
-
-    valid_sort_fields = ['ticket_id', 'submitter_username', 'handler_name', 'time_spent', 'resolution_rating']
-    order_column = sort_by if sort_by in valid_sort_fields else 'ticket_id'
-    order_direction = sort_type if sort_type in ('ASC', 'DESC') else 'ASC'
-    
-    # !!! ЗМІНА В SQL-ЗАПИТІ: Додаємо ORDER BY
-    sql = f"""
-    SELECT 
-        t.ticket_id, 
-        t.submitter_username, 
-        h.admin_name AS handler_name, 
-        t.time_spent, 
-        t.resolution_rating
-    FROM public.ticketinfo AS t
-    LEFT JOIN public.helperinfo AS h ON t.handler_helper_id = h.helper_id
-    WHERE 
-        CAST(t.ticket_id AS TEXT) ILIKE %s OR                      
-        t.submitter_username ILIKE %s OR                           
-        h.admin_name ILIKE %s OR                                   
-        CAST(t.time_spent AS TEXT) ILIKE %s OR                     
-        CAST(t.resolution_rating AS TEXT) ILIKE %s                  
-    ORDER BY {order_column} {order_direction};
-    """
-    search_pattern = f"%{search_query}%" 
-    params = (search_pattern, search_pattern, search_pattern, search_pattern, search_pattern)
-
+# --- ФУНКЦІЯ T1 (async): Усі тікети через асинхронний пул ---
+async def get_all_tickets_async(query=None, sort_by=None, sort_type='ASC'):
+    """Асинхронний варіант get_all_tickets (той самий план запиту)."""
+    full_query, params = build_tickets_list_sql(plan_ticket_query(query, sort_by, sort_type))
     try:
-        with conn.cursor() as cur:
-            cur.execute(sql, params)
-            column_names = [desc[0] for desc in cur.description]
-            tickets = cur.fetchall()
-            
-            data = []
-            for row in tickets:
-                data.append(dict(zip(column_names, row)))
-            return data
-
+        return await async_reader.fetch_all(full_query, params)
     except Exception as e:
-        print(f"❌ Помилка читання даних ticketinfo з пошуком: {e}")
+        print(f"Помилка при отриманні тікетів (async): {e}")
         return []
-    finally:
-        if conn: conn.close()
 
-    # Шаблон пошуку, що підходить для всіх 5-ти полів
-    search_pattern = f"%{search_query}%" 
-    
-    # Створюємо кортеж параметрів, повторюючи шаблон 5 разів (для 5-ти %s)
-    params = (search_pattern, search_pattern, search_pattern, search_pattern, search_pattern)
+# --- ФУНКЦІЯ T1a: Сторінка тікетів (keyset-пагінація) ---
+def get_tickets_page(query=None, sort_by=None, sort_type='ASC',
+                     page_size=PAGE_SIZE_DEFAULT, after=None, before=None):
+    """
+    Повертає одну сторінку тікетів з урахуванням пошуку та сортування.
+    Пошук, сортування, сторінка і загальна кількість - один SQL-запит.
+    Результат: словник rows, total_count, next_token, prev_token.
+    """
+    plan = plan_ticket_query(query, sort_by, sort_type)
+
+    return fetch_keyset_page(
+        from_sql=plan['from_sql'],
+        columns_sql=plan['columns_sql'],
+        conditions=plan['conditions'],
+        params=plan['params'],
+        sort_expr=plan['sort_expr'],
+        pk_expr=plan['pk_expr'],
+        sort_by=plan['sort_by'],
+        sort_type=plan['sort_direction'],
+        page_size=page_size,
+        after=after,
+        before=before
+    )
 
-    try:
-        with conn.cursor() as cur:
-            cur.execute(sql, params)
-            column_names = [desc[0] for desc in cur.description]
-            tickets = cur.fetchall()
-            
-            data = []
-            for row in tickets:
-                data.append(dict(zip(column_names, row)))
-            return data
+# --- ФУНКЦІЯ T1b: СТОРІНКА ТІКЕТІВ ЧЕРЕЗ КЕШ (сторінка тікетів та API) ---
+def get_tickets_page_cached(query=None, sort_by=None, sort_type='ASC',
+                            page_size=PAGE_SIZE_DEFAULT, after=None, before=None):
+    """
+    get_tickets_page() через кеш результатів. Імена хендлерів беруться з helperinfo,
+    тому запис залежить від обох таблиць.
+    """
+    return result_cache.get_or_load(
+        ('ticketinfo', 'helperinfo'),
+        ('ticketinfo', query, sort_by, sort_type, None, (page_size, after, before)),
+        lambda: get_tickets_page(
+            query=query, sort_by=sort_by, sort_type=sort_type, page_size=page_size,
+            after=after, before=before
+        ),
+        cacheable=page_loaded
+    )
 
-    except Exception as e:
-        print(f"❌ Помилка читання даних ticketinfo з пошуком: {e}")
-        return []
-    finally:
-        if conn: conn.close()
+# --- ФУНКЦІЯ T1c: Сторінка тікетів через асинхронний пул ---
+async def get_tickets_page_async(query=None, sort_by=None, sort_type='ASC',
+                                 page_size=PAGE_SIZE_DEFAULT, after=None, before=None):
+    """Асинхронний варіант get_tickets_page: лічильник і сторінка виконуються одночасно."""
+    plan = plan_ticket_query(query, sort_by, sort_type)
+
+    return await fetch_keyset_page_async(
+        from_sql=plan['from_sql'],
+        columns_sql=plan['columns_sql'],
+        conditions=plan['conditions'],
+        params=plan['params'],
+        sort_expr=plan['sort_expr'],
+        pk_expr=plan['pk_expr'],
+        sort_by=plan['sort_by'],
+        sort_type=plan['sort_direction'],
+        page_size=page_size,
+        after=after,
+        before=before
+    )
+
+# --- ФУНКЦІЯ T1d: СТОРІНКА ТІКЕТІВ ДЛЯ МАРШРУТІВ (кеш + вибір шляху читання) ---
+def read_tickets_page(query=None, sort_by=None, sort_type='ASC',
+                      page_size=PAGE_SIZE_DEFAULT, after=None, before=None):
+    """Сторінка тікетів з кешу; промах читається асинхронним пулом, якщо ASYNC_READS=1."""
+    if not ASYNC_READS:
+        return get_tickets_page_cached(query, sort_by, sort_type, page_size, after, before)
+    return result_cache.get_or_load(
+        ('ticketinfo', 'helperinfo'),
+        ('ticketinfo', query, sort_by, sort_type, None, (page_size, after, before)),
+        lambda: async_reader.run(get_tickets_page_async(query, sort_by, sort_type, page_size, after, before)),
+        cacheable=page_loaded
+    )
 
+# --- ФУНКЦІЯ T2: Пошук тікетів за іменем заявника
+def get_tickets_by_multi_search(search_query, sort_by=None, sort_type='ASC'):
+    """Повертає тікети, які відповідають search_query у кількох полях, з сортуванням."""
+    # Пошук по всіх полях тепер виконує спільний планувальник запиту
+    return get_all_tickets(query=search_query, sort_by=sort_by, sort_type=sort_type)
 
 
 # ==========================================================
@@ -496,38 +1397,50 @@ def get_all_webadmins(sort_by=None, sort_type='ASC'):
         print(f"❌ Помилка читання даних webadmin: {e}")
         return []
     finally:
-        if conn: conn.close()
+        release_connection(conn)
 
 # --- ФУНКЦІЯ W2: Для пошуку веб-адмінів ---
-def get_webadmins_by_search(search_query, sort_by=None, sort_type='ASC', rank_filter=None):
-    """Повертає веб-адмінів, які відповідають search_query, з сортуванням та фільтрацією за рангом."""
-    conn = get_connection()
-    if conn is None: return []
-
+def build_webadmins_search_sql(search_query, sort_by=None, sort_type='ASC', rank_filter=None):
+    """Повертає (SQL, параметри) пошуку веб-адмінів з сортуванням та фільтром за рангом."""
     valid_sort_fields = ['webadmin_id', 'webadmin_name', 'webadmin_rank']
     order_column = sort_by if sort_by in valid_sort_fields else 'webadmin_id'
     order_direction = sort_type.upper() if sort_type.upper() in ('ASC', 'DESC') else 'ASC'
 
     # Базовий SQL запит
-    sql = f"""
+    sql = """
     SELECT webadmin_id, webadmin_name, webadmin_rank
     FROM public.webadmin 
-    WHERE 
-        (webadmin_name ILIKE %s OR 
-        webadmin_rank ILIKE %s OR
-        CAST(webadmin_id AS TEXT) ILIKE %s)
     """
     
-    search_pattern = f"%{search_query}%" 
-    params = [search_pattern, search_pattern, search_pattern]
+    conditions = []
+    params = []
+    search_sql, search_params = build_search_predicate(
+        search_query,
+        text_columns=['webadmin_name', 'webadmin_rank'],
+        int_columns=['webadmin_id']
+    )
+    if search_sql:
+        conditions.append(search_sql)
+        params.extend(search_params)
     
     # Додаємо фільтр по рангу якщо вказано
     if rank_filter:
-        sql += " AND webadmin_rank = %s"
+        conditions.append("webadmin_rank = %s")
         params.append(rank_filter)
+
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
     
     # Додаємо сортування
     sql += f" ORDER BY {order_column} {order_direction}" 
+    return sql, params
+
+def get_webadmins_by_search(search_query, sort_by=None, sort_type='ASC', rank_filter=None):
+    """Повертає веб-адмінів, які відповідають search_query, з сортуванням та фільтрацією за рангом."""
+    conn = get_connection()
+    if conn is None: return []
+
+    sql, params = build_webadmins_search_sql(search_query, sort_by, sort_type, rank_filter)
 
     try:
         with conn.cursor() as cur:
@@ -544,168 +1457,457 @@ def get_webadmins_by_search(search_query, sort_by=None, sort_type='ASC', rank_fi
         print(f"❌ Помилка читання даних webadmin з пошуком: {e}")
         return []
     finally:
-        if conn: conn.close()
+        release_connection(conn)
 
-# --- ФУНКЦІЯ W3: Оновлення даних веб-адміна (без зміни пароля)
-def update_webadmin_data(webadmin_id, name, rank):
-    """Оновлює ім'я та ранг веб-адміна в таблиці webadmin."""
-    print(f"🔄 Спроба оновити webadmin: ID={webadmin_id}, Name={name}, Rank={rank}")
-    
-    sql = """
-    UPDATE public.webadmin
-    SET webadmin_name = %s, webadmin_rank = %s
-    WHERE webadmin_id = %s;
+# --- ФУНКЦІЯ W2 (async): Пошук веб-адмінів через асинхронний пул ---
+async def get_webadmins_by_search_async(search_query, sort_by=None, sort_type='ASC', rank_filter=None):
+    """Асинхронний варіант get_webadmins_by_search (той самий SQL)."""
+    sql, params = build_webadmins_search_sql(search_query, sort_by, sort_type, rank_filter)
+    try:
+        return await async_reader.fetch_all(sql, params)
+    except Exception as e:
+        print(f"❌ Помилка читання даних webadmin з пошуком (async): {e}")
+        return []
+
+# --- ФУНКЦІЯ W2a: СПИСОК ВЕБ-АДМІНІВ ДЛЯ СТОРІНКИ АДМІНА (кеш + вибір шляху читання) ---
+def read_webadmins(search_query, sort_by, sort_type, rank_filter):
+    """
+    Пошук має пріоритет над фільтром за рангом. Функції W* повертають [] і при
+    помилці БД, тому порожній список не кешується.
+    """
+    key = ('webadmin', search_query, sort_by, sort_type, rank_filter, None)
+    if ASYNC_READS:
+        # Пошук без умов - це повний список, фільтр за рангом - умова пошуку
+        return result_cache.get_or_load(
+            ('webadmin',), key,
+            lambda: async_reader.run(get_webadmins_by_search_async(
+                search_query, sort_by, sort_type, None if search_query else rank_filter
+            )),
+            cacheable=bool
+        )
+
+    def load_webadmins():
+        if search_query:
+            # Використовуємо функцію пошуку з параметрами сортування
+            return get_webadmins_by_search(search_query, sort_by, sort_type)
+        elif rank_filter:
+            # Використовуємо функцію фільтрації за рангом
+            return get_webadmins_by_rank(rank_filter, sort_by, sort_type)
+        # Отримуємо всі дані з параметрами сортування
+        return get_all_webadmins(sort_by, sort_type)
+
+    return result_cache.get_or_load(('webadmin',), key, load_webadmins, cacheable=bool)
+
+# --- ФУНКЦІЯ W3: Оновлення даних веб-адміна
+def update_webadmin_data(webadmin_id, name, rank, password_hash=None):
+    """
+    Оновлює ім'я та ранг веб-адміна в таблиці webadmin; пароль - лише якщо передано
+    password_hash (хеш обчислюється до виклику, див. PasswordHasher).
+    Повертає кількість оновлених рядків (0 - не знайдено) або None при помилці БД.
     """
+    if password_hash:
+        sql = """
+        UPDATE public.webadmin
+        SET webadmin_name = %s, webadmin_rank = %s, webadmin_password = %s
+        WHERE webadmin_id = %s;
+        """
+        params = (name, rank, password_hash, webadmin_id)
+    else:
+        sql = """
+        UPDATE public.webadmin
+        SET webadmin_name = %s, webadmin_rank = %s
+        WHERE webadmin_id = %s;
+        """
+        params = (name, rank, webadmin_id)
+
     conn = get_connection()
-    if conn is None: 
-        print("❌ Помилка: Не вдалося підключитися до бази даних")
-        return False
+    if conn is None: return None
 
     try:
         with conn.cursor() as cur:
-            cur.execute(sql, (name, rank, webadmin_id))
+            cur.execute(sql, params)
             updated_rows = cur.rowcount
-            print(f"✅ Оновлено рядків: {updated_rows}")
-        
         conn.commit()
-        print("✅ Транзакція успішно зафіксована")
-        return True
-        
+        return updated_rows
     except Exception as e:
         print(f"❌ Помилка оновлення даних веб-адміна ID {webadmin_id}: {e}")
         conn.rollback()
-        return False
+        return None
     finally:
-        if conn: 
-            conn.close()
-            print("🔌 З'єднання закрито")
+        release_connection(conn)
 
 # --- ФУНКЦІЯ W4: Видалення веб-адміна
 def delete_webadmin_data(webadmin_id):
-    """Видаляє веб-адміна з таблиці webadmin за ID."""
-    sql = "DELETE FROM public.webadmin WHERE webadmin_id = %s;"
+    """
+    Видаляє веб-адміна з таблиці webadmin за ID.
+    Повертає {'found': bool, 'name': ім'я видаленого} або None при помилці БД.
+    """
+    sql = "DELETE FROM public.webadmin WHERE webadmin_id = %s RETURNING webadmin_name;"
     conn = get_connection()
-    if conn is None: return False
+    if conn is None: return None
 
     try:
         with conn.cursor() as cur:
             cur.execute(sql, (webadmin_id,))
+            row = cur.fetchone()
         conn.commit()
-        return cur.rowcount > 0 
+        return {'found': row is not None, 'name': row[0] if row else None}
     except Exception as e:
         print(f"❌ Помилка видалення веб-адміна ID {webadmin_id}: {e}")
         conn.rollback()
-        return False
+        return None
     finally:
-        if conn: conn.close()
+        release_connection(conn)
 
 # --- ФУНКЦІЯ W5: Додавання нового веб-адміна
-def insert_webadmin_data(name, rank, password):
-    """Додає нового веб-адміна в таблицю webadmin."""
-    # УВАГА: У реальному додатку тут слід використовувати хешування пароля!
+def insert_webadmin_data(name, rank, password_hash):
+    """
+    Додає нового веб-адміна в таблицю webadmin; password_hash - хеш пароля
+    (PasswordHasher.hash). Повертає webadmin_id або None при помилці.
+    """
     sql = """
     INSERT INTO public.webadmin (webadmin_name, webadmin_rank, webadmin_password)
-    VALUES (%s, %s, %s);
+    VALUES (%s, %s, %s)
+    RETURNING webadmin_id;
     """
     conn = get_connection()
-    if conn is None: return False
+    if conn is None: return None
 
     try:
         with conn.cursor() as cur:
-            cur.execute(sql, (name, rank, password))
+            cur.execute(sql, (name, rank, password_hash))
+            webadmin_id = cur.fetchone()[0]
         conn.commit()
-        return True
+        return webadmin_id
     except Exception as e:
         print(f"❌ Помилка додавання нового веб-адміна: {e}")
         conn.rollback()
-        return False
+        return None
     finally:
-        if conn: conn.close()
+        release_connection(conn)
 
 # --- ФУНКЦІЯ W6: ЛОГУВАННЯ ДІЙ З ДАНИМИ ---
+
+# Журнал дій: рядки пишуться фоновим потоком пачками (див. audit_log.py)
+AUDIT_LOG_PATH = os.environ.get('AUDIT_LOG_PATH', 'app.log')
+audit_log = AuditLogWriter(
+    AUDIT_LOG_PATH,
+    batch_size=int(os.environ.get('AUDIT_LOG_BATCH_SIZE', '100')),
+    flush_interval=float(os.environ.get('AUDIT_LOG_FLUSH_INTERVAL', '1.0'))
+)
+
 def log_action(user_id, username, action, table_name, object_id=None):
     """
     Логує дії користувача у файл у форматі, схожому на CLF.
     Формат: [Час] - [Користувач ID/Ім'я] - [Дія] - [Таблиця] - [ID Об'єкта]
+    Запис у файл відбувається у фоні, запит не чекає на файлову систему.
     """
-    # [22/Nov/2025:16:47:54 +0200]
-    timestamp = datetime.now().strftime('[%d/%b/%Y:%H:%M:%S +0200]')
+    # [22/Nov/2025:16:47:54 +0200] - зміщення береться з локального часового поясу сервера
+    timestamp = datetime.now().astimezone().strftime('[%d/%b/%Y:%H:%M:%S %z]')
     
     # Використовуємо '?' як аналог відсутнього IP у CLF, де 'user_id' це 'remote_logname'
+    # Один запис - один рядок (повідомлення pg_dump бувають багаторядковими)
+    object_id = ' '.join(str(object_id).split())
     log_entry = f"? {user_id} {username} {timestamp} \"{action} {table_name} ID:{object_id}\"\n"
     
+    after_commit(audit_log.write, log_entry)
+
+# --- ФУНКЦІЯ W7: РЕЗЕРВНЕ КОПІЮВАННЯ БАЗИ ДАНИХ (фонові задачі) ---
+
+# Каталог бекапів та формат pg_dump: plain (.sql, як і раніше), custom (.dump)
+# або directory (-Fd, паралельний - вмикається явно, BACKUP_FORMAT=directory)
+BACKUP_DIR = os.environ.get('BACKUP_DIR', 'backups')
+BACKUP_FORMAT = os.environ.get('BACKUP_FORMAT', 'plain').lower()
+# Кількість паралельних процесів pg_dump (-j); працює лише для формату directory
+BACKUP_JOBS = int(os.environ.get('BACKUP_JOBS', str(min(4, os.cpu_count() or 1))))
+# Скільки бекапів може виконуватися одночасно в одному процесі
+BACKUP_MAX_WORKERS = int(os.environ.get('BACKUP_MAX_WORKERS', '1'))
+# Ключ advisory-блокування: не більше одного бекапу бази даних одночасно (на всі воркери)
+BACKUP_LOCK_KEY = 7_340_002
+
+# Формат -> (ключ -F для pg_dump, розширення файлу)
+BACKUP_FORMATS = {
+    'plain': ('p', '.sql'),
+    'custom': ('c', '.dump'),
+    'directory': ('d', ''),
+}
+
+BACKUP_JOB_COLUMNS_SQL = """
+    job_id, database_name, state, backup_format, output_path, output_size, message,
+    requested_by_id, requested_by_name, submitted_at, started_at, finished_at,
+    EXTRACT(EPOCH FROM (COALESCE(finished_at, now()) - started_at)) AS duration_seconds
+"""
+
+_backup_executor = None
+_backup_executor_pid = None
+_backup_executor_lock = threading.Lock()
+
+def get_backup_executor():
+    """
+    Обмежений пул потоків для бекапів. Як і пул з'єднань, створюється при першому
+    зверненні та заново після fork (потоки батьківського процесу не успадковуються).
+    """
+    global _backup_executor, _backup_executor_pid
+    pid = os.getpid()
+    if _backup_executor is None or _backup_executor_pid != pid:
+        with _backup_executor_lock:
+            if _backup_executor is None or _backup_executor_pid != pid:
+                _backup_executor = ThreadPoolExecutor(
+                    max_workers=BACKUP_MAX_WORKERS,
+                    thread_name_prefix='backup'
+                )
+                _backup_executor_pid = pid
+    return _backup_executor
+
+def serialize_backup_job(job):
+    """Перетворює рядок backup_jobs на JSON-сумісний словник."""
+    data = dict(job)
+    data['job_id'] = str(data['job_id'])
+    for key in ('submitted_at', 'started_at', 'finished_at'):
+        if data[key] is not None:
+            data[key] = data[key].isoformat()
+    if data['duration_seconds'] is not None:
+        data['duration_seconds'] = round(float(data['duration_seconds']), 1)
+    return data
+
+def get_backup_jobs(limit=20):
+    """Повертає останні задачі резервного копіювання (нові зверху)."""
+    conn = get_connection()
+    if conn is None: return []
+
     try:
-        # Відкриваємо файл логування в режимі додавання (append)
-        with open('app.log', 'a', encoding='utf-8') as f:
-            f.write(log_entry)
-    except Exception as e:
-        print(f"Помилка логування: {e}")
+        with conn.cursor(row_factory=psycopg.rows.dict_row) as cur:
+            cur.execute(
+                f"SELECT {BACKUP_JOB_COLUMNS_SQL} FROM public.backup_jobs "
+                "ORDER BY submitted_at DESC LIMIT %s;",
+                (limit,)
+            )
+            return [serialize_backup_job(job) for job in cur.fetchall()]
+    except psycopg.Error as e:
+        print(f"❌ Помилка отримання задач резервного копіювання: {e}")
+        return []
+    finally:
+        release_connection(conn)
+
+def get_backup_job(job_id):
+    """Повертає одну задачу резервного копіювання або None."""
+    conn = get_connection()
+    if conn is None: return None
+
+    try:
+        with conn.cursor(row_factory=psycopg.rows.dict_row) as cur:
+            cur.execute(
+                f"SELECT {BACKUP_JOB_COLUMNS_SQL} FROM public.backup_jobs WHERE job_id = %s;",
+                (job_id,)
+            )
+            job = cur.fetchone()
+            return serialize_backup_job(job) if job else None
+    except psycopg.Error as e:
+        print(f"❌ Помилка отримання задачі резервного копіювання {job_id}: {e}")
+        return None
+    finally:
+        release_connection(conn)
+
+def fetch_active_backup_job(cur):
+    """Активна (queued/running) задача бекапу поточної БД або None; cur - курсор з dict_row."""
+    cur.execute(
+        f"SELECT {BACKUP_JOB_COLUMNS_SQL} FROM public.backup_jobs "
+        "WHERE database_name = %s AND state IN ('queued', 'running') "
+        "ORDER BY submitted_at DESC LIMIT 1;",
+        (DB_NAME,)
+    )
+    return cur.fetchone()
 
-# --- ФУНКЦІЯ W7: РЕЗЕРВНОГО КОПІЮВАННЯ БАЗИ ДАНИХ ---
-def backup_database():
+def submit_backup_job(user_id, username):
     """
-    Створює резервну копію бази даних PostgreSQL за допомогою pg_dump.
+    Ставить бекап у чергу фонових задач і одразу повертає (job, created, message).
+    Якщо для бази даних вже є активна задача, нова не створюється - повертається існуюча.
+    Дані користувача передаються явно: у фоновому потоці немає сесії Flask.
     """
-    # Шлях, де будуть зберігатися бекапи (створюємо підпапку 'backups')
-    backup_dir = 'backups'
-    os.makedirs(backup_dir, exist_ok=True)
-    
-    # Формат імені файлу: wdb_backup_20251122_183000.sql
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_file = os.path.join(backup_dir, f"{DB_NAME}_backup_{timestamp}.sql")
+    if BACKUP_FORMAT not in BACKUP_FORMATS:
+        return None, False, f"Невідомий формат бекапу: {BACKUP_FORMAT}. Допустимі: {', '.join(BACKUP_FORMATS)}."
 
+    # Окреме з'єднання: задача має бути зафіксована до того, як її побачить фоновий потік,
+    # а advisory-блокування сесійне
+    conn = get_pool_connection()
+    if conn is None:
+        return None, False, "Помилка підключення до бази даних."
+
+    try:
+        with conn.cursor(row_factory=psycopg.rows.dict_row) as cur:
+            # Якщо блокування вільне, ніхто зараз не робить бекап цієї БД:
+            # 'running' без блокування - залишок процесу, що завершився під час бекапу
+            cur.execute("SELECT pg_try_advisory_lock(%s, hashtext(%s)) AS free;", (BACKUP_LOCK_KEY, DB_NAME))
+            if cur.fetchone()['free']:
+                cur.execute("SELECT pg_advisory_unlock(%s, hashtext(%s));", (BACKUP_LOCK_KEY, DB_NAME))
+                cur.execute("""
+                    UPDATE public.backup_jobs
+                    SET state = 'failed', finished_at = now(),
+                        message = 'Задачу перервано: процес завершився до закінчення бекапу.'
+                    WHERE database_name = %s
+                      AND (state = 'running' OR (state = 'queued' AND submitted_at < now() - interval '1 hour'));
+                """, (DB_NAME,))
+
+            active = fetch_active_backup_job(cur)
+            if active:
+                conn.commit()
+                return serialize_backup_job(active), False, "Резервне копіювання цієї бази даних уже виконується."
+
+            # Унікальний індекс backup_jobs_active_idx: друга активна задача - UniqueViolation
+            cur.execute(
+                f"""
+                INSERT INTO public.backup_jobs
+                    (job_id, database_name, backup_format, requested_by_id, requested_by_name)
+                VALUES (%s, %s, %s, %s, %s)
+                RETURNING {BACKUP_JOB_COLUMNS_SQL};
+                """,
+                (uuid.uuid4(), DB_NAME, BACKUP_FORMAT, user_id, username)
+            )
+            job = cur.fetchone()
+        conn.commit()
+    except psycopg.errors.UniqueViolation:
+        # Інший воркер поставив задачу між перевіркою та INSERT - повертаємо її
+        conn.rollback()
+        try:
+            with conn.cursor(row_factory=psycopg.rows.dict_row) as cur:
+                active = fetch_active_backup_job(cur)
+            conn.commit()
+        except psycopg.Error as e:
+            conn.rollback()
+            print(f"❌ Помилка читання активної задачі резервного копіювання: {e}")
+            active = None
+        if active is None:
+            return None, False, "Задачу резервного копіювання вже поставлено, спробуйте оновити сторінку."
+        return serialize_backup_job(active), False, "Резервне копіювання цієї бази даних уже виконується."
+    except psycopg.Error as e:
+        conn.rollback()
+        print(f"❌ Помилка створення задачі резервного копіювання: {e}")
+        return None, False, f"Помилка створення задачі резервного копіювання: {e}"
+    finally:
+        put_pool_connection(conn)
+
+    get_backup_executor().submit(run_backup_job, job['job_id'], job['backup_format'], user_id, username)
+    return serialize_backup_job(job), True, "Резервне копіювання запущено у фоновому режимі."
+
+def get_path_size(path):
+    """Розмір файлу або сумарний розмір каталогу (формат directory) у байтах."""
+    if os.path.isdir(path):
+        return sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, files in os.walk(path)
+            for name in files
+        )
+    return os.path.getsize(path)
+
+def remove_backup_output(path):
+    """Видаляє незавершений бекап, щоб у каталозі не залишалися биті копії."""
+    try:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+    except OSError as e:
+        print(f"⚠️ Не вдалося видалити незавершений бекап {path}: {e}")
+
+def run_pg_dump(output_path, backup_format):
+    """
+    Запускає pg_dump у вказаний файл/каталог. Повертає (success, message).
+    Для формату directory дамп виконується паралельно в BACKUP_JOBS процесів.
+    """
     if not os.path.exists(PG_DUMP_PATH):
-        error_msg = f"Файл pg_dump не знайдено за шляхом: {PG_DUMP_PATH}. Перевірте константу PG_DUMP_PATH."
-        log_action(session.get('webadmin_id'), session.get('username'), 
-                   'BACKUP_FAILED', 'database', error_msg)
-        return False, error_msg
-    
-    # Будуємо команду pg_dump
-    # Ми використовуємо змінні середовища для передачі облікових даних pg_dump
+        return False, f"Файл pg_dump не знайдено за шляхом: {PG_DUMP_PATH}. Перевірте змінну PG_DUMP_PATH."
+
+    format_flag, _ = BACKUP_FORMATS[backup_format]
     command = [
         PG_DUMP_PATH,
         '-h', DB_HOST,
         '-p', DB_PORT,
         '-U', DB_USER,
         '-d', DB_NAME,
-        '-f', backup_file,
-        '-F', 'p' # Вивід у plain text SQL-файл
+        '-f', output_path,
+        '-F', format_flag
     ]
-    
-    # Визначаємо змінні середовища для процесу (включаючи пароль)
+    if backup_format == 'directory' and BACKUP_JOBS > 1:
+        command += ['-j', str(BACKUP_JOBS)]
+
+    # Пароль передається pg_dump через змінну середовища PGPASSWORD
     env_vars = os.environ.copy()
-    env_vars['PGPASSWORD'] = DB_PASSWORD # Пароль передається через PGPASSWORD
-    
-    try:
-        # Запускаємо команду
-        process = subprocess.run(command, env=env_vars, check=True, capture_output=True, text=True)
-        
-        # Перевірка результату
-        if process.returncode == 0:
-            log_action(session.get('webadmin_id'), session.get('username'), 
-                       'BACKUP', 'database', backup_file)
-            return True, f"Успішно створено бекап: {backup_file}"
-        else:
-            log_action(session.get('webadmin_id'), session.get('username'), 
-                       'BACKUP_FAILED', 'database', f"Помилка: {process.stderr}")
-            return False, f"Помилка pg_dump: {process.stderr}"
+    env_vars['PGPASSWORD'] = DB_PASSWORD
 
+    try:
+        subprocess.run(command, env=env_vars, check=True, capture_output=True, text=True)
+        return True, f"Успішно створено бекап: {output_path}"
     except FileNotFoundError:
-        log_action(session.get('webadmin_id'), session.get('username'), 
-                   'BACKUP_FAILED', 'database', 'Утиліта pg_dump не знайдена. Переконайтеся, що PostgreSQL bin dir додано до PATH.')
         return False, "Помилка: Утиліта pg_dump не знайдена (перевірте PATH)."
     except subprocess.CalledProcessError as e:
-        log_action(session.get('webadmin_id'), session.get('username'), 
-                   'BACKUP_FAILED', 'database', f"Помилка: {e.stderr}")
-        return False, f"Помилка виконання команди: {e.stderr}"
+        return False, f"Помилка pg_dump: {e.stderr}"
     except Exception as e:
-        log_action(session.get('webadmin_id'), session.get('username'), 
-                   'BACKUP_FAILED', 'database', f"Невідома помилка: {e}")
         return False, f"Невідома помилка: {e}"
-    except FileNotFoundError:
-        log_action(session.get('webadmin_id'), session.get('username'), 
-                   'BACKUP_FAILED', 'database', 'Перевірте, чи коректно вказано шлях до pg_dump.')
-        return False, "Помилка: Перевірте, чи коректно вказано шлях до pg_dump."
+
+def run_backup_job(job_id, backup_format, user_id, username):
+    """
+    Тіло фонової задачі; backup_format - формат, збережений у задачі при постановці. Поки йде дамп, з'єднання тримає advisory-блокування
+    бази даних, тому паралельний бекап тієї ж БД з іншого воркера неможливий.
+    Якщо процес впаде, блокування зніметься разом із сесією PostgreSQL.
+    """
+    conn = get_connection()
+    if conn is None:
+        print(f"❌ Задача бекапу {job_id}: немає підключення до бази даних.")
+        return
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_lock(%s, hashtext(%s));", (BACKUP_LOCK_KEY, DB_NAME))
+            locked = cur.fetchone()[0]
+            if not locked:
+                cur.execute("""
+                    UPDATE public.backup_jobs
+                    SET state = 'failed', finished_at = now(), message = %s
+                    WHERE job_id = %s;
+                """, ("Інший бекап цієї бази даних уже виконується.", job_id))
+                conn.commit()
+                return
+
+            try:
+                os.makedirs(BACKUP_DIR, exist_ok=True)
+                # Формат імені: wdb_backup_20251122_183000.sql (для directory - каталог без розширення)
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                _, extension = BACKUP_FORMATS[backup_format]
+                output_path = os.path.join(BACKUP_DIR, f"{DB_NAME}_backup_{timestamp}{extension}")
+
+                cur.execute("""
+                    UPDATE public.backup_jobs
+                    SET state = 'running', started_at = now(), output_path = %s
+                    WHERE job_id = %s;
+                """, (output_path, job_id))
+                conn.commit()
+
+                success, message = run_pg_dump(output_path, backup_format)
+                if success:
+                    output_size = get_path_size(output_path)
+                    log_action(user_id, username, 'BACKUP', 'database', output_path)
+                else:
+                    output_size = None
+                    remove_backup_output(output_path)
+                    log_action(user_id, username, 'BACKUP_FAILED', 'database', message)
+
+                cur.execute("""
+                    UPDATE public.backup_jobs
+                    SET state = %s, finished_at = now(), output_size = %s, message = %s
+                    WHERE job_id = %s;
+                """, ('success' if success else 'failed', output_size, message, job_id))
+                conn.commit()
+            finally:
+                if conn.info.transaction_status != psycopg.pq.TransactionStatus.IDLE:
+                    conn.rollback()
+                cur.execute("SELECT pg_advisory_unlock(%s, hashtext(%s));", (BACKUP_LOCK_KEY, DB_NAME))
+                conn.commit()
+    except Exception as e:
+        # Виняток у потоці пулу інакше зник би безслідно
+        print(f"❌ Помилка виконання задачі бекапу {job_id}: {e}")
+        log_action(user_id, username, 'BACKUP_FAILED', 'database', f"Невідома помилка: {e}")
+    finally:
+        release_connection(conn)
 
 # --- ФУНКЦІЯ W8: Для отримання веб-адмінів з фільтрацією за рангом ---
 def get_webadmins_by_rank(rank_filter=None, sort_by=None, sort_type='ASC'):
@@ -754,38 +1956,124 @@ def get_webadmins_by_rank(rank_filter=None, sort_by=None, sort_type='ASC'):
         print(f"❌ Помилка читання даних webadmin з фільтром за рангом: {e}")
         return []
     finally:
-        if conn: 
-            conn.close()
+        release_connection(conn)
 
 # --- ФУНКЦІЯ W9: Для перевірки облікових даних webadmin
+
+# Хешування паролів у фоновому пулі (див. passwords.py). Метод - у форматі werkzeug:
+# 'scrypt' (за замовчуванням), 'scrypt:65536:8:1', 'pbkdf2:sha256:600000' тощо
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+# Скільки паролів хешується одночасно та скільки секунд запит може чекати своєї черги
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.environ.get('PASSWORD_HASH_QUEUE_TIMEOUT', '5'))
+# Тимчасово приймати паролі, що зберігаються простим текстом (вони перехешовуються при вході).
+# Вимкнено за замовчуванням: такі паролі переводяться в хеші командою flask hash-plaintext-passwords
+PASSWORD_ALLOW_PLAINTEXT = os.environ.get('PASSWORD_ALLOW_PLAINTEXT', '0') == '1'
+
+password_hasher = PasswordHasher(
+    PASSWORD_HASH_METHOD,
+    max_workers=PASSWORD_HASH_WORKERS,
+    queue_timeout=PASSWORD_HASH_QUEUE_TIMEOUT,
+    allow_plaintext=PASSWORD_ALLOW_PLAINTEXT
+)
+
 def check_webadmin_credentials(username, password):
     """
     Перевіряє облікові дані webadmin в таблиці public.webadmin.
-    
-    УВАГА: ЦЯ ФУНКЦІЯ ПЕРЕВІРЯЄ ПАРОЛЬ ЯК ПРОСТИЙ ТЕКСТ. 
-    У РЕАЛЬНОМУ ПРОЄКТІ ВИ ПОВИННІ ВИКОРИСТОВУВАТИ ХЕШУВАННЯ (наприклад, bcrypt)!
+    Повертає {'webadmin_id', 'webadmin_name', 'webadmin_rank'} або None, якщо ім'я
+    чи пароль невірні. RuntimeError - помилка БД, TimeoutError - пул хешування перевантажений.
+    Хеш із застарілими параметрами (або, при PASSWORD_ALLOW_PLAINTEXT=1, пароль простим
+    текстом) після успішного входу замінюється хешем поточним методом.
     """
-    sql = "SELECT webadmin_id, webadmin_name FROM public.webadmin WHERE webadmin_name = %s AND webadmin_password = %s;"
-    conn = get_connection()
-    if conn is None: return None # Помилка підключення
+    sql = "SELECT webadmin_id, webadmin_name, webadmin_rank, webadmin_password FROM public.webadmin WHERE webadmin_name = %s;"
+    # Окреме з'єднання, щоб повернути його в пул до перевірки хешу, яка навантажує CPU
+    conn = get_pool_connection()
+    if conn is None:
+        raise RuntimeError('Помилка підключення до бази даних.')
 
     try:
-        with conn.cursor() as cur:
+        with conn.cursor(row_factory=psycopg.rows.dict_row) as cur:
             # Використовуємо параметризований запит для захисту від SQL-ін'єкцій
-            cur.execute(sql, (username, password))
+            cur.execute(sql, (username,))
             admin_data = cur.fetchone()
-            
-            if admin_data:
-                # Повертаємо дані адміністратора (ID та ім'я)
-                return {'webadmin_id': admin_data[0], 'webadmin_name': admin_data[1]}
-            else:
-                return None # Облікові дані невірні
-    except Exception as e:
-        # print(f"❌ Помилка перевірки облікових даних: {e}")
+    except psycopg.Error as e:
+        print(f"❌ Помилка перевірки облікових даних: {e}")
+        raise RuntimeError('Помилка сервера при спробі входу.')
+    finally:
+        put_pool_connection(conn)
+
+    if admin_data is None:
+        return None # Облікові дані невірні
+    stored_password = admin_data.pop('webadmin_password')
+    valid, needs_rehash = password_hasher.verify(stored_password, password)
+    if not valid:
         return None
+    if needs_rehash:
+        rehash_webadmin_password(admin_data['webadmin_id'], stored_password, password)
+    return admin_data
+
+def rehash_webadmin_password(webadmin_id, old_password, password):
+    """Зберігає хеш пароля поточним методом; не змінює рядок, якщо пароль тим часом змінили."""
+    try:
+        new_password = password_hasher.hash(password)
+    except TimeoutError:
+        # Не критично: перехешуємо при наступному вході
+        return False
+
+    conn = get_connection()
+    if conn is None: return False
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "UPDATE public.webadmin SET webadmin_password = %s WHERE webadmin_id = %s AND webadmin_password = %s;",
+                (new_password, webadmin_id, old_password)
+            )
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"❌ Помилка оновлення хешу пароля webadmin ID {webadmin_id}: {e}")
+        conn.rollback()
+        return False
+    finally:
+        release_connection(conn)
+
+# --- ФУНКЦІЯ W9a: Разовий перехід паролів простим текстом на хеші ---
+def hash_plaintext_passwords():
+    """
+    Замінює паролі webadmin, що зберігаються простим текстом, хешами поточним методом.
+    Рядки з хешем werkzeug (будь-яким методом) та порожні паролі не змінюються.
+    Повертає кількість перехешованих паролів; RuntimeError - помилка БД.
+    """
+    conn = get_pool_connection()
+    if conn is None:
+        raise RuntimeError('Помилка підключення до бази даних.')
+
+    converted = 0
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT webadmin_id, webadmin_password FROM public.webadmin "
+                        "WHERE webadmin_password IS NOT NULL AND webadmin_password <> '';")
+            rows = [row for row in cur.fetchall() if not is_password_hash(row[1])]
+        conn.commit()
+
+        for webadmin_id, stored_password in rows:
+            new_password = password_hasher.hash(stored_password)
+            with conn.cursor() as cur:
+                # Пароль, змінений тим часом через панель, не перезаписуємо
+                cur.execute(
+                    "UPDATE public.webadmin SET webadmin_password = %s WHERE webadmin_id = %s AND webadmin_password = %s;",
+                    (new_password, webadmin_id, stored_password)
+                )
+                converted += cur.rowcount
+            conn.commit()
+    except psycopg.Error as e:
+        conn.rollback()
+        print(f"❌ Помилка перехешування паролів: {e}")
+        raise RuntimeError('Помилка бази даних під час перехешування паролів.')
     finally:
-        if conn:
-            conn.close()
+        put_pool_connection(conn)
+    return converted
 
 # --- ФУНКЦІЯ W10: Для отримання рангу WebAdmin
 def get_webadmin_rank(username):
@@ -802,106 +2090,925 @@ def get_webadmin_rank(username):
         print(f"Помилка отримання рангу webadmin: {e}")
         return None
     finally:
-        if conn:
-            conn.close()
-
-# --- НАЛАШТУВАННЯ FLASK ---
-app = Flask(__name__)
-# Встановлюємо Secret Key для Flash-повідомлень (якщо знадобиться)
-app.config['SECRET_KEY'] = 'a_very_secret_key_that_is_long_and_random' 
+        release_connection(conn)
 
 # ==========================================================
-# --- МАРШРУТИ: Сторінки login ---
+# Потоковий експорт (серверний курсор -> XLSX/CSV частинами)
 # ==========================================================
 
-# --- МАРШРУТ 1: СТОРІНКА ВХОДУ (login) ---
-@app.route('/login', methods=['GET', 'POST'])
-def login():
-    title = 'Вхід'
-    error = None
-    if request.method == 'POST':
-        username = request.form['username']
-        password = request.form['password']
-        
-        conn = get_connection()
-        if conn:
-            try:
-                with conn.cursor(row_factory=psycopg.rows.dict_row) as cur:
-                    cur.execute("SELECT webadmin_id, webadmin_name, webadmin_rank, webadmin_password FROM webadmin WHERE webadmin_name = %s", (username,))
-                    result = cur.fetchone()
-                
-                # --- ЗМІНА ТУТ: ВИКОРИСТАННЯ check_password_hash ---
-                if result and check_password_hash(result['webadmin_password'], password): 
-                    # Вхід успішний
-                    session['logged_in'] = True
-                    session['username'] = result['webadmin_name']
-                    session['webadmin_id'] = result['webadmin_id']
-                    session['user_rank'] = result['webadmin_rank'] # Додано для адмін-панелі
-                    return redirect(url_for('home'))
-                else:
-                    error = 'Невірне ім\'я користувача або пароль.'
-                # ---------------------------------------------------
+# Скільки рядків забирати з серверного курсора за один FETCH
+EXPORT_FETCH_SIZE = int(os.environ.get('EXPORT_FETCH_SIZE', '2000'))
 
-            except Exception as e:
-                # print(f"Помилка входу: {e}")
-                error = 'Помилка сервера при спробі входу.'
-                
-    # Якщо rank не встановлено, встановлюємо 'Guest' для коректного відображення навігації
-    user_rank = session.get('user_rank', 'Guest')
-    return render_template('login.html', title=title, error=error, user_rank=user_rank)
+class QueryBatches:
+    """
+    Партії рядків (списки словників) з іменованого серверного курсора.
+    У пам'яті одночасно тримається лише одна партія, незалежно від розміру таблиці.
+    Об'єкт створює open_query_batches ще до відповіді; з'єднання повертається в пул
+    при вичерпанні або при close() (повторний виклик нічого не робить).
+    """
 
-# --- Маршрут 2: Для виходу ---
-@app.route('/logout')
-def logout():
-    session.pop('logged_in', None)
-    session.pop('username', None)
-    session.pop('webadmin_id', None)
-    return redirect(url_for('login')) 
+    def __init__(self, conn, cur, first_batch, fetch_size):
+        self._conn = conn
+        self._cur = cur
+        self._first_batch = first_batch
+        self._fetch_size = fetch_size
+
+    def __iter__(self):
+        try:
+            batch, self._first_batch = self._first_batch, None
+            while batch:
+                yield batch
+                batch = self._cur.fetchmany(self._fetch_size)
+        finally:
+            self.close()
+
+    def close(self):
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        try:
+            self._cur.close()
+        except psycopg.Error as e:
+            print(f"❌ Помилка закриття курсора експорту: {e}")
+        put_pool_connection(conn)
+
+def open_query_batches(sql, params, fetch_size=EXPORT_FETCH_SIZE):
+    """
+    Відкриває серверний курсор окремим з'єднанням (не з'єднанням запиту) і читає першу
+    партію ДО відправлення заголовків відповіді: помилку підключення чи запиту ще можна
+    показати користувачеві, а не віддати обрізаний файл зі статусом 200.
+    Повертає QueryBatches або None при помилці.
+    """
+    conn = get_pool_connection()
+    if conn is None:
+        print("❌ Не вдалося підключитися до бази даних для експорту.")
+        return None
 
-# ==========================================================
-# --- МАРШРУТИ: Сторінки ticketinfo ---
-# ==========================================================
+    try:
+        # Іменований курсор живе на сервері в межах транзакції; FETCH забирає по fetch_size рядків
+        cur = conn.cursor(name=f"export_{uuid.uuid4().hex}", row_factory=psycopg.rows.dict_row)
+        cur.itersize = fetch_size
+        cur.execute(sql, params)
+        first_batch = cur.fetchmany(fetch_size)
+    except psycopg.Error as e:
+        print(f"❌ Помилка запиту експорту: {e}")
+        put_pool_connection(conn)
+        return None
+
+    return QueryBatches(conn, cur, first_batch, fetch_size)
+
+def stream_csv(header, batches, row_builder):
+    """
+    Генератор закодованих частин CSV (роздільник ';'): спершу BOM та заголовок,
+    далі по одній частині на кожну партію рядків.
+    """
+    buffer = io.StringIO()
+    # Використовуємо крапку з комою (;) та BOM для сумісності з українським Excel
+    writer = csv.writer(buffer, delimiter=';')
+
+    writer.writerow(header)
+    yield ('\ufeff' + buffer.getvalue()).encode('utf-8')
+
+    try:
+        for batch in batches:
+            buffer.seek(0)
+            buffer.truncate(0)
+            writer.writerows(row_builder(row) for row in batch)
+            yield buffer.getvalue().encode('utf-8')
+    finally:
+        # Якщо клієнт перервав завантаження - закриваємо курсор і повертаємо з'єднання в пул
+        batches.close()
+
+def download_response(chunks, filename, mimetype):
+    """Потокова відповідь-завантаження: перший байт відправляється одразу, без буферизації файлу."""
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'X-Accel-Buffering': 'no'  # не буферизувати відповідь у проксі (nginx)
+        }
+    )
+
+def export_response(header, batches, row_builder, basename):
+    """
+    Експорт у форматі з параметра ?format=: за замовчуванням нативний .xlsx
+    (числові колонки - числа, а не текст), ?format=csv - CSV для старих скриптів.
+    """
+    if request.args.get('format', 'xlsx').lower() == 'csv':
+        chunks = stream_csv(header, batches, row_builder)
+        response = download_response(chunks, f'{basename}.csv', 'text/csv; charset=utf-8')
+    else:
+        chunks = stream_xlsx(header, batches, row_builder, sheet_name=basename)
+        response = download_response(chunks, f'{basename}.xlsx', XLSX_MIMETYPE)
+
+    # Якщо відповідь закрито до першої ітерації, генератор не дійде до свого finally
+    response.call_on_close(batches.close)
+    return response
+
+# ==========================================================
+# Масовий імпорт HelperInfo / TicketInfo (COPY у проміжну таблицю)
+# ==========================================================
+
+IMPORT_MODES = ('upsert', 'append')
+# Скільки помилок рядків повертати у звіті (решта лише рахується)
+IMPORT_MAX_REPORTED_ERRORS = int(os.environ.get('IMPORT_MAX_REPORTED_ERRORS', '500'))
+SMALLINT_MAX = 32767
+INTEGER_MAX = 2147483647
+
+# Поле -> допустимі заголовки колонки: як в експорті (export_helperinfo/export_ticketinfo) або назва колонки БД
+HELPER_IMPORT_COLUMNS = {
+    'helper_id': ('ID', 'helper_id'),
+    'admin_name': ("Ім'я Адміна", 'admin_name'),
+    'admin_rank': ('Ранг', 'admin_rank'),
+    'warnings_count': ('Попередження', 'warnings_count'),
+}
+TICKET_IMPORT_COLUMNS = {
+    'ticket_id': ('ID_Тікета', 'ticket_id'),
+    'submitter_username': ('Користувач', 'submitter_username'),
+    'handler_helper_id': ('Хендлер_ID', 'handler_helper_id'),
+    'time_spent': ('Витрачений_час_(хв)', 'time_spent'),
+    'resolution_rating': ('Оцінка_вирішення', 'resolution_rating'),
+}
+
+def read_import_rows(stream, filename):
+    """
+    Генератор рядків файлу імпорту (списки значень), перший рядок - заголовок.
+    .xlsx читається з першого аркуша, інакше файл вважається CSV (UTF-8, з BOM чи без)
+    з роздільником ';' як в експорті або ','.
+    """
+    if filename.lower().endswith('.xlsx'):
+        yield from iter_xlsx_rows(stream)
+        return
+
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    header_line = text.readline()
+    delimiter = ';' if header_line.count(';') >= header_line.count(',') else ','
+    yield next(csv.reader([header_line], delimiter=delimiter), [])
+    yield from csv.reader(text, delimiter=delimiter)
+
+def map_import_header(header, columns, required):
+    """Номер колонки файлу для кожного знайденого поля; ValueError, якщо обов'язкової колонки немає."""
+    normalized = [str(name).strip().lower() if name is not None else '' for name in header]
+    positions = {}
+    for field, names in columns.items():
+        for name in names:
+            if name.lower() in normalized:
+                positions[field] = normalized.index(name.lower())
+                break
+
+    missing = [columns[field][0] for field in required if field not in positions]
+    if missing:
+        raise ValueError(f"У файлі немає обов'язкових колонок: {', '.join(missing)}.")
+    return positions
+
+def parse_import_int(value, label, errors, minimum=0, maximum=INTEGER_MAX):
+    """Ціле число з клітинки ('12', 12, 12.0); порожня клітинка -> None. Помилку додає в errors."""
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    if isinstance(value, bool):
+        errors.append(f"{label}: очікується ціле число.")
+        return None
+    try:
+        number = float(value)
+        if not number.is_integer():
+            raise ValueError
+        number = int(number)
+    except (TypeError, ValueError, OverflowError):
+        errors.append(f"{label}: очікується ціле число, отримано '{value}'.")
+        return None
+    if not minimum <= number <= maximum:
+        errors.append(f"{label}: значення {number} поза межами {minimum}..{maximum}.")
+        return None
+    return number
+
+def parse_import_text(value, label, errors, max_length=100):
+    """Обов'язковий текст (числа з .xlsx перетворюються на рядок)."""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip() if value is not None else ''
+    if not text:
+        errors.append(f"{label}: значення обов'язкове.")
+    elif len(text) > max_length:
+        errors.append(f"{label}: довжина перевищує {max_length} символів.")
+    return text
+
+def import_cell(values, positions, field):
+    index = positions.get(field)
+    return values[index] if index is not None and index < len(values) else None
+
+def validate_helper_import_row(values, positions, user_rank, mode):
+    """Рядок файлу -> (helper_id, admin_name, admin_rank, warnings_count) та список помилок."""
+    errors = []
+    helper_id = None
+    if mode == 'upsert':
+        helper_id = parse_import_int(import_cell(values, positions, 'helper_id'), 'ID', errors, minimum=1)
+    name = parse_import_text(import_cell(values, positions, 'admin_name'), "Ім'я Адміна", errors)
+    rank = parse_import_text(import_cell(values, positions, 'admin_rank'), 'Ранг', errors, max_length=50)
+    if rank and rank not in RANK_HIERARCHY:
+        errors.append(f"Ранг: невідомий ранг '{rank}' (допустимі: {', '.join(RANK_HIERARCHY)}).")
+    elif rank and not can_edit_rank(user_rank, rank):
+        errors.append(f"Ранг: недостатньо прав для призначення рангу '{rank}'.")
+    warnings = parse_import_int(import_cell(values, positions, 'warnings_count'), 'Попередження', errors)
+    return (helper_id, name, rank, warnings or 0), errors
+
+def validate_ticket_import_row(values, positions, user_rank, mode):
+    """Рядок файлу -> (ticket_id, submitter_username, handler_helper_id, time_spent, resolution_rating) та помилки."""
+    errors = []
+    ticket_id = None
+    if mode == 'upsert':
+        ticket_id = parse_import_int(import_cell(values, positions, 'ticket_id'), 'ID_Тікета', errors, minimum=1)
+    username = parse_import_text(import_cell(values, positions, 'submitter_username'), 'Користувач', errors)
+    handler_id = parse_import_int(import_cell(values, positions, 'handler_helper_id'), 'Хендлер_ID', errors, minimum=1)
+    time_spent = parse_import_int(import_cell(values, positions, 'time_spent'), 'Витрачений_час_(хв)', errors)
+    rating = parse_import_int(import_cell(values, positions, 'resolution_rating'), 'Оцінка_вирішення',
+                              errors, maximum=SMALLINT_MAX)
+    return (ticket_id, username, handler_id, time_spent, rating), errors
+
+def merge_helper_import(cur, user_rank):
+    """
+    Переносить рядки з import_helpers у helperinfo наборними запитами.
+    Повертає (вставлено, оновлено, [(рядок файлу, помилка), ...]).
+    """
+    errors = []
+
+    # Однаковий ID кілька разів у файлі: застосовується останній рядок
+    cur.execute("""
+        DELETE FROM import_helpers s
+        WHERE s.helper_id IS NOT NULL
+          AND EXISTS (SELECT 1 FROM import_helpers d
+                      WHERE d.helper_id = s.helper_id AND d.line_no > s.line_no)
+        RETURNING s.line_no, s.helper_id;
+    """)
+    errors += [(line_no, f"ID {helper_id} повторюється нижче у файлі, рядок пропущено.")
+               for line_no, helper_id in cur.fetchall()]
+
+    # Існуючих співробітників з вищим рангом, ніж у користувача, змінювати не можна
+    protected_ranks = [rank for rank in RANK_HIERARCHY if not can_edit_rank(user_rank, rank)]
+    if protected_ranks:
+        cur.execute("""
+            DELETE FROM import_helpers s
+            USING public.helperinfo h
+            WHERE h.helper_id = s.helper_id AND h.admin_rank = ANY(%s)
+            RETURNING s.line_no, h.admin_rank;
+        """, (protected_ranks,))
+        errors += [(line_no, f"Недостатньо прав для зміни співробітника з рангом '{rank}'.")
+                   for line_no, rank in cur.fetchall()]
+
+    cur.execute("""
+        UPDATE public.helperinfo h
+        SET admin_name = s.admin_name, admin_rank = s.admin_rank, warnings_count = s.warnings_count
+        FROM import_helpers s
+        WHERE h.helper_id = s.helper_id;
+    """)
+    updated = cur.rowcount
+
+    # Нові рядки з явним ID, потім лічильник ID зсувається за них, і лише тоді - рядки без ID
+    cur.execute("""
+        INSERT INTO public.helperinfo (helper_id, admin_name, admin_rank, warnings_count)
+        OVERRIDING SYSTEM VALUE
+        SELECT s.helper_id, s.admin_name, s.admin_rank, s.warnings_count
+        FROM import_helpers s
+        WHERE s.helper_id IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM public.helperinfo h WHERE h.helper_id = s.helper_id)
+        ORDER BY s.line_no;
+    """)
+    inserted = cur.rowcount
+    if inserted:
+        cur.execute("""
+            SELECT setval(pg_get_serial_sequence('public.helperinfo', 'helper_id'),
+                          (SELECT max(helper_id) FROM public.helperinfo));
+        """)
+
+    cur.execute("""
+        INSERT INTO public.helperinfo (admin_name, admin_rank, warnings_count)
+        SELECT s.admin_name, s.admin_rank, s.warnings_count
+        FROM import_helpers s
+        WHERE s.helper_id IS NULL
+        ORDER BY s.line_no;
+    """)
+    inserted += cur.rowcount
+    return inserted, updated, errors
+
+def merge_ticket_import(cur, user_rank):
+    """
+    Переносить рядки з import_tickets у ticketinfo наборними запитами.
+    Повертає (вставлено, оновлено, [(рядок файлу, помилка), ...]).
+    """
+    errors = []
+
+    cur.execute("""
+        DELETE FROM import_tickets s
+        WHERE s.ticket_id IS NOT NULL
+          AND EXISTS (SELECT 1 FROM import_tickets d
+                      WHERE d.ticket_id = s.ticket_id AND d.line_no > s.line_no)
+        RETURNING s.line_no, s.ticket_id;
+    """)
+    errors += [(line_no, f"ID_Тікета {ticket_id} повторюється нижче у файлі, рядок пропущено.")
+               for line_no, ticket_id in cur.fetchall()]
+
+    # Тікет може посилатися лише на існуючого співробітника
+    cur.execute("""
+        DELETE FROM import_tickets s
+        WHERE s.handler_helper_id IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM public.helperinfo h WHERE h.helper_id = s.handler_helper_id)
+        RETURNING s.line_no, s.handler_helper_id;
+    """)
+    errors += [(line_no, f"Хендлер_ID: співробітника з ID {helper_id} не існує.")
+               for line_no, helper_id in cur.fetchall()]
+
+    cur.execute("""
+        UPDATE public.ticketinfo t
+        SET submitter_username = s.submitter_username, handler_helper_id = s.handler_helper_id,
+            time_spent = s.time_spent, resolution_rating = s.resolution_rating
+        FROM import_tickets s
+        WHERE t.ticket_id = s.ticket_id;
+    """)
+    updated = cur.rowcount
+
+    cur.execute("""
+        INSERT INTO public.ticketinfo (ticket_id, submitter_username, handler_helper_id, time_spent, resolution_rating)
+        OVERRIDING SYSTEM VALUE
+        SELECT s.ticket_id, s.submitter_username, s.handler_helper_id, s.time_spent, s.resolution_rating
+        FROM import_tickets s
+        WHERE s.ticket_id IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM public.ticketinfo t WHERE t.ticket_id = s.ticket_id)
+        ORDER BY s.line_no;
+    """)
+    inserted = cur.rowcount
+    if inserted:
+        cur.execute("""
+            SELECT setval(pg_get_serial_sequence('public.ticketinfo', 'ticket_id'),
+                          (SELECT max(ticket_id) FROM public.ticketinfo));
+        """)
+
+    cur.execute("""
+        INSERT INTO public.ticketinfo (submitter_username, handler_helper_id, time_spent, resolution_rating)
+        SELECT s.submitter_username, s.handler_helper_id, s.time_spent, s.resolution_rating
+        FROM import_tickets s
+        WHERE s.ticket_id IS NULL
+        ORDER BY s.line_no;
+    """)
+    inserted += cur.rowcount
+    return inserted, updated, errors
+
+# Тип імпорту -> таблиця, колонки файлу, проміжна таблиця та функції перевірки/злиття
+IMPORT_TARGETS = {
+    'helpers': {
+        'table': 'helperinfo',
+        'columns': HELPER_IMPORT_COLUMNS,
+        'required': ('admin_name', 'admin_rank'),
+        'staging_sql': """
+            CREATE TEMP TABLE import_helpers (
+                line_no integer NOT NULL,
+                helper_id integer,
+                admin_name character varying(100) NOT NULL,
+                admin_rank character varying(50) NOT NULL,
+                warnings_count integer NOT NULL
+            ) ON COMMIT DROP;
+        """,
+        'copy_sql': "COPY import_helpers (line_no, helper_id, admin_name, admin_rank, warnings_count) FROM STDIN",
+        'staging_table': 'import_helpers',
+        'key': 'helper_id',
+        'validate': validate_helper_import_row,
+        'merge': merge_helper_import,
+    },
+    'tickets': {
+        'table': 'ticketinfo',
+        'columns': TICKET_IMPORT_COLUMNS,
+        'required': ('submitter_username',),
+        'staging_sql': """
+            CREATE TEMP TABLE import_tickets (
+                line_no integer NOT NULL,
+                ticket_id integer,
+                submitter_username character varying(100) NOT NULL,
+                handler_helper_id integer,
+                time_spent integer,
+                resolution_rating smallint
+            ) ON COMMIT DROP;
+        """,
+        'copy_sql': ("COPY import_tickets (line_no, ticket_id, submitter_username, handler_helper_id, "
+                     "time_spent, resolution_rating) FROM STDIN"),
+        'staging_table': 'import_tickets',
+        'key': 'ticket_id',
+        'validate': validate_ticket_import_row,
+        'merge': merge_ticket_import,
+    },
+}
+
+def import_table_data(kind, rows, user_rank, mode='upsert'):
+    """
+    Імпортує рядки (перший - заголовок) у helperinfo або ticketinfo.
+
+    Коректні рядки потоком передаються через COPY FROM STDIN у тимчасову таблицю,
+    після чого злиття з основною таблицею виконується кількома наборними запитами
+    в одній транзакції. Рядки з помилками пропускаються і потрапляють у звіт, не
+    перериваючи імпорт. mode='upsert' оновлює рядки з існуючим ID і додає нові,
+    mode='append' ігнорує ID з файлу та лише додає рядки.
+    ValueError - файл не можна імпортувати; помилки БД прокидаються далі.
+    """
+    target = IMPORT_TARGETS[kind]
+    started = datetime.now()
+    rows = iter(rows)
+    header = next(rows, None)
+    if not header:
+        raise ValueError("Файл порожній.")
+    positions = map_import_header(header, target['columns'], target['required'])
+
+    errors = []
+    rows_read = 0
+
+    conn = get_connection()
+    if conn is None:
+        raise RuntimeError("Не вдалося підключитися до бази даних для імпорту.")
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(target['staging_sql'])
+            with cur.copy(target['copy_sql']) as copy:
+                for line_no, values in enumerate(rows, start=2):
+                    if all(value is None or str(value).strip() == '' for value in values):
+                        continue
+                    rows_read += 1
+                    record, row_errors = target['validate'](values, positions, user_rank, mode)
+                    if row_errors:
+                        errors.append((line_no, ' '.join(row_errors)))
+                        continue
+                    copy.write_row((line_no,) + record)
+
+            # Статистика для планувальника: без неї злиття з великою тимчасовою таблицею йде вкладеними циклами
+            cur.execute(f"CREATE INDEX ON {target['staging_table']} ({target['key']});")
+            cur.execute(f"ANALYZE {target['staging_table']};")
+            inserted, updated, merge_errors = target['merge'](cur, user_rank)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        release_connection(conn)
+
+    errors = sorted(errors + merge_errors)
+    return {
+        'table': target['table'],
+        'mode': mode,
+        'rows_read': rows_read,
+        'inserted': inserted,
+        'updated': updated,
+        'failed': len(errors),
+        'errors': [{'line': line_no, 'message': message}
+                   for line_no, message in errors[:IMPORT_MAX_REPORTED_ERRORS]],
+        'errors_truncated': len(errors) > IMPORT_MAX_REPORTED_ERRORS,
+        'duration_seconds': round((datetime.now() - started).total_seconds(), 3)
+    }
+
+def import_summary_text(result):
+    return (f"{result['table']} {result['mode']}: прочитано {result['rows_read']}, "
+            f"додано {result['inserted']}, оновлено {result['updated']}, з помилками {result['failed']}")
+
+# ==========================================================
+# Міграції схеми бази даних
+# ==========================================================
+
+# SQL-файли міграцій (NNNN_назва.sql) застосовуються по черзі за іменем файлу
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+# Ключ advisory-блокування, щоб міграції не запускались паралельно з кількох процесів
+MIGRATIONS_LOCK_KEY = 7_340_001
+
+# Перший рядок міграції, інструкції якої не можна виконувати в транзакції
+# (CREATE INDEX CONCURRENTLY): кожна інструкція виконується окремо в режимі autocommit.
+# Така міграція має бути ідемпотентною - після збою вона виконується знову з початку
+MIGRATION_NO_TRANSACTION_MARKER = '-- migrate: no-transaction'
+
+_DOLLAR_QUOTE_RE = re.compile(r'\$(?:[A-Za-z_][A-Za-z0-9_]*)?\$')
+
+def split_sql_statements(sql_text):
+    """
+    Розбиває SQL-скрипт на інструкції по ';' поза рядками, ідентифікаторами в лапках,
+    коментарями та $$-блоками. Кілька інструкцій одним запитом PostgreSQL виконує
+    як одну транзакцію, тому для міграцій без транзакції їх треба надсилати окремо.
+    """
+    statements = []
+    current = []
+    has_code = False
+    i, length = 0, len(sql_text)
+    while i < length:
+        char = sql_text[i]
+        if sql_text.startswith('--', i) or sql_text.startswith('/*', i):
+            if char == '-':
+                end = sql_text.find('\n', i)
+                end = length if end == -1 else end
+            else:
+                end = sql_text.find('*/', i + 2)
+                end = length if end == -1 else end + 2
+            current.append(sql_text[i:end])
+            i = end
+            continue
+        if char in ("'", '"'):
+            end = i + 1
+            while True:
+                end = sql_text.find(char, end)
+                if end == -1:
+                    end = length
+                    break
+                # Подвоєна лапка всередині рядка
+                if sql_text.startswith(char * 2, end):
+                    end += 2
+                    continue
+                end += 1
+                break
+        elif char == '$' and _DOLLAR_QUOTE_RE.match(sql_text, i):
+            tag = _DOLLAR_QUOTE_RE.match(sql_text, i).group(0)
+            end = sql_text.find(tag, i + len(tag))
+            end = length if end == -1 else end + len(tag)
+        elif char == ';':
+            if has_code:
+                statements.append(''.join(current).strip())
+            current, has_code = [], False
+            i += 1
+            continue
+        else:
+            end = i + 1
+        current.append(sql_text[i:end])
+        has_code = has_code or not sql_text[i:end].isspace()
+        i = end
+    if has_code:
+        statements.append(''.join(current).strip())
+    return statements
+
+def list_migrations():
+    """Повертає відсортований список (версія, шлях) усіх файлів міграцій."""
+    if not os.path.isdir(MIGRATIONS_DIR):
+        return []
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        if filename.endswith('.sql'):
+            migrations.append((filename[:-4], os.path.join(MIGRATIONS_DIR, filename)))
+    return migrations
+
+def apply_migrations():
+    """
+    Застосовує ще не застосовані міграції. Кожна міграція виконується в окремій
+    транзакції (або по інструкції без транзакції, див. MIGRATION_NO_TRANSACTION_MARKER)
+    та записується в таблицю schema_migrations.
+    Повертає список застосованих версій.
+    """
+    applied_now = []
+    conn = get_connection()
+    if conn is None:
+        raise RuntimeError("Не вдалося підключитися до бази даних для міграцій.")
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(%s);", (MIGRATIONS_LOCK_KEY,))
+            conn.commit()
+            try:
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS public.schema_migrations (
+                        version character varying(255) PRIMARY KEY,
+                        applied_at timestamp with time zone NOT NULL DEFAULT now()
+                    );
+                """)
+                cur.execute("SELECT version FROM public.schema_migrations;")
+                applied = {row[0] for row in cur.fetchall()}
+                conn.commit()
+
+                for version, path in list_migrations():
+                    if version in applied:
+                        continue
+                    with open(path, 'r', encoding='utf-8') as f:
+                        migration_sql = f.read()
+                    if migration_sql.lstrip().startswith(MIGRATION_NO_TRANSACTION_MARKER):
+                        conn.autocommit = True
+                        try:
+                            for statement in split_sql_statements(migration_sql):
+                                cur.execute(statement)
+                        finally:
+                            conn.autocommit = False
+                    else:
+                        # Без параметрів psycopg дозволяє кілька команд в одному execute
+                        cur.execute(migration_sql)
+                    cur.execute("INSERT INTO public.schema_migrations (version) VALUES (%s);", (version,))
+                    conn.commit()
+                    applied_now.append(version)
+                    print(f"✅ Застосовано міграцію {version}")
+            finally:
+                # Блокування сесійне: знімаємо його навіть після помилки, бо з'єднання повертається в пул
+                if conn.info.transaction_status != psycopg.pq.TransactionStatus.IDLE:
+                    conn.rollback()
+                cur.execute("SELECT pg_advisory_unlock(%s);", (MIGRATIONS_LOCK_KEY,))
+                conn.commit()
+    finally:
+        release_connection(conn)
+
+    return applied_now
+
+# --- НАЛАШТУВАННЯ FLASK ---
+app = Flask(__name__)
+# Встановлюємо Secret Key для Flash-повідомлень (якщо знадобиться)
+# Ключ має бути однаковим в усіх воркерах, інакше сесія, підписана одним, не прочитається іншим
+app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'a_very_secret_key_that_is_long_and_random')
+# Заголовок X-DB-Statements (кількість SQL-інструкцій запиту) у production вимкнено
+app.config['DB_STATEMENTS_HEADER'] = os.environ.get('DB_STATEMENTS_HEADER', '0') == '1'
+
+def create_app(config=None):
+    """
+    Фабрика застосунку для production-сервера (serve.py) та CLI.
+    Маршрути зареєстровані на рівні модуля; тут застосовуються налаштування.
+    Пул з'єднань, черга журналу та фонові потоки створюються ліниво в кожному
+    процесі-воркері вже після fork (див. init_worker).
+    """
+    if config:
+        app.config.update(config)
+    return app
+
+def init_worker():
+    """
+    Готує ресурси процесу-воркера до першого запиту (викликається після fork):
+    відкриває пули з'єднань і запускає слухача версій таблиць.
+    """
+    get_pool()
+    if ASYNC_READS:
+        async_reader.start()
+    if TABLE_VERSIONS_ENABLED:
+        table_versions.snapshot(())
+
+def shutdown_worker():
+    """Дописує журнали і закриває пули з'єднань при плавному завершенні воркера."""
+    audit_log.close()
+    slow_query_log.close()
+    async_reader.close()
+    close_pool()
+
+# --- МЕТРИКИ ЗАПИТІВ: час обробки та робота з БД по маршрутах ---
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    queries, db_seconds = g.pop('db_stats', (0, 0.0))
+    async_queries, async_seconds = g.pop('async_db_stats', (0, 0.0))
+    metrics.observe_request(
+        # Назва маршруту, а не URL: кількість значень мітки обмежена
+        request.endpoint or 'unmatched',
+        request.method,
+        response.status_code,
+        time.perf_counter() - started,
+        queries + async_queries,
+        db_seconds + async_seconds
+    )
+    return response
+
+if METRICS_ENABLED:
+    app.before_request(start_request_timer)
+    # after_request виконуються у зворотному порядку: цей - після фіксації транзакції запиту
+    app.after_request(record_request_metrics)
+
+# --- ОДИНИЦЯ РОБОТИ ЗАПИТУ: фіксація змін після обробки, повернення з'єднання в пул ---
+@app.after_request
+def commit_db_session(response):
+    db_session = g.pop('db_session', None)
+    if db_session is None:
+        return response
+
+    try:
+        # Необроблений виняток у маршруті (failed) - зміни запиту не фіксуються
+        if not db_session.failed:
+            db_session.commit()
+    finally:
+        # З'єднання повертається одразу, не чекаючи кінця потокової відповіді
+        db_session.close()
+
+    if db_session.failed and response.status_code < 500:
+        # Маршрут уже повідомив про успіх, але COMMIT не вдався
+        message = "Помилка збереження змін у базі даних, зміни не застосовано."
+        if request.path.startswith('/api/'):
+            response = jsonify({'status': 'error', 'message': message})
+            response.status_code = 500
+        else:
+            # Повідомлення маршруту про успіх не повинне з'явитися на наступній сторінці
+            session['_flashes'] = [
+                (category, text) for category, text in session.get('_flashes', []) if category != 'success'
+            ]
+            if response.status_code in (301, 302, 303, 307, 308):
+                # Перенаправлення лишається, про невдачу повідомляє flash на наступній сторінці
+                flash(message, 'error')
+            else:
+                response = Response(message, mimetype='text/plain')
+                response.status_code = 500
+    # Внутрішня деталь - лише для тестів, налагодження та замірів (DB_STATEMENTS_HEADER=1)
+    if app.testing or app.debug or app.config['DB_STATEMENTS_HEADER']:
+        response.headers['X-DB-Statements'] = str(db_session.statements)
+    g.db_stats = (db_session.statements, db_session.db_time)
+    return response
+
+@app.teardown_request
+def close_db_session(exc):
+    # after_request не виконується, якщо обробка запиту перервалася - відкочуємо та повертаємо з'єднання
+    db_session = g.pop('db_session', None)
+    if db_session is not None:
+        db_session.close()
+
+def mark_db_session_failed(sender, exception, **extra):
+    if 'db_session' in g:
+        g.db_session.failed = True
+
+got_request_exception.connect(mark_db_session_failed, app)
+
+# --- КОМАНДА CLI: flask --app app migrate ---
+@app.cli.command('migrate')
+def migrate_command():
+    """Застосовує нові міграції схеми з папки migrations."""
+    applied = apply_migrations()
+    if not applied:
+        print("Схема бази даних актуальна, нових міграцій немає.")
+
+# --- КОМАНДА CLI: flask --app app import-data helpers|tickets ФАЙЛ [--mode append] ---
+@app.cli.command('import-data')
+@click.argument('kind', type=click.Choice(list(IMPORT_TARGETS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--mode', type=click.Choice(IMPORT_MODES), default='upsert', show_default=True,
+              help='upsert - оновити існуючі ID і додати нові; append - лише додати, ігноруючи ID з файлу.')
+def import_data_command(kind, path, mode):
+    """Масово імпортує співробітників або тікети з файлу CSV/XLSX (колонки як в експорті)."""
+    try:
+        with open(path, 'rb') as f:
+            # Командний рядок має повний доступ до БД, тому обмеження рангів - як у SuperAdmin
+            result = import_table_data(kind, read_import_rows(f, path), 'SuperAdmin', mode)
+    except (ValueError, csv.Error) as e:
+        raise click.ClickException(f"Файл не можна імпортувати: {e}")
+
+    log_action(None, 'cli', 'IMPORT', result['table'], import_summary_text(result))
+    invalidate_cached(result['table'])
+
+    for error in result['errors']:
+        print(f"⚠️ Рядок {error['line']}: {error['message']}")
+    if result['errors_truncated']:
+        print(f"⚠️ Показано перші {len(result['errors'])} помилок з {result['failed']}.")
+    print(f"✅ Імпорт {import_summary_text(result)} за {result['duration_seconds']} с.")
+
+# --- КОМАНДА CLI: flask --app app delete-helper ID [--batch-size 5000] ---
+@app.cli.command('delete-helper')
+@click.argument('helper_id', type=int)
+@click.option('--batch-size', type=click.IntRange(min=1), default=HELPER_DELETE_BATCH_SIZE, show_default=True,
+              help='Скільки тікетів видаляти в одній транзакції.')
+def delete_helper_command(helper_id, batch_size):
+    """Видаляє співробітника разом з усіма його тікетами частинами, показуючи прогрес."""
+    started = time.perf_counter()
+
+    def report(deleted, total):
+        print(f"\r🗑️ Тікетів видалено: {deleted}/{total}", end='', flush=True)
+
+    result = delete_helper_data(helper_id, batch_size, report)
+    print()
+    invalidate_cached('ticketinfo')
+    if result is None:
+        raise click.ClickException("Помилка видалення; уже видалені тікети лишаються видаленими, команду можна повторити.")
+    if not result['found']:
+        raise click.ClickException(f"Співробітника ID {helper_id} не знайдено.")
+    invalidate_cached('helperinfo')
+    log_action(None, 'cli', 'DELETE', 'helperinfo', helper_id)
+    print(f"✅ Співробітника ID {helper_id} видалено разом з {result['tickets']} тікетами "
+          f"за {time.perf_counter() - started:.1f} с.")
+
+# --- КОМАНДА CLI: flask --app app hash-plaintext-passwords ---
+@app.cli.command('hash-plaintext-passwords')
+def hash_plaintext_passwords_command():
+    """Разово замінює паролі веб-адмінів, збережені простим текстом, хешами."""
+    try:
+        converted = hash_plaintext_passwords()
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    if converted:
+        invalidate_cached('webadmin')
+        log_action(None, 'cli', 'UPDATE', 'webadmin', f"перехешовано паролів: {converted}")
+    print(f"✅ Паролів простим текстом перехешовано: {converted}.")
+
+# --- КОМАНДА CLI: flask --app app refresh-helper-stats ---
+@app.cli.command('refresh-helper-stats')
+def refresh_helper_stats_command():
+    """Перераховує статистику дашборду з ticketinfo (після змін з вимкненими тригерами)."""
+    started = time.perf_counter()
+    changed = refresh_helper_stats()
+    if changed is None:
+        raise click.ClickException("Не вдалося перерахувати статистику співробітників.")
+    invalidate_cached('ticketinfo')
+    print(f"✅ Статистику перераховано за {time.perf_counter() - started:.1f} с, виправлено рядків: {changed}.")
+
+# ==========================================================
+# --- МАРШРУТИ: Сторінки login ---
+# ==========================================================
+
+# --- МАРШРУТ 1: СТОРІНКА ВХОДУ (login) ---
+@app.route('/login', methods=['GET', 'POST'])
+def login():
+    title = 'Вхід'
+    error = None
+    if request.method == 'POST':
+        username = request.form['username']
+        password = request.form['password']
+        
+        result = None
+        try:
+            # Хеш перевіряється у фоновому пулі; застарілий хеш перехешовується
+            result = check_webadmin_credentials(username, password)
+        except RuntimeError as e:
+            error = str(e)
+        except TimeoutError:
+            error = 'Сервер перевантажений, спробуйте увійти за кілька секунд.'
+
+        if error is None:
+            if result: 
+                # Вхід успішний
+                session['logged_in'] = True
+                session['username'] = result['webadmin_name']
+                session['webadmin_id'] = result['webadmin_id']
+                session['user_rank'] = result['webadmin_rank'] # Додано для адмін-панелі
+                return redirect(url_for('home'))
+            else:
+                error = 'Невірне ім\'я користувача або пароль.'
+                
+    # Якщо rank не встановлено, встановлюємо 'Guest' для коректного відображення навігації
+    user_rank = session.get('user_rank', 'Guest')
+    return render_template('login.html', title=title, error=error, user_rank=user_rank)
+
+# --- Маршрут 2: Для виходу ---
+@app.route('/logout')
+def logout():
+    session.pop('logged_in', None)
+    session.pop('username', None)
+    session.pop('webadmin_id', None)
+    return redirect(url_for('login')) 
+
+# ==========================================================
+# --- МАРШРУТИ: Сторінки ticketinfo ---
+# ==========================================================
 
 # --- МАРШРУТ 3: СТОРІНКА (ticketinfo) ---
 @app.route('/tickets')
 # @login_required 
 def tickets():
-    """Відображає таблицю ticketinfo, з підтримкою пошуку та сортування.""" # <--- ЗМІНА
+    """
+    Відображає таблицю ticketinfo, з підтримкою пошуку, сортування та пагінації.
+    Пошук, сортування, сторінка і лічильник отримуються одним SQL-запитом.
+    """
     
-    search_query = request.args.get('query', '')
-    user_rank = session.get('rank')
+    # Дані не змінювалися з попереднього перегляду - 304 без запиту до БД
+    etag, last_modified = page_validators('ticketinfo', 'helperinfo')
+    cached = not_modified(etag, last_modified)
+    if cached is not None:
+        return cached
 
-    # 1. Отримуємо параметри сортування з URL 
+    # Версії - до читання рядків: фрагмент не потрапить у кеш під новішою версією, ніж його дані
+    versions = current_versions('ticketinfo', 'helperinfo')
+    query = request.args.get('query', '')
+
+    # 1. Отримуємо параметри сортування та сторінки з URL 
     sort_by = request.args.get('sort_by', '')
-    sort_type = request.args.get('sort_type', 'asc').upper() # ASC або DESC
-    
-    if search_query:
-        # 2. Передаємо сортування в функцію пошуку
-        tickets_data = get_tickets_by_multi_search(search_query, sort_by, sort_type) # <--- ЗМІНА
-        main_title = f"Тікети (TicketInfo) - Пошук: '{search_query}'"
+    sort_type = request.args.get('sort_type', 'asc').lower() # asc або desc (як у шаблоні та filterticket.js)
+    page_size = parse_page_size(request.args.get('page_size'))
+
+    # 2. Один запит через спільний планувальник (з кешу, якщо дані не змінювалися):
+    # after/before - токени з посилань пагінації
+    page = read_tickets_page(
+        query=query, sort_by=sort_by, sort_type=sort_type, page_size=page_size,
+        after=request.args.get('after'), before=request.args.get('before')
+    )
+
+    if query:
+        main_title = f"Тікети (TicketInfo) - Пошук: '{query}'"
     else:
-        # 3. Передаємо сортування в функцію отримання всіх даних
-        tickets_data = get_all_tickets(sort_by, sort_type) # <--- ЗМІНА
         main_title = "Тікети (TicketInfo)"
-    
-    item_count = len(tickets_data) # <--- Тимчасовий фікс, якщо була помилка з item_count
-    
-    query = request.args.get('query', '')
 
-    ticket_list = get_all_tickets(query=query, sort_by=sort_by, sort_type=sort_type)
+    # Тіло таблиці не залежить від користувача - фрагмент спільний для всіх
+    table_body = cached_tbody(
+        'tickets-tbody.html', ('ticketinfo', 'helperinfo'), versions,
+        (query, sort_by, sort_type, page_size, request.args.get('after'), request.args.get('before')),
+        cacheable=page_loaded(page),
+        ticket_list=page['rows']
+    )
     
-    return render_template(
+    response = make_response(render_template(
         'tickets.html',
         title='TicketInfo',
         user_rank=session.get('user_rank'),
-        ticket_list=ticket_list,
+        table_body=table_body,
+        main_content_title=main_title,
+        item_count=page['total_count'],
         # Передаємо поточні параметри назад до шаблону для відображення стану фільтра
         active_query=query,
         active_sort_by=sort_by,
-        active_sort_type=sort_type
-    )
-
-# --- МАРШРУТ 4: ЕКСПОРТ TICKETINFO В EXCEL ---
+        active_sort_type=sort_type,
+        page_size=page_size,
+        next_token=page['next_token'],
+        prev_token=page['prev_token']
+    ))
+    # Сторінку з помилкою БД не прив'язуємо до версії: наступний запит має повторити спробу
+    return add_validators(response, etag, last_modified) if page_loaded(page) else response
+
+# --- МАРШРУТ 4: ЕКСПОРТ TICKETINFO (XLSX / CSV) ---
 @app.route('/export-ticketinfo')
 @login_required
 def export_ticketinfo():
@@ -909,41 +3016,28 @@ def export_ticketinfo():
     sort_by = request.args.get('sort_by')
     sort_type = request.args.get('sort_type', 'ASC')
     
-    # Виклик функції з фільтрацією/сортуванням
-    # ПЕРЕВІРТЕ, ЩО get_all_tickets ПРИЙМАЄ ЦІ ПАРАМЕТРИ
-    # Припускаю, що функція get_all_tickets існує
-    ticket_list = get_all_tickets(query=query, sort_by=sort_by, sort_type=sort_type)
+    # Той самий план запиту, що і на сторінці тікетів (фільтрація/сортування)
+    sql, params = build_tickets_list_sql(plan_ticket_query(query, sort_by, sort_type))
 
     # Згідно зі структурою БД (wdb.sql) та tickets.html
     header = ['ID_Тікета', 'Користувач', 'Хендлер_ID', 'Хендлер_Ім\'я', 'Витрачений_час_(хв)', 'Оцінка_вирішення'] 
-    
-    output = io.StringIO()
-    writer = csv.writer(output, delimiter=';') 
-    
-    writer.writerow(header)
-    
-    for ticket in ticket_list:
-        writer.writerow([
+
+    def ticket_row(ticket):
+        return [
             ticket['ticket_id'],
             ticket['submitter_username'],
             ticket['handler_helper_id'],
-            # 'handler_name' є у tickets.html, але може бути відсутній у ticketinfo таблиці, 
-            # тому використовуємо .get() або припускаємо, що він приєднується через JOIN
-            ticket.get('handler_name', 'Невідомий'), 
+            ticket['handler_name'] or 'Невідомий',
             ticket['time_spent'],
             ticket['resolution_rating']
-        ])
+        ]
 
-    output.seek(0)
-    csv_bytes = (u'\ufeff' + output.getvalue()).encode('utf-8')
-    buffer = io.BytesIO(csv_bytes)
-    
-    return send_file(
-        buffer,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name='TicketInfo_Export.xlsx'
-    )
+    batches = open_query_batches(sql, params)
+    if batches is None:
+        flash('Помилка експорту: не вдалося отримати дані з бази даних.', 'error')
+        return redirect(url_for('tickets'))
+
+    return export_response(header, batches, ticket_row, 'TicketInfo_Export')
 
 # ==========================================================
 # --- МАРШРУТИ: Сторінки helperinfo ---
@@ -954,16 +3048,29 @@ def export_ticketinfo():
 @login_required 
 def home():
     """Відображає таблицю helperinfo, з можливістю пошуку та сортування."""
+
+    # Дані не змінювалися з попереднього перегляду - 304 без запиту до БД
+    etag, last_modified = page_validators('helperinfo')
+    cached = not_modified(etag, last_modified)
+    if cached is not None:
+        return cached
     
+    # Версії - до читання рядків (ключ кешу фрагментів)
+    versions = current_versions('helperinfo')
     search_query = request.args.get('query', '')
     
     # Отримуємо параметри сортування з URL
     sort_by = request.args.get('sort_by', '')
     sort_type = request.args.get('sort_type', 'asc')
     rank_filter = request.args.get('rank_filter', '')
+    page_size = parse_page_size(request.args.get('page_size'))
     
-    # Використовуємо одну функцію для отримання даних
-    helpers = get_all_helpers(query=search_query, sort_by=sort_by, sort_type=sort_type, rank_filter=rank_filter)
+    # Одна функція повертає сторінку даних та загальну кількість; повторні перегляди - з кешу
+    page = read_helpers_page(
+        query=search_query, sort_by=sort_by, sort_type=sort_type, rank_filter=rank_filter,
+        page_size=page_size, after=request.args.get('after'), before=request.args.get('before')
+    )
+    helpers = page['rows']
     
     # Формуємо заголовок з урахуванням фільтрів
     if search_query and rank_filter:
@@ -975,30 +3082,41 @@ def home():
     else:
         main_title = "Співробітники (HelperInfo)"
     
-    item_count = len(helpers)
+    item_count = page['total_count']
+    user_rank = session.get('user_rank')
+    col_headers = ["ID", "Ім'я", "Ранг", "Попереджень"]
+
+    # Тіло таблиці - з кешу фрагментів: та сама сторінка рядків рендериться один раз.
+    # Версія таблиці та токен сторінки в ключі однозначно визначають її рядки
+    table_body = cached_tbody(
+        'helpers-tbody.html', ('helperinfo',), versions,
+        (search_query, sort_by, sort_type, rank_filter, page_size,
+         request.args.get('after'), request.args.get('before'), user_rank),
+        cacheable=page_loaded(page),
+        table_data=helpers, col_headers=col_headers, main_content_title=main_title, user_rank=user_rank
+    )
 
-    return render_template('index.html', 
+    response = make_response(render_template('index.html', 
         title="Helper Information", 
-        table_data=helpers,
-        col_headers=["ID", "Ім'я", "Ранг", "Попереджень"],
+        table_body=table_body,
+        col_headers=col_headers,
         main_content_title=main_title,
         sort_by=sort_by,
         sort_type=sort_type,
         rank_filter=rank_filter,
         item_count=item_count,
-        user_rank=session.get('user_rank')
-    )
+        page_size=page_size,
+        next_token=page['next_token'],
+        prev_token=page['prev_token'],
+        user_rank=user_rank
+    ))
+    return add_validators(response, etag, last_modified) if page_loaded(page) else response
 
 # --- МАРШРУТ 6: ОНОВЛЕННЯ ДАНИХ СПІВРОБІТНИКА ---
 @app.route('/update_helper', methods=['POST'])
 @login_required
 @curator_required
 def update_helper():
-    conn = get_connection()
-    if not conn:
-        flash('Помилка підключення до бази даних.', 'error')
-        return redirect(url_for('home'))
-
     helper_id = request.form.get('helper_id')
     admin_name = request.form.get('admin_name')
     admin_rank = request.form.get('admin_rank')
@@ -1022,23 +3140,15 @@ def update_helper():
         flash('Недостатньо прав для встановлення цього рангу.', 'error')
         return redirect(url_for('home'))
     
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                "UPDATE helperinfo SET admin_name = %s, admin_rank = %s, warnings_count = %s WHERE helper_id = %s;",
-                (admin_name, admin_rank, warnings_count, helper_id)
-            )
-            conn.commit()
-            flash('Зміни успішно збережено!', 'success')
-            
-            log_action(session.get('webadmin_id'), session.get('username'), 
-                       'UPDATE', 'helperinfo', helper_id)
-            
-    except psycopg.Error as e:
-        conn.rollback()
-        flash(f'Помилка оновлення даних: {e}', 'error')
-    finally:
-        conn.close()
+    # get_helper_by_id і оновлення працюють в одній транзакції запиту
+    if update_helper_data(helper_id, admin_name, admin_rank, warnings_count):
+        flash('Зміни успішно збережено!', 'success')
+        log_action(session.get('webadmin_id'), session.get('username'), 
+                   'UPDATE', 'helperinfo', helper_id)
+        # Закешовані списки цієї таблиці більше не актуальні
+        after_commit(tables_changed, 'helperinfo')
+    else:
+        flash('Помилка оновлення даних співробітника.', 'error')
         
     return redirect(url_for('home'))
 
@@ -1047,32 +3157,26 @@ def update_helper():
 @login_required
 @manager_required  # Змінено з admin_required
 def delete_helper():
-    conn = get_connection()
-    if not conn:
-        flash('Помилка підключення до бази даних.', 'error')
+    helper_id = request.form.get('helper_id', type=int)
+    if helper_id is None:
+        flash('Некоректний ID співробітника.', 'error')
         return redirect(url_for('home'))
-        
-    helper_id = request.form.get('helper_id')
-    
-    try:
-        with conn.cursor() as cur:
-            cur.execute("DELETE FROM helperinfo WHERE helper_id = %s;", (helper_id,))
-            success = cur.rowcount > 0
-            conn.commit()
-            
-            if success:
-                flash('Співробітника успішно видалено!', 'success')
-                log_action(session.get('webadmin_id'), session.get('username'), 
-                           'DELETE', 'helperinfo', helper_id)
-            else:
-                flash('Співробітника не знайдено.', 'error')
-            
-    except psycopg.Error as e:
-        conn.rollback()
-        flash(f'Помилка видалення співробітника: {e}', 'error')
-    finally:
-        conn.close()
-        
+
+    # Тікети видаляються частинами, кожна фіксується окремо (див. delete_helper_data)
+    result = delete_helper_data(helper_id, on_progress=helper_delete_progress_printer(helper_id))
+
+    # Навіть після помилки частина тікетів могла бути видалена
+    tables_changed('ticketinfo')
+    if result is None:
+        flash('Помилка видалення співробітника. Частину його тікетів могло бути видалено - спробуйте ще раз.', 'error')
+    elif not result['found']:
+        flash('Співробітника не знайдено.', 'error')
+    else:
+        tables_changed('helperinfo')
+        log_action(session.get('webadmin_id'), session.get('username'),
+                   'DELETE', 'helperinfo', helper_id)
+        flash(f"Співробітника успішно видалено разом з тікетами ({result['tickets']})!", 'success')
+
     return redirect(url_for('home'))
 
 # --- МАРШРУТ 8: ДОДАВАННЯ СПІВРОБІТНИКА ---
@@ -1080,11 +3184,6 @@ def delete_helper():
 @login_required
 @manager_required  # Змінено з admin_required
 def add_helper():
-    conn = get_connection()
-    if not conn:
-        flash('Помилка підключення до бази даних.', 'error')
-        return redirect(url_for('home'))
-
     admin_name = request.form.get('admin_name')
     admin_rank = request.form.get('admin_rank')
     warnings_count = request.form.get('warnings_count')
@@ -1095,30 +3194,19 @@ def add_helper():
         flash('Недостатньо прав для створення співробітника з рангом SuperAdmin.', 'error')
         return redirect(url_for('home'))
     
-    new_helper_id = None
-    
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                "INSERT INTO helperinfo (admin_name, admin_rank, warnings_count) VALUES (%s, %s, %s) RETURNING helper_id;",
-                (admin_name, admin_rank, warnings_count)
-            )
-            new_helper_id = cur.fetchone()[0]
-            conn.commit()
-            flash('Співробітника успішно додано!', 'success')
-            
-            log_action(session.get('webadmin_id'), session.get('username'), 
-                       'CREATE', 'helperinfo', new_helper_id)
-            
-    except psycopg.Error as e:
-        conn.rollback()
-        flash(f'Помилка додавання співробітника: {e}', 'error')
-    finally:
-        conn.close()
+    new_helper_id = insert_helper_data(admin_name, admin_rank, warnings_count)
+    if new_helper_id is not None:
+        flash('Співробітника успішно додано!', 'success')
+        log_action(session.get('webadmin_id'), session.get('username'), 
+                   'CREATE', 'helperinfo', new_helper_id)
+        # Закешовані списки цієї таблиці більше не актуальні
+        after_commit(tables_changed, 'helperinfo')
+    else:
+        flash('Помилка додавання співробітника.', 'error')
     
     return redirect(url_for('home'))
 
-# --- МАРШРУТ 9: ЕКСПОРТ HELPERINFO В EXCEL ---
+# --- МАРШРУТ 9: ЕКСПОРТ HELPERINFO (XLSX / CSV) ---
 @app.route('/export-helperinfo')
 @login_required
 def export_helperinfo():
@@ -1126,44 +3214,77 @@ def export_helperinfo():
     sort_by = request.args.get('sort_by')
     sort_type = request.args.get('sort_type', 'ASC')
     
-    # ВИПРАВЛЕННЯ: Використовуємо ту ж логіку, що і в функції home(),
-    # щоб забезпечити, що якщо 'query' є, ми використовуємо функцію пошуку.
-    if query:
-        # 1. Якщо є пошуковий запит, використовуємо багатопольовий пошук (як на сторінці)
-        helper_list = get_helpers_by_search(query, sort_by, sort_type)
-    else:
-        # 2. Якщо запиту немає, отримуємо всі дані (або використовуємо get_all_helpers без запиту)
-        # Змінено: використовуємо get_all_helpers, але з поточними параметрами сортування
-        helper_list = get_all_helpers(query=None, sort_by=sort_by, sort_type=sort_type)
+    # Ті ж умови пошуку та сортування, що і на головній сторінці
+    sql, params = build_helpers_list_sql(query=query, sort_by=sort_by, sort_type=sort_type)
         
     header = ['ID', 'Ім\'я Адміна', 'Ранг', 'Попередження'] 
-    
-    output = io.StringIO()
-    # Використовуємо крапку з комою (;) та BOM для сумісності з українським Excel
-    writer = csv.writer(output, delimiter=';') 
-    
-    writer.writerow(header)
-    
-    for helper in helper_list:
-        writer.writerow([
+
+    def helper_row(helper):
+        return [
             helper['helper_id'],
             helper['admin_name'],
             helper['admin_rank'],
             helper['warnings_count']
-        ])
+        ]
 
-    output.seek(0)
-    # Додаємо BOM для коректного відображення українських символів в Excel
-    csv_bytes = (u'\ufeff' + output.getvalue()).encode('utf-8')
-    buffer = io.BytesIO(csv_bytes)
-    
-    return send_file(
-        buffer,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name='HelperInfo_Export.xlsx' 
+    batches = open_query_batches(sql, params)
+    if batches is None:
+        flash('Помилка експорту: не вдалося отримати дані з бази даних.', 'error')
+        return redirect(url_for('home'))
+
+    return export_response(header, batches, helper_row, 'HelperInfo_Export')
+
+# --- МАРШРУТ 9а: ДАШБОРД СТАТИСТИКИ СПІВРОБІТНИКІВ ---
+@app.route('/dashboard')
+@login_required
+@manager_required
+def dashboard():
+    """Кількість тікетів, середні time_spent і resolution_rating та попередження по співробітниках."""
+
+    # Статистика залежить від обох таблиць; без змін у них - 304 без запиту до БД
+    etag, last_modified = page_validators('helperinfo', 'ticketinfo')
+    cached = not_modified(etag, last_modified)
+    if cached is not None:
+        return cached
+
+    search_query = request.args.get('query', '')
+    sort_by = request.args.get('sort_by', '')
+    if sort_by not in HELPER_STATS_SORT_FIELDS:
+        sort_by = 'tickets_count'
+    sort_type = request.args.get('sort_type', 'desc')
+    rank_filter = request.args.get('rank_filter', '')
+    page_size = parse_page_size(request.args.get('page_size'))
+
+    page = get_helper_stats_page_cached(
+        query=search_query, sort_by=sort_by, sort_type=sort_type, rank_filter=rank_filter,
+        page_size=page_size, after=request.args.get('after'), before=request.args.get('before')
     )
 
+    response = make_response(render_template('dashboard.html',
+        title="Статистика співробітників",
+        table_data=page['rows'],
+        sort_fields=[
+            ('helper_id', 'ID'),
+            ('admin_name', "Ім'я"),
+            ('admin_rank', 'Ранг'),
+            ('tickets_count', 'Тікетів'),
+            ('avg_time_spent', 'Сер. час'),
+            ('avg_rating', 'Сер. оцінка'),
+            ('warnings_count', 'Попереджень')
+        ],
+        search_query=search_query,
+        sort_by=sort_by,
+        sort_type=sort_type.lower(),
+        rank_filter=rank_filter,
+        item_count=page['total_count'],
+        page_size=page_size,
+        next_token=page['next_token'],
+        prev_token=page['prev_token'],
+        error='Помилка підключення до бази даних' if page.get('failed') else None,
+        user_rank=session.get('user_rank')
+    ))
+    return add_validators(response, etag, last_modified) if page_loaded(page) else response
+
 # ==========================================================
 # --- МАРШРУТИ: Сторінки адміна ---
 # ==========================================================
@@ -1172,6 +3293,12 @@ def export_helperinfo():
 @login_required
 @admin_required(['SuperAdmin'])
 def admin_page():
+
+    # Список веб-адмінів не змінювався - 304 без запиту до БД
+    etag, last_modified = page_validators('webadmin')
+    cached = not_modified(etag, last_modified)
+    if cached is not None:
+        return cached
     
     # Параметри сортування
     sort_by = request.args.get('sort_by', '')
@@ -1182,16 +3309,12 @@ def admin_page():
     
     # Фільтр за рангом
     rank_filter = request.args.get('rank_filter', '')
+
+    # Версія - до читання списку (ключ кешу фрагментів)
+    versions = current_versions('webadmin')
     
-    if search_query:
-        # Використовуємо функцію пошуку з параметрами сортування
-        webadmin_list = get_webadmins_by_search(search_query, sort_by, sort_type)
-    elif rank_filter:
-        # Використовуємо функцію фільтрації за рангом
-        webadmin_list = get_webadmins_by_rank(rank_filter, sort_by, sort_type)
-    else:
-        # Отримуємо всі дані з параметрами сортування
-        webadmin_list = get_all_webadmins(sort_by, sort_type)
+    # Кеш списків; промах читається асинхронним пулом, якщо ASYNC_READS=1
+    webadmin_list = read_webadmins(search_query, sort_by, sort_type, rank_filter)
     
     # Формуємо заголовок з урахуванням фільтрів
     if search_query and rank_filter:
@@ -1202,168 +3325,92 @@ def admin_page():
         main_title = f"Веб-Адміністратори - Ранг: {rank_filter}"
     else:
         main_title = "Веб-Адміністратори"
+
+    # Порожній список (можлива помилка БД) не кешуємо, як і в read_webadmins
+    table_body = cached_tbody(
+        'webadmins-tbody.html', ('webadmin',), versions,
+        (search_query, sort_by, sort_type, rank_filter),
+        cacheable=bool(webadmin_list),
+        webadmin_list=webadmin_list
+    )
         
-    return render_template(
+    response = make_response(render_template(
         'admin-page.html', 
         title='Admin Panel - WebAdmins',
+        table_body=table_body,
         webadmin_list=webadmin_list,
         main_content_title=main_title,
         sort_by=sort_by,
         sort_type=sort_type,
         rank_filter=rank_filter,
         user_rank=session.get('user_rank')
-    )
+    ))
+    # Порожній список може означати помилку БД - такий результат не прив'язуємо до версії
+    return add_validators(response, etag, last_modified) if webadmin_list else response
 
 # --- МАРШРУТ 11: ОНОВЛЕННЯ ВЕБ-АДМІНА ---
 @app.route('/update_webadmin', methods=['POST'])
 @login_required
 @admin_required('SuperAdmin')
 def update_webadmin():
-    print("🔵 === ПОЧАТОК ОНОВЛЕННЯ WEBADMIN ===")
-    
-    conn = get_connection()
-    if not conn:
-        print("❌ Помилка підключення до бази даних")
-        flash('Помилка підключення до бази даних.', 'error')
-        return redirect(url_for('admin_page'))
-        
-    # Отримуємо дані з форми
     webadmin_id = request.form.get('webadmin_id')
     username = request.form.get('username')  # Зверніть увагу на ім'я поля!
     webadmin_rank = request.form.get('webadmin_rank')
     password = request.form.get('password')
     
-    # Логуємо отримані дані
-    print(f"📥 Отримані дані форми:")
-    print(f"   ID: {webadmin_id}")
-    print(f"   Ім'я: {username}")
-    print(f"   Ранг: {webadmin_rank}")
-    print(f"   Пароль: {'***' if password else 'Не вказано'}")
-    print(f"   Всі поля форми: {dict(request.form)}")
-    
-    try:
-        with conn.cursor() as cur:
-            if password and password.strip():  # Якщо пароль вказано і не порожній
-                new_hashed_password = generate_password_hash(password)
-                print(f"🔑 Оновлення з паролем")
-                cur.execute(
-                    "UPDATE webadmin SET webadmin_name = %s, webadmin_password = %s, webadmin_rank = %s WHERE webadmin_id = %s;",
-                    (username, new_hashed_password, webadmin_rank, webadmin_id)
-                )
-            else:
-                print(f"🔑 Оновлення без зміни пароля")
-                cur.execute(
-                    "UPDATE webadmin SET webadmin_name = %s, webadmin_rank = %s WHERE webadmin_id = %s;",
-                    (username, webadmin_rank, webadmin_id)
-                )
-            
-            # Перевіряємо скільки рядків оновлено
-            updated_rows = cur.rowcount
-            print(f"✅ Оновлено рядків: {updated_rows}")
-            
-            conn.commit()
-            
-            if updated_rows > 0:
-                flash(f"Дані WebAdmin '{username}' успішно оновлено!", 'success')
-                print(f"✅ Успішне оновлення webadmin ID {webadmin_id}")
-                
-                # Логування дії
-                log_action(session.get('webadmin_id'), session.get('username'), 
-                           'UPDATE', 'webadmin', webadmin_id)
-            else:
-                flash('WebAdmin не знайдено або дані не змінилися.', 'warning')
-                print(f"⚠️  Жодного рядка не оновлено (можливо, ID не знайдено)")
-            
-    except psycopg.Error as e:
-        conn.rollback()
-        error_msg = f'Помилка оновлення даних WebAdmin: {e}'
-        flash(error_msg, 'error')
-        print(f"❌ Помилка бази даних: {e}")
-    except Exception as e:
-        conn.rollback()
-        error_msg = f'Невідома помилка: {e}'
-        flash(error_msg, 'error')
-        print(f"❌ Невідома помилка: {e}")
-    finally:
-        conn.close()
-        print("🔵 === ЗАВЕРШЕННЯ ОНОВЛЕННЯ WEBADMIN ===\n")
+    # Хеш обчислюється до звернення до БД, щоб не тримати з'єднання під час довгого обчислення
+    new_hashed_password = None
+    if password and password.strip():  # Якщо пароль вказано і не порожній
+        try:
+            new_hashed_password = password_hasher.hash(password)
+        except TimeoutError as e:
+            flash(str(e), 'error')
+            return redirect(url_for('admin_page'))
+
+    updated_rows = update_webadmin_data(webadmin_id, username, webadmin_rank, new_hashed_password)
+    if updated_rows is None:
+        flash('Помилка оновлення даних WebAdmin.', 'error')
+    elif updated_rows > 0:
+        flash(f"Дані WebAdmin '{username}' успішно оновлено!", 'success')
+        log_action(session.get('webadmin_id'), session.get('username'), 
+                   'UPDATE', 'webadmin', webadmin_id)
+        # Закешовані списки цієї таблиці більше не актуальні
+        after_commit(tables_changed, 'webadmin')
+    else:
+        flash('WebAdmin не знайдено або дані не змінилися.', 'warning')
         
     return redirect(url_for('admin_page'))
 
-# --- МАРШРУТ 13: ВИДАЛЕННЯ ВЕБ-АДМІНА ---
 # --- МАРШРУТ 13: ВИДАЛЕННЯ ВЕБ-АДМІНА ---
 @app.route('/delete-webadmin', methods=['POST'])
 @login_required
 @admin_required(['SuperAdmin'])
 def delete_webadmin():
-    print("🔵 === ПОЧАТОК ВИДАЛЕННЯ WEBADMIN ===")
-    
-    conn = get_connection()
-    if not conn:
-        flash('Помилка підключення до бази даних.', 'error')
-        conn.close()  # Додайте це
-        return redirect(url_for('admin_page'))  # Додайте return
-        
     webadmin_id = request.form.get('webadmin_id')
-    print(f"📥 Отримано ID для видалення: {webadmin_id}")
     
     if not webadmin_id:
         flash('ID веб-адміністратора не вказано.', 'error')
-        print("❌ Помилка: webadmin_id відсутній у формі")
-        conn.close()
-        return redirect(url_for('admin_page'))  # Додайте return
+        return redirect(url_for('admin_page'))
     
     # Запобігання видаленню власного облікового запису
     if str(webadmin_id) == str(session.get('webadmin_id')):
         flash('Ви не можете видалити власний обліковий запис!', 'error')
-        conn.close()
-        return redirect(url_for('admin_page'))  # Додайте return
+        return redirect(url_for('admin_page'))
     
-    try:
-        with conn.cursor() as cur:
-            # Спочатку отримаємо ім'я адміністратора для логування
-            cur.execute("SELECT webadmin_name FROM webadmin WHERE webadmin_id = %s;", (webadmin_id,))
-            result = cur.fetchone()
-            
-            if not result:
-                flash('WebAdmin не знайдено.', 'error')
-                conn.close()
-                return redirect(url_for('admin_page'))  # Додайте return
-            
-            admin_name = result[0]
-            
-            # Видаляємо адміністратора
-            cur.execute("DELETE FROM webadmin WHERE webadmin_id = %s;", (webadmin_id,))
-            deleted_rows = cur.rowcount
-            
-            conn.commit()
-            
-            if deleted_rows > 0:
-                flash(f'WebAdmin "{admin_name}" успішно видалено!', 'success')
-                print(f"✅ Успішне видалення webadmin ID {webadmin_id}")
-                
-                # Логування дії
-                log_action(session.get('webadmin_id'), session.get('username'), 
-                           'DELETE', 'webadmin', webadmin_id)
-            else:
-                flash('WebAdmin не знайдено.', 'error')
-                print(f"⚠️  Жодного рядка не видалено")
-            
-    except psycopg.Error as e:
-        conn.rollback()
-        error_msg = f'Помилка видалення WebAdmin: {e}'
-        flash(error_msg, 'error')
-        print(f"❌ Помилка бази даних при видаленні: {e}")
-    except Exception as e:
-        conn.rollback()
-        error_msg = f'Невідома помилка: {e}'
-        flash(error_msg, 'error')
-        print(f"❌ Невідома помилка при видаленні: {e}")
-    finally:
-        conn.close()
-        print("🔵 === ЗАВЕРШЕННЯ ВИДАЛЕННЯ WEBADMIN ===\n")
+    # Ім'я для повідомлення повертає той самий DELETE (RETURNING)
+    result = delete_webadmin_data(webadmin_id)
+    if result is None:
+        flash('Помилка видалення WebAdmin.', 'error')
+    elif not result['found']:
+        flash('WebAdmin не знайдено.', 'error')
+    else:
+        flash(f'WebAdmin "{result["name"]}" успішно видалено!', 'success')
+        log_action(session.get('webadmin_id'), session.get('username'), 
+                   'DELETE', 'webadmin', webadmin_id)
+        # Закешовані списки цієї таблиці більше не актуальні
+        after_commit(tables_changed, 'webadmin')
         
-    return redirect(url_for('admin_page'))  # Цей return завжди має бути в кінці
+    return redirect(url_for('admin_page'))
 
 
 # --- МАРШРУТ 14: ДОДАВАННЯ ВЕБ-АДМІНА ---
@@ -1371,11 +3418,6 @@ def delete_webadmin():
 @login_required
 @admin_required(['SuperAdmin'])
 def add_webadmin():
-    conn = get_connection()
-    if not conn:
-        flash('Помилка підключення до бази даних.', 'error')
-        return redirect(url_for('admin_page'))
-    
     username = request.form.get('webadmin_name')
     password = request.form.get('webadmin_password')
     webadmin_rank = request.form.get('webadmin_rank')
@@ -1384,59 +3426,120 @@ def add_webadmin():
         flash('Усі поля обов\'язкові для заповнення.', 'error')
         return redirect(url_for('admin_page'))
     
-    hashed_password = generate_password_hash(password)
-
     try:
-        with conn.cursor() as cur:
-            # ИСПРАВЛЕНИЕ: Используем INSERT вместо UPDATE
-            cur.execute(
-                "INSERT INTO webadmin (webadmin_name, webadmin_password, webadmin_rank) VALUES (%s, %s, %s) RETURNING webadmin_id;",
-                (username, hashed_password, webadmin_rank)
-            )
-            new_webadmin_id = cur.fetchone()[0]
-            conn.commit()
-            flash(f"WebAdmin '{username}' успішно додано!", 'success')
-            
-            # --- ВИКЛИК ЛОГУВАННЯ: CREATE ---
-            log_action(session.get('webadmin_id'), session.get('username'), 
-                       'CREATE', 'webadmin', new_webadmin_id)
-            
-    except psycopg.Error as e:
-        conn.rollback()
-        flash(f'Помилка додавання WebAdmin: {e}', 'error')
-    finally:
-        conn.close()
+        hashed_password = password_hasher.hash(password)
+    except TimeoutError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('admin_page'))
+
+    new_webadmin_id = insert_webadmin_data(username, webadmin_rank, hashed_password)
+    if new_webadmin_id is not None:
+        flash(f"WebAdmin '{username}' успішно додано!", 'success')
+        # --- ВИКЛИК ЛОГУВАННЯ: CREATE ---
+        log_action(session.get('webadmin_id'), session.get('username'), 
+                   'CREATE', 'webadmin', new_webadmin_id)
+        # Закешовані списки цієї таблиці більше не актуальні
+        after_commit(tables_changed, 'webadmin')
+    else:
+        flash('Помилка додавання WebAdmin.', 'error')
         
     return redirect(url_for('admin_page'))
 
-# --- МАРШРУТ 15: ЗАПУСК РЕЗЕРВНОГО КОПІЮВАННЯ ---
+# --- МАРШРУТ 15: ЗАПУСК РЕЗЕРВНОГО КОПІЮВАННЯ (фонова задача) ---
 @app.route('/backup', methods=['POST'])
 @login_required
 @admin_required(['SuperAdmin'])
 def backup_route():
-    success, message = backup_database()
-    
-    if success:
-        flash(message, 'success')
-    else:
+    job, created, message = submit_backup_job(session.get('webadmin_id'), session.get('username'))
+
+    # Запит з backup.js (fetch) отримує JSON і далі опитує статус задачі
+    if request.accept_mimetypes.best == 'application/json':
+        if job is None:
+            return jsonify({'status': 'error', 'message': message}), 503
+        return jsonify({'status': 'success', 'message': message, 'data': job}), 202 if created else 200
+
+    if job is None:
         # Виводимо перші 200 символів помилки, щоб не забивати Flash
-        flash(f"Помилка резервного копіювання: {message[:200]}", 'error') 
+        flash(f"Помилка резервного копіювання: {message[:200]}", 'error')
+    else:
+        flash(message, 'success' if created else 'info')
 
-    # Перенаправляємо назад на сторінку адміністратора або логів
+    # Перенаправляємо назад на сторінку адміністратора
     return redirect(url_for('admin_page'))
 
+# --- МАРШРУТ 15а: СПИСОК ЗАДАЧ РЕЗЕРВНОГО КОПІЮВАННЯ ---
+@app.route('/backup/jobs')
+@login_required
+@admin_required(['SuperAdmin'])
+def backup_jobs_route():
+    return jsonify({'status': 'success', 'data': get_backup_jobs()}), 200
+
+# --- МАРШРУТ 15б: СТАТУС ОДНІЄЇ ЗАДАЧІ ---
+@app.route('/backup/jobs/<job_id>')
+@login_required
+@admin_required(['SuperAdmin'])
+def backup_job_status(job_id):
+    try:
+        uuid.UUID(job_id)
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'Некоректний ID задачі'}), 404
+
+    job = get_backup_job(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Задачу не знайдено'}), 404
+    return jsonify({'status': 'success', 'data': job}), 200
+
 # --- МАРШРУТ 16: СТОРІНКА ЛОГІВ ---
+
+# Скільки записів журналу показувати на одній сторінці
+LOGS_PAGE_SIZE = 500
+# Значення фільтрів сторінки логів
+LOG_ACTIONS = ['CREATE', 'UPDATE', 'DELETE', 'IMPORT', 'BACKUP', 'BACKUP_FAILED']
+LOG_TABLES = ['helperinfo', 'ticketinfo', 'webadmin', 'database']
+
+def parse_log_date(value, end_of_day=False):
+    """'2025-11-22' -> datetime у локальному часовому поясі сервера (кінець дня - не включно)."""
+    try:
+        day = datetime.strptime(value, '%Y-%m-%d').astimezone()
+    except (TypeError, ValueError):
+        return None
+    return day + timedelta(days=1) if end_of_day else day
+
 @app.route('/logs')
 @login_required
 @admin_required(['SuperAdmin'])
 def logs_page():
     log_entries = []
-    log_file_path = 'app.log' # Використовуйте шлях до вашого лог-файлу
+    log_file_path = AUDIT_LOG_PATH
+
+    # Фільтри: ID користувача, дія, таблиця, діапазон дат; before - зміщення для старіших записів
+    filters = {
+        'user_id': request.args.get('user_id', '').strip(),
+        'action': request.args.get('action', '').strip(),
+        'table': request.args.get('table', '').strip(),
+        'date_from': request.args.get('date_from', '').strip(),
+        'date_to': request.args.get('date_to', '').strip(),
+    }
+    before = request.args.get('before', type=int)
+    next_before = None
+
+    # Дописуємо чергу журналу поточного процесу, щоб щойно виконані дії були видні
+    audit_log.flush()
 
     try:
-        with open(log_file_path, 'r', encoding='utf-8') as f:
-            # Читаємо останні 500 рядків логу (для оптимізації)
-            log_entries = f.readlines()[-500:] 
+        # Читання з кінця файлу по індексу: файл не завантажується в пам'ять цілком
+        entries, next_before = query_log(
+            log_file_path,
+            user_id=int(filters['user_id']) if filters['user_id'].isdigit() else None,
+            action=filters['action'] or None,
+            table=filters['table'] or None,
+            date_from=parse_log_date(filters['date_from']),
+            date_to=parse_log_date(filters['date_to'], end_of_day=True),
+            before=before,
+            limit=LOGS_PAGE_SIZE
+        )
+        # Новіші записи зверху
+        log_entries = [entry['line'] for entry in entries]
     except FileNotFoundError:
         log_entries = ["Файл логів (app.log) не знайдено. Створіть його вручну або виконайте першу CRUD-операцію."]
     except PermissionError:
@@ -1444,13 +3547,15 @@ def logs_page():
     except Exception as e:
         log_entries = [f"Невідома помилка читання файлу логів: {e}"]
         
-    # Перевертаємо список, щоб новіші записи були зверху
-    log_entries.reverse() 
-        
     return render_template(
         'logs.html', 
         title='Журнал Дій',
         log_entries=log_entries,
+        filters=filters,
+        log_actions=LOG_ACTIONS,
+        log_tables=LOG_TABLES,
+        before=before,
+        next_before=next_before,
         user_rank=session.get('user_rank')
     )
 
@@ -1462,69 +3567,369 @@ def script(filename):
     """Подає статичні файли з папки 'script'."""
     return send_from_directory('script', filename)
 
+# ==========================================================
+# --- МАРШРУТ 18: МЕТРИКИ PROMETHEUS ---
+# ==========================================================
+def collect_metrics():
+    """Стан пулів з'єднань та кешу на момент опитування."""
+    pools = [('sync', get_pool_stats())]
+    if ASYNC_READS and async_reader.get_stats():
+        pools.append(('async', async_reader.get_stats()))
+
+    def per_pool(fn):
+        return [((('pool', name),), fn(stats)) for name, stats in pools]
+
+    cache_stats = result_cache.stats()
+    fragment_stats = fragment_cache.stats()
+    return [
+        metrics.gauge('db_pool_max_connections', "Максимальний розмір пулу з'єднань.",
+                      per_pool(lambda st: st.get('pool_max', 0))),
+        metrics.gauge('db_pool_connections', "Відкриті з'єднання пулу.",
+                      per_pool(lambda st: st.get('pool_size', 0))),
+        metrics.gauge('db_pool_connections_in_use', "З'єднання, видані з пулу.",
+                      per_pool(lambda st: st.get('pool_size', 0) - st.get('pool_available', 0))),
+        metrics.gauge('db_pool_requests_waiting', "Запити, що чекають вільного з'єднання.",
+                      per_pool(lambda st: st.get('requests_waiting', 0))),
+        metrics.gauge('db_pool_requests_total', "Видачі з'єднань з пулу.",
+                      per_pool(lambda st: st.get('requests_num', 0)), kind='counter'),
+        metrics.gauge('db_pool_wait_seconds_total', "Сумарне очікування вільного з'єднання.",
+                      per_pool(lambda st: st.get('requests_wait_ms', 0) / 1000), kind='counter'),
+        metrics.gauge('db_pool_timeouts_total', "Запити, що не дочекалися з'єднання.",
+                      per_pool(lambda st: st.get('requests_errors', 0)), kind='counter'),
+        metrics.gauge('db_pool_connection_errors_total', "Невдалі спроби підключитися до БД.",
+                      per_pool(lambda st: st.get('connections_errors', 0)), kind='counter'),
+        metrics.gauge('cache_lookups_total', "Звернення до кешу списків: влучання та промахи.",
+                      [((('result', name),), cache_stats[name]) for name in ('hits', 'misses')],
+                      kind='counter'),
+        metrics.gauge('cache_dropped_total', "Промахи через застарілий (stale) або прострочений (expired) запис.",
+                      [((('reason', name),), cache_stats[name]) for name in ('stale', 'expired')],
+                      kind='counter'),
+        metrics.gauge('cache_evictions_total', "Записи, витіснені з кешу через обмеження обсягу.",
+                      [((), cache_stats['evictions'])], kind='counter'),
+        metrics.gauge('cache_hit_ratio', "Частка влучань у кеш списків.",
+                      [((), cache_stats['hit_ratio'] or 0)]),
+        metrics.gauge('cache_entries', "Записи в кеші списків.", [((), cache_stats['entries'])]),
+        metrics.gauge('cache_bytes', "Приблизний обсяг кешу списків.", [((), cache_stats['bytes'])]),
+        metrics.gauge('fragment_cache_lookups_total', "Звернення до кешу відрендерених <tbody>: влучання та промахи.",
+                      [((('result', name),), fragment_stats[name]) for name in ('hits', 'misses')],
+                      kind='counter'),
+        metrics.gauge('fragment_cache_evictions_total', "Фрагменти, витіснені через обмеження обсягу.",
+                      [((), fragment_stats['evictions'])], kind='counter'),
+        metrics.gauge('fragment_cache_bytes', "Приблизний обсяг кешу фрагментів.", [((), fragment_stats['bytes'])]),
+        metrics.gauge('fragment_render_seconds_total', "Час рендерингу <tbody> при промахах кешу фрагментів.",
+                      [((), fragment_stats['render_seconds'])], kind='counter'),
+        metrics.gauge('fragment_render_saved_seconds_total', "Час рендерингу, заощаджений влучаннями в кеш фрагментів.",
+                      [((), fragment_stats['render_saved_seconds'])], kind='counter'),
+    ]
+
+@app.route('/metrics')
+def metrics_route():
+    """Метрики воркера, що обробив запит. Доступ: токен METRICS_TOKEN або сесія SuperAdmin."""
+    if not METRICS_ENABLED:
+        return Response("Метрики вимкнено (METRICS_ENABLED=0).", status=404, mimetype='text/plain')
+
+    auth = request.headers.get('Authorization', '')
+    token_ok = bool(METRICS_TOKEN) and auth.startswith('Bearer ') and \
+        hmac.compare_digest(auth[len('Bearer '):].encode('utf-8'), METRICS_TOKEN.encode('utf-8'))
+    if not token_ok:
+        if not session.get('logged_in'):
+            return redirect(url_for('login'))
+        if session.get('user_rank') != 'SuperAdmin':
+            return Response("Недостатньо прав.", status=403, mimetype='text/plain')
+
+    return Response(metrics.render(collect_metrics), content_type=METRICS_CONTENT_TYPE)
+
+# ==========================================================
+# --- МАРШРУТ 19: ЖУРНАЛ ПОВІЛЬНИХ ЗАПИТІВ ---
+# ==========================================================
+SLOW_QUERIES_PAGE_SIZE = 200
+
+@app.route('/slow-queries')
+@login_required
+@admin_required(['SuperAdmin'])
+def slow_queries_page():
+    filters = {
+        'route': request.args.get('route', '').strip(),
+        'min_ms': request.args.get('min_ms', '').strip(),
+    }
+    try:
+        min_ms = float(filters['min_ms']) if filters['min_ms'] else None
+    except ValueError:
+        min_ms = None
+
+    # Дописуємо чергу поточного процесу, щоб щойно зафіксовані запити були видні
+    slow_query_log.flush()
+
+    error = None
+    try:
+        entries = slow_query_log.read(SLOW_QUERIES_PAGE_SIZE, route=filters['route'] or None, min_ms=min_ms)
+    except OSError as e:
+        entries = []
+        error = f"Не вдалося прочитати {SLOW_QUERY_LOG_PATH}: {e}"
+
+    return render_template(
+        'slow-queries.html',
+        title='Повільні запити',
+        entries=entries,
+        filters=filters,
+        routes=sorted(rule.endpoint for rule in app.url_map.iter_rules() if rule.endpoint != 'static'),
+        stats=slow_query_log.stats(),
+        error=error,
+        user_rank=session.get('user_rank')
+    )
+
 # ==========================================================
 # API ENDPOINT: ОТРИМАННЯ ДЕТАЛЕЙ ОДНОГО ПОМІЧНИКА
 # ==========================================================
 
-# --- API ENDPOINT 1: ОТРИМАННЯ ВСІХ ПОМІЧНИКІВ (HelperInfo) ---
+# Поля, які можна вибрати параметром fields=
+HELPER_API_FIELDS = ('helper_id', 'admin_name', 'admin_rank', 'warnings_count')
+TICKET_API_FIELDS = ('ticket_id', 'submitter_username', 'handler_helper_id', 'handler_name',
+                     'time_spent', 'resolution_rating')
+HELPER_STATS_API_FIELDS = ('helper_id', 'admin_name', 'admin_rank', 'warnings_count', 'tickets_count',
+                           'avg_time_spent', 'avg_rating')
+
+def api_error(message, status):
+    return jsonify({'status': 'error', 'message': message}), status
+
+def parse_api_fields(value, allowed):
+    """'helper_id,admin_name' -> кортеж полів; всі поля, якщо параметр порожній; None при невідомому полі."""
+    if not value:
+        return allowed
+    fields = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    if not fields or any(name not in allowed for name in fields):
+        return None
+    return fields
+
+def api_cursor_invalid(cursor, sort_by, sort_type):
+    """Курсор передано, але він пошкоджений або виданий для іншого сортування."""
+    sort_direction = 'DESC' if (sort_type or '').upper() == 'DESC' else 'ASC'
+    return bool(cursor) and decode_page_token(cursor, sort_by, sort_direction) is None
+
+def api_page_response(page, fields, limit, etag=None, last_modified=None):
+    """
+    JSON-відповідь зі сторінкою даних. ETag - за версіями таблиць, а якщо вони
+    невідомі - хеш вмісту відповіді; клієнт, що надіслав If-None-Match з тим самим
+    значенням, отримує 304 без тіла.
+    """
+    rows = [{name: row[name] for name in fields} for row in page['rows']]
+    payload = {
+        'status': 'success',
+        'count': len(rows),
+        'total_count': page['total_count'],
+        'limit': limit,
+        'next_cursor': page['next_token'],
+        'prev_cursor': page['prev_token'],
+        'data': rows
+    }
+    response = jsonify(payload)
+    if etag is not None:
+        return add_validators(response, etag, last_modified)
+
+    body_hash = hashlib.sha256(
+        json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+    ).hexdigest()
+    response.set_etag(body_hash[:32])
+    # Клієнт може зберігати відповідь, але має перевіряти її актуальність при кожному запиті
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+# --- API ENDPOINT 1: СПИСОК ПОМІЧНИКІВ (HelperInfo) ---
 @app.route('/api/v1/helpers', methods=['GET'])
 @login_required
 def api_get_helpers():
-    # Використовуємо існуючу функцію для отримання всіх помічників
-    # Можна додати обробку параметрів 'query', 'sort_by' з request.args, як у home(),
-    # але для простоти API v1 повернемо всі дані без фільтрації.
-    helper_list = get_all_helpers() 
-    
-    # Конвертуємо список словників у JSON відповідь
-    if helper_list:
-        return jsonify({
-            'status': 'success',
-            'count': len(helper_list),
-            'data': helper_list
-        }), 200
-    else:
-        return jsonify({
-            'status': 'error',
-            'message': 'Дані HelperInfo не знайдено'
-        }), 404
+    """
+    Параметри: limit, cursor (next_cursor попередньої відповіді), before (prev_cursor),
+    query, sort_by, sort_type, rank_filter - як на головній сторінці; fields - список полів.
+    """
+    # Відповідь залежить лише від URL (параметрів) та версії таблиці
+    etag, last_modified = versioned_validators(('helperinfo',), request.full_path)
+    cached = not_modified(etag, last_modified)
+    if cached is not None:
+        return cached
+
+    sort_by = request.args.get('sort_by', '')
+    sort_type = request.args.get('sort_type', 'asc')
+    cursor, before = request.args.get('cursor'), request.args.get('before')
+
+    fields = parse_api_fields(request.args.get('fields'), HELPER_API_FIELDS)
+    if fields is None:
+        return api_error(f"Невідоме поле у fields. Допустимі: {', '.join(HELPER_API_FIELDS)}", 400)
+
+    effective_sort_by = sort_by if sort_by in HELPER_SORT_FIELDS else 'helper_id'
+    if api_cursor_invalid(cursor, effective_sort_by, sort_type) or api_cursor_invalid(before, effective_sort_by, sort_type):
+        return api_error('Некоректний курсор або курсор іншого сортування', 400)
+
+    limit = parse_page_size(request.args.get('limit'))
+    page = read_helpers_page(
+        query=request.args.get('query', ''), sort_by=sort_by, sort_type=sort_type,
+        rank_filter=request.args.get('rank_filter', ''),
+        page_size=limit, after=cursor, before=before
+    )
+    if page.get('failed'):
+        return api_error('Помилка підключення до бази даних', 503)
+
+    return api_page_response(page, fields, limit, etag, last_modified)
 
-# --- API ENDPOINT 2: ОТРИМАННЯ ВСІХ ТІКЕТІВ (TicketInfo) ---
+# --- API ENDPOINT 2: СПИСОК ТІКЕТІВ (TicketInfo) ---
 @app.route('/api/v1/tickets', methods=['GET'])
 @login_required
 def api_get_tickets():
-    # Використовуємо існуючу функцію для отримання всіх тікетів
-    ticket_list = get_all_tickets()
+    """
+    Параметри: limit, cursor (next_cursor попередньої відповіді), before (prev_cursor),
+    query, sort_by, sort_type - як на сторінці тікетів; fields - список полів.
+    """
+    etag, last_modified = versioned_validators(('ticketinfo', 'helperinfo'), request.full_path)
+    cached = not_modified(etag, last_modified)
+    if cached is not None:
+        return cached
 
-    # Конвертуємо список словників у JSON відповідь
-    if ticket_list:
-        return jsonify({
-            'status': 'success',
-            'count': len(ticket_list),
-            'data': ticket_list
-        }), 200
-    else:
-        return jsonify({
-            'status': 'error',
-            'message': 'Дані TicketInfo не знайдено'
-        }), 404
+    query = request.args.get('query', '')
+    sort_by = request.args.get('sort_by', '')
+    sort_type = request.args.get('sort_type', 'asc').lower()
+    cursor, before = request.args.get('cursor'), request.args.get('before')
+
+    fields = parse_api_fields(request.args.get('fields'), TICKET_API_FIELDS)
+    if fields is None:
+        return api_error(f"Невідоме поле у fields. Допустимі: {', '.join(TICKET_API_FIELDS)}", 400)
+
+    effective_sort_by = plan_ticket_query(query, sort_by, sort_type)['sort_by']
+    if api_cursor_invalid(cursor, effective_sort_by, sort_type) or api_cursor_invalid(before, effective_sort_by, sort_type):
+        return api_error('Некоректний курсор або курсор іншого сортування', 400)
+
+    limit = parse_page_size(request.args.get('limit'))
+    page = read_tickets_page(
+        query=query, sort_by=sort_by, sort_type=sort_type,
+        page_size=limit, after=cursor, before=before
+    )
+    if page.get('failed'):
+        return api_error('Помилка підключення до бази даних', 503)
+
+    return api_page_response(page, fields, limit, etag, last_modified)
 
 # --- API ENDPOINT 3: ОТРИМАННЯ ДЕТАЛЕЙ ОДНОГО ПОМІЧНИКА ---
 @app.route('/api/v1/helpers/<int:helper_id>', methods=['GET'])
 @login_required
 def api_get_helper_details(helper_id):
-    helper = get_helper_by_id(helper_id)
+    etag, last_modified = versioned_validators(('helperinfo',), request.path)
+    cached = not_modified(etag, last_modified)
+    if cached is not None:
+        return cached
+
+    helper = read_helper_by_id(helper_id)
     
     if helper:
-        return jsonify({
+        response = jsonify({
             'status': 'success',
             'data': helper
-        }), 200
+        })
+        return add_validators(response, etag, last_modified), 200
     else:
         return jsonify({
             'status': 'error',
             'message': f'Помічника з ID {helper_id} не знайдено'
         }), 404
 
+# --- API ENDPOINT 4: СТАТИСТИКА ПУЛУ З'ЄДНАНЬ (для моніторингу) ---
+@app.route('/api/v1/pool-stats', methods=['GET'])
+@login_required
+@admin_required('SuperAdmin')
+def api_get_pool_stats():
+    return jsonify({
+        'status': 'success',
+        'data': get_pool_stats()
+    }), 200
+
+# --- API ENDPOINT 5: СТАТИСТИКА КЕШУ СПИСКІВ (влучання/промахи) ---
+@app.route('/api/v1/cache-stats', methods=['GET'])
+@login_required
+@admin_required('SuperAdmin')
+def api_get_cache_stats():
+    return jsonify({
+        'status': 'success',
+        'data': result_cache.stats(),
+        'fragments': fragment_cache.stats()
+    }), 200
+
+# --- API ENDPOINT 6: ВЕРСІЇ ТАБЛИЦЬ (стан слухача LISTEN/NOTIFY) ---
+@app.route('/api/v1/table-versions', methods=['GET'])
+@login_required
+@admin_required('SuperAdmin')
+def api_get_table_versions():
+    return jsonify({
+        'status': 'success',
+        'data': table_versions.status()
+    }), 200
+
+# --- API ENDPOINT 6а: СТАТИСТИКА СПІВРОБІТНИКІВ (дашборд) ---
+@app.route('/api/v1/helper-stats', methods=['GET'])
+@login_required
+@manager_required
+def api_get_helper_stats():
+    """
+    Параметри як у /api/v1/helpers; sort_by також tickets_count, avg_time_spent, avg_rating
+    (за замовчуванням - tickets_count за спаданням).
+    """
+    etag, last_modified = versioned_validators(('helperinfo', 'ticketinfo'), request.full_path)
+    cached = not_modified(etag, last_modified)
+    if cached is not None:
+        return cached
+
+    sort_by = request.args.get('sort_by', '')
+    sort_type = request.args.get('sort_type', 'desc')
+    cursor, before = request.args.get('cursor'), request.args.get('before')
+
+    fields = parse_api_fields(request.args.get('fields'), HELPER_STATS_API_FIELDS)
+    if fields is None:
+        return api_error(f"Невідоме поле у fields. Допустимі: {', '.join(HELPER_STATS_API_FIELDS)}", 400)
+
+    effective_sort_by = sort_by if sort_by in HELPER_STATS_SORT_FIELDS else 'tickets_count'
+    if api_cursor_invalid(cursor, effective_sort_by, sort_type) or api_cursor_invalid(before, effective_sort_by, sort_type):
+        return api_error('Некоректний курсор або курсор іншого сортування', 400)
+
+    limit = parse_page_size(request.args.get('limit'))
+    page = get_helper_stats_page_cached(
+        query=request.args.get('query', ''), sort_by=sort_by, sort_type=sort_type,
+        rank_filter=request.args.get('rank_filter', ''),
+        page_size=limit, after=cursor, before=before
+    )
+    if page.get('failed'):
+        return api_error('Помилка підключення до бази даних', 503)
+
+    return api_page_response(page, fields, limit, etag, last_modified)
+
+# --- API ENDPOINT 7: МАСОВИЙ ІМПОРТ (multipart: file=CSV/XLSX, mode=upsert|append) ---
+@app.route('/api/v1/import/<kind>', methods=['POST'])
+@login_required
+@manager_required
+def api_import_data(kind):
+    if kind not in IMPORT_TARGETS:
+        return api_error(f"Невідомий тип імпорту: {kind}.", 404)
+
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return api_error("Файл для імпорту не передано (поле file).", 400)
+    mode = request.form.get('mode', 'upsert')
+    if mode not in IMPORT_MODES:
+        return api_error(f"Невідомий режим імпорту: {mode}.", 400)
+
+    try:
+        result = import_table_data(kind, read_import_rows(upload.stream, upload.filename),
+                                   session.get('user_rank'), mode)
+    except (ValueError, csv.Error) as e:
+        return api_error(f"Файл не можна імпортувати: {e}", 400)
+    except RuntimeError as e:
+        return api_error(str(e), 503)
+    except psycopg.Error as e:
+        print(f"❌ Помилка імпорту {kind}: {e}")
+        return api_error("Помилка бази даних під час імпорту, зміни не збережено.", 500)
+
+    log_action(session.get('webadmin_id'), session.get('username'), 'IMPORT', result['table'],
+               import_summary_text(result))
+    after_commit(tables_changed, result['table'])
+    return jsonify({'status': 'success', 'data': result}), 200
+
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    # Лише для розробки (однопотоковий сервер Werkzeug); production - python serve.py
+    create_app().run(debug=os.environ.get('FLASK_DEBUG') == '1')
\ No newline at end of file
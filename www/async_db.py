@@ -0,0 +1,158 @@
+"""
+Асинхронний шлях читання: пул AsyncConnectionPool у фоновому циклі подій.
+
+Пул асинхронних з'єднань прив'язаний до одного циклу подій, тому кожен
+процес-воркер тримає один фоновий потік із циклом, у якому живе пул.
+Синхронні маршрути передають туди корутину читання (run) і чекають результат:
+кілька запитів одного маршруту (лічильник і сторінка) виконуються одночасно
+на різних з'єднаннях. Потік маршруту при цьому зайнятий до кінця запиту, як
+і на синхронному шляху. З'єднання пулу працюють в autocommit і не бачать
+незафіксованих змін транзакції поточного HTTP-запиту (db_session.py).
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+# Запити корутини, яку виконує run(): звітуються в on_query вже в потоці маршруту
+_observations = contextvars.ContextVar('async_db_observations', default=None)
+
+
+class AsyncReader:
+    """Пул асинхронних з'єднань для читання та фоновий цикл подій, у якому він працює."""
+
+    def __init__(self, conninfo, min_size=1, max_size=10, max_idle=300.0, max_lifetime=1800.0,
+                 timeout=10.0, name='async-pool', on_query=None):
+        self.conninfo = conninfo
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.name = name
+        # on_query(sql, params, секунди) викликається в контексті маршруту після кожного запиту
+        self.on_query = on_query
+
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._pool = None
+        self._pid = None
+
+    def _ensure_started(self):
+        """Цикл подій і пул створюються при першому зверненні та заново після fork."""
+        pid = os.getpid()
+        if self._loop is not None and self._pid == pid:
+            return self._loop
+        with self._lock:
+            if self._loop is None or self._pid != pid:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name='async-db', daemon=True)
+                thread.start()
+                # Пул створюється всередині циклу, якому він належатиме
+                self._pool = asyncio.run_coroutine_threadsafe(self._open_pool(), loop).result()
+                self._loop, self._thread, self._pid = loop, thread, pid
+        return self._loop
+
+    def start(self):
+        """Запускає цикл подій і відкриває пул заздалегідь (інакше - при першому запиті)."""
+        self._ensure_started()
+
+    async def _open_pool(self):
+        pool = AsyncConnectionPool(
+            self.conninfo,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            max_idle=self.max_idle,
+            max_lifetime=self.max_lifetime,
+            timeout=self.timeout,
+            # Лише читання: autocommit економить BEGIN/COMMIT на кожному запиті
+            kwargs={'autocommit': True},
+            check=AsyncConnectionPool.check_connection,
+            name=self.name,
+            open=False
+        )
+        # Не блокуємо старт, якщо БД ще недоступна
+        await pool.open(wait=False)
+        return pool
+
+    async def _fetch(self, sql, params, one):
+        async with self._pool.connection() as conn:
+            async with conn.cursor(row_factory=dict_row) as cur:
+                await cur.execute(sql, params)
+                if one:
+                    return await cur.fetchone()
+                return await cur.fetchall()
+
+    async def _call(self, sql, params, one):
+        loop = self._ensure_started()
+        started = time.perf_counter()
+        try:
+            if asyncio.get_running_loop() is loop:
+                # Корутина вже виконується у фоновому циклі (run)
+                return await self._fetch(sql, params, one)
+            # Інший цикл подій (bench_async.py): чекаємо, не блокуючи його
+            future = asyncio.run_coroutine_threadsafe(self._fetch(sql, params, one), loop)
+            return await asyncio.wrap_future(future)
+        finally:
+            seconds = time.perf_counter() - started
+            observed = _observations.get()
+            if observed is not None:
+                observed.append((sql, params, seconds))
+            elif self.on_query is not None:
+                self.on_query(sql, params, seconds)
+
+    def run(self, coro):
+        """
+        Виконує корутину читання (fetch_all/fetch_one, asyncio.gather) у фоновому
+        циклі та чекає результат. Викликається із синхронного коду маршруту.
+        """
+        loop = self._ensure_started()
+        observed = []
+
+        async def observed_run():
+            _observations.set(observed)
+            return await coro
+
+        try:
+            return asyncio.run_coroutine_threadsafe(observed_run(), loop).result()
+        finally:
+            if self.on_query is not None:
+                for sql, params, seconds in observed:
+                    self.on_query(sql, params, seconds)
+
+    async def fetch_all(self, sql, params=None):
+        """Усі рядки запиту як словники. Помилки psycopg та PoolTimeout передаються далі."""
+        return await self._call(sql, params, one=False)
+
+    async def fetch_one(self, sql, params=None):
+        """Перший рядок запиту як словник або None."""
+        return await self._call(sql, params, one=True)
+
+    def get_stats(self):
+        """Статистика пулу (як ConnectionPool.get_stats) або {}, якщо пул ще не створено."""
+        if self._pool is None or self._pid != os.getpid():
+            return {}
+        stats = self._pool.get_stats()
+        stats['pool_name'] = self.name
+        return stats
+
+    def close(self):
+        """Закриває пул і зупиняє цикл подій поточного процесу."""
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = self._thread = self._pool = self._pid = None
+                return
+            loop, thread, pool = self._loop, self._thread, self._pool
+            self._loop = self._thread = self._pool = self._pid = None
+        try:
+            asyncio.run_coroutine_threadsafe(pool.close(), loop).result(timeout=self.timeout)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=self.timeout)
+            if not thread.is_alive():
+                loop.close()
@@ -0,0 +1,462 @@
+"""
+Буферизований запис журналу дій (app.log).
+
+log_action() лише кладе готовий рядок у чергу в пам'яті, а фоновий потік
+записує рядки пачками: коли набралося batch_size рядків або минуло
+flush_interval секунд від першого рядка пачки. Кожна пачка дописується
+одним os.write у файл, відкритий з O_APPEND, під ексклюзивним flock,
+тому рядки кількох процесів-воркерів не перемішуються.
+
+Поруч із журналом ведеться бінарний індекс (app.log.idx): на кожен рядок
+один запис фіксованого розміру (зміщення, довжина, час, user_id та хеші дії
+і таблиці). Сторінка логів фільтрує та гортає назад по індексу і читає з
+журналу лише рядки, що потрапили на сторінку.
+"""
+import atexit
+import os
+import queue
+import re
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows: O_APPEND без додаткового блокування
+    fcntl = None
+
+# Службові повідомлення для потоку запису
+_STOP = object()
+
+# ? 2 Anima Zhuravlev [22/Nov/2025:17:36:36 +0200] "CREATE helperinfo ID:13"
+LOG_LINE_RE = re.compile(
+    r'^\? (?P<user_id>\S+) (?P<username>.*?) '
+    r'\[(?P<timestamp>\d{2}/\w{3}/\d{4}:\d{2}:\d{2}:\d{2} [+-]\d{4})\] '
+    r'"(?P<action>\S+) (?P<table>\S+) ID:(?P<object_id>.*)"$'
+)
+
+# Запис індексу: зміщення, довжина рядка, unix-час, user_id (-1 - невідомий), crc32 дії, crc32 таблиці
+INDEX_RECORD = struct.Struct('<QIqiII')
+INDEX_SUFFIX = '.idx'
+
+# Скільки записів індексу читати за раз при скануванні назад
+INDEX_SCAN_RECORDS = 4096
+# Допуск для фільтра за датою: воркери дописують пачки з затримкою до flush_interval,
+# тому час у журналі зростає майже, але не строго монотонно
+DATE_SCAN_SLACK = 300
+
+
+def name_code(name):
+    """Стабільний 32-бітний код назви дії/таблиці для запису в індекс."""
+    return zlib.crc32(name.encode('utf-8'))
+
+
+def parse_log_line(line):
+    """Розбирає рядок журналу на поля. Повертає None для рядків іншого формату."""
+    match = LOG_LINE_RE.match(line.rstrip('\r\n'))
+    if not match:
+        return None
+    entry = match.groupdict()
+    try:
+        entry['timestamp'] = datetime.strptime(entry['timestamp'], '%d/%b/%Y:%H:%M:%S %z')
+    except ValueError:
+        return None
+    entry['user_id'] = int(entry['user_id']) if entry['user_id'].lstrip('-').isdigit() else None
+    return entry
+
+
+def make_index_record(offset, raw_line):
+    """Запис індексу для рядка журналу raw_line (байти разом з \\n), що починається з offset."""
+    entry = parse_log_line(raw_line.decode('utf-8', errors='replace'))
+    if entry is None:
+        return INDEX_RECORD.pack(offset, len(raw_line), 0, -1, 0, 0)
+    return INDEX_RECORD.pack(
+        offset,
+        len(raw_line),
+        int(entry['timestamp'].timestamp()),
+        entry['user_id'] if entry['user_id'] is not None else -1,
+        name_code(entry['action']),
+        name_code(entry['table'])
+    )
+
+
+def _indexed_end(index_fd):
+    """Зміщення кінця останнього проіндексованого рядка (0 для порожнього індексу)."""
+    size = os.fstat(index_fd).st_size
+    if size < INDEX_RECORD.size:
+        return 0
+    last = os.pread(index_fd, INDEX_RECORD.size, size - size % INDEX_RECORD.size - INDEX_RECORD.size)
+    offset, length = INDEX_RECORD.unpack(last)[:2]
+    return offset + length
+
+
+class AuditLogWriter:
+    """Черга рядків журналу та фоновий потік, що записує їх пачками."""
+
+    def __init__(self, path, batch_size=100, flush_interval=1.0, max_queue=10000):
+        self.path = path
+        self.index_path = path + INDEX_SUFFIX
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        atexit.register(self.close)
+
+    def _ensure_started(self):
+        """
+        Потік запису запускається при першому записі та заново після fork:
+        потоки не успадковуються дочірнім процесом, а черга батька
+        не повинна записатися вдруге з воркера.
+        """
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid:
+            return self._queue
+        with self._lock:
+            if self._thread is None or self._pid != pid:
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._queue,),
+                    name='audit-log-writer', daemon=True
+                )
+                self._pid = pid
+                self._thread.start()
+        return self._queue
+
+    def write(self, line):
+        """Ставить рядок у чергу. Якщо черга переповнена - чекає (записи журналу не губляться)."""
+        self._ensure_started().put(line)
+
+    def flush(self, timeout=5.0):
+        """Чекає, поки все, що вже в черзі, буде записано у файл."""
+        if self._thread is None or self._pid != os.getpid():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """Дописує залишок черги та зупиняє потік (викликається також при завершенні процесу)."""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        thread = self._thread
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        with self._lock:
+            if self._thread is thread:
+                self._thread = None
+
+    def _run(self, lines_queue):
+        pending = []
+        deadline = None
+
+        while True:
+            timeout = None if not pending else max(0.0, deadline - time.monotonic())
+            try:
+                item = lines_queue.get(timeout=timeout)
+            except queue.Empty:
+                # Минув flush_interval від першого рядка пачки
+                self._write_batch(pending)
+                pending = []
+                continue
+
+            if item is _STOP:
+                self._write_batch(pending)
+                return
+            if isinstance(item, threading.Event):
+                self._write_batch(pending)
+                pending = []
+                item.set()
+                continue
+
+            if not pending:
+                deadline = time.monotonic() + self.flush_interval
+            pending.append(item)
+            if len(pending) >= self.batch_size:
+                self._write_batch(pending)
+                pending = []
+
+    def _write_batch(self, lines):
+        if not lines:
+            return
+        encoded = [line.encode('utf-8') for line in lines]
+        data = b''.join(encoded)
+        try:
+            # Файл відкривається на кожну пачку, а не на кожен рядок: так працює ротація логів
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                if fcntl:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    offset = os.fstat(fd).st_size
+                    # Під блокуванням дописуємо навіть у разі часткового запису
+                    view = memoryview(data)
+                    while view:
+                        view = view[os.write(fd, view):]
+                    if fcntl:
+                        self._append_index(offset, encoded)
+                finally:
+                    if fcntl:
+                        fcntl.flock(fd, fcntl.LOCK_UN)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            print(f"Помилка логування: {e}")
+
+    def _append_index(self, offset, encoded_lines):
+        """
+        Дописує записи індексу для щойно записаної пачки (під flock журналу).
+        Якщо індекс відстає від журналу (рядки без індексу, новий файл індексу),
+        пачка не індексується - пропуск надолужить ensure_log_index() при читанні.
+        """
+        try:
+            index_fd = os.open(self.index_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        except OSError as e:
+            print(f"Помилка запису індексу журналу: {e}")
+            return
+        try:
+            if _indexed_end(index_fd) != offset:
+                return
+            records = []
+            for raw_line in encoded_lines:
+                records.append(make_index_record(offset, raw_line))
+                offset += len(raw_line)
+            os.write(index_fd, b''.join(records))
+        except OSError as e:
+            print(f"Помилка запису індексу журналу: {e}")
+        finally:
+            os.close(index_fd)
+
+
+def ensure_log_index(path):
+    """
+    Доводить індекс у відповідність до журналу: перебудовує його, якщо журнал
+    ротовано або обрізано, і доіндексовує рядки, записані без індексу.
+    Повертає True, якщо індексом можна користуватися.
+    """
+    if fcntl is None or not os.path.exists(path):
+        return False
+
+    index_path = path + INDEX_SUFFIX
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return False
+    try:
+        # Те саме блокування, що й у потоку запису: журнал не зростає під час доіндексації
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            index_fd = os.open(index_path, os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError:
+            return False
+        try:
+            log_size = os.fstat(fd).st_size
+            index_size = os.fstat(index_fd).st_size
+            if index_size % INDEX_RECORD.size:
+                # Недописаний останній запис
+                index_size -= index_size % INDEX_RECORD.size
+                os.ftruncate(index_fd, index_size)
+
+            end = _indexed_end(index_fd)
+            if end > log_size or (end and os.pread(fd, 1, end - 1) != b'\n'):
+                # Журнал замінено або обрізано - індекс будується заново
+                os.ftruncate(index_fd, 0)
+                end = 0
+
+            if end < log_size:
+                _index_tail(fd, index_fd, end, log_size)
+            return True
+        finally:
+            os.close(index_fd)
+    except OSError as e:
+        print(f"Помилка побудови індексу журналу: {e}")
+        return False
+    finally:
+        os.close(fd)
+
+
+def _index_tail(fd, index_fd, start, end, block_size=1024 * 1024):
+    """Індексує повні рядки журналу від start до end (незавершений останній рядок пропускається)."""
+    os.lseek(index_fd, 0, os.SEEK_END)
+    position = start
+    remainder = b''
+    while position < end:
+        block = os.pread(fd, min(block_size, end - position), position)
+        if not block:
+            break
+        data = remainder + block
+        line_start = position - len(remainder)
+        position += len(block)
+
+        records = []
+        cursor = 0
+        while True:
+            newline = data.find(b'\n', cursor)
+            if newline == -1:
+                break
+            raw_line = data[cursor:newline + 1]
+            records.append(make_index_record(line_start + cursor, raw_line))
+            cursor = newline + 1
+        remainder = data[cursor:]
+        os.write(index_fd, b''.join(records))
+
+
+def iter_lines_reverse(path, end=None, block_size=64 * 1024):
+    """
+    Читає журнал з кінця блоками і віддає (offset, рядок) від новіших до старіших.
+    Працює без індексу; end - зміщення, до якого читати (початок рядка).
+    """
+    with open(path, 'rb') as f:
+        position = f.seek(0, os.SEEK_END) if end is None else end
+        tail = b''
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            data = f.read(read_size) + tail
+
+            # Перший фрагмент може бути кінцем рядка з попереднього блоку
+            first_newline = data.find(b'\n')
+            if first_newline == -1 and position > 0:
+                tail = data
+                continue
+            if position == 0:
+                tail, body_start = b'', 0
+            else:
+                tail, body_start = data[:first_newline + 1], first_newline + 1
+
+            line_end = len(data)
+            while line_end > body_start:
+                line_start = data.rfind(b'\n', body_start, line_end - 1) + 1
+                if line_start <= body_start:
+                    line_start = body_start
+                raw_line = data[line_start:line_end]
+                if raw_line.strip():
+                    yield position + line_start, raw_line.decode('utf-8', errors='replace')
+                line_end = line_start
+
+
+def _entry_matches(entry, user_id, action, table, date_from, date_to):
+    """Точна перевірка запису журналу за фільтрами (рядки іншого формату проходять лише без фільтрів)."""
+    if 'timestamp' not in entry:
+        return user_id is None and action is None and table is None and date_from is None and date_to is None
+    if user_id is not None and entry['user_id'] != user_id:
+        return False
+    if action is not None and entry['action'] != action:
+        return False
+    if table is not None and entry['table'] != table:
+        return False
+    if date_from is not None and entry['timestamp'] < date_from:
+        return False
+    if date_to is not None and entry['timestamp'] >= date_to:
+        return False
+    return True
+
+
+def _make_entry(offset, line):
+    entry = parse_log_line(line) or {}
+    entry['offset'] = offset
+    entry['line'] = line.rstrip('\r\n')
+    return entry
+
+
+def _query_log_index(path, user_id, action, table, date_from, date_to, before, limit):
+    """Фільтрація та гортання назад по індексу: з журналу читаються лише знайдені рядки."""
+    index_path = path + INDEX_SUFFIX
+    action_code = name_code(action) if action is not None else None
+    table_code = name_code(table) if table is not None else None
+    ts_from = int(date_from.timestamp()) if date_from else None
+    ts_to = int(date_to.timestamp()) if date_to else None
+
+    with open(index_path, 'rb') as index_file, open(path, 'rb') as log_file:
+        total = os.fstat(index_file.fileno()).st_size // INDEX_RECORD.size
+
+        def record_at(i):
+            return INDEX_RECORD.unpack(os.pread(index_file.fileno(), INDEX_RECORD.size, i * INDEX_RECORD.size))
+
+        # Бінарний пошук першого запису, що не потрапляє на сторінку (зміщення зростають строго)
+        upper = total
+        if before is not None:
+            lo, hi = 0, total
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if record_at(mid)[0] < before:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            upper = lo
+        if ts_to is not None:
+            # Час зростає майже монотонно, тому шукаємо з допуском
+            lo, hi = 0, upper
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if record_at(mid)[2] < ts_to + DATE_SCAN_SLACK:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            upper = lo
+
+        entries = []
+        position = upper
+        while position > 0 and len(entries) <= limit:
+            count = min(INDEX_SCAN_RECORDS, position)
+            position -= count
+            block = os.pread(index_file.fileno(), count * INDEX_RECORD.size, position * INDEX_RECORD.size)
+            records = list(INDEX_RECORD.iter_unpack(block))
+
+            for offset, length, ts, rec_user, rec_action, rec_table in reversed(records):
+                if ts_from is not None and ts and ts < ts_from - DATE_SCAN_SLACK:
+                    position = 0
+                    break
+                if user_id is not None and rec_user != user_id:
+                    continue
+                if action_code is not None and rec_action != action_code:
+                    continue
+                if table_code is not None and rec_table != table_code:
+                    continue
+                if ts_from is not None and ts < ts_from:
+                    continue
+                if ts_to is not None and ts >= ts_to:
+                    continue
+
+                line = os.pread(log_file.fileno(), length, offset).decode('utf-8', errors='replace')
+                entry = _make_entry(offset, line)
+                # Повна перевірка рядка відсікає збіги хешів
+                if not _entry_matches(entry, user_id, action, table, date_from, date_to):
+                    continue
+                entries.append(entry)
+                if len(entries) > limit:
+                    break
+
+    return entries
+
+
+def query_log(path, user_id=None, action=None, table=None, date_from=None, date_to=None,
+              before=None, limit=500):
+    """
+    Повертає (entries, next_before): до limit записів журналу від новіших до старіших,
+    що проходять фільтри, та зміщення для наступної (старішої) сторінки або None.
+    date_from/date_to - datetime з часовим поясом, date_to не включно.
+    """
+    if ensure_log_index(path):
+        entries = _query_log_index(path, user_id, action, table, date_from, date_to, before, limit)
+    else:
+        # Без індексу (Windows, немає прав на запис) - послідовне читання з кінця файлу
+        entries = []
+        for offset, line in iter_lines_reverse(path, end=before):
+            entry = _make_entry(offset, line)
+            if _entry_matches(entry, user_id, action, table, date_from, date_to):
+                entries.append(entry)
+                if len(entries) > limit:
+                    break
+
+    next_before = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        next_before = entries[-1]['offset']
+    return entries, next_before
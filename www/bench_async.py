@@ -0,0 +1,115 @@
+"""
+Порівняння синхронного та асинхронного шляху читання списків.
+
+    python bench_async.py --concurrency 32 --requests 500 --query adm --table tickets
+
+Синхронний шлях: N потоків, кожен викликає get_*_page (пул ConnectionPool,
+один запит "лічильник + сторінка"). Асинхронний: N задач в одному циклі подій,
+кожна викликає get_*_page_async (пул AsyncConnectionPool, лічильник і сторінка
+паралельно). Кеш результатів не використовується - кожен виклик іде в БД.
+Розміри пулів - DB_POOL_MAX_SIZE та ASYNC_DB_POOL_MAX_SIZE, як у застосунку.
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import app
+
+LOADERS = {
+    'helpers': (app.get_helpers_page, app.get_helpers_page_async),
+    'tickets': (app.get_tickets_page, app.get_tickets_page_async),
+}
+
+
+def summarize(name, durations, failed, elapsed):
+    """Пропускна здатність і затримки (мс) одного прогону."""
+    durations = sorted(durations)
+    if not durations:
+        print(f"{name:>5}: усі {failed} запитів завершилися помилкою")
+        return
+
+    def percentile(p):
+        return durations[min(len(durations) - 1, int(len(durations) * p))] * 1000
+
+    print(f"{name:>5}: {len(durations) / elapsed:8.1f} запитів/с  "
+          f"p50 {percentile(0.50):7.1f} мс  p95 {percentile(0.95):7.1f} мс  "
+          f"p99 {percentile(0.99):7.1f} мс  середнє {statistics.mean(durations) * 1000:7.1f} мс  "
+          f"помилок {failed}")
+
+
+def run_sync(loader, kwargs, concurrency, total):
+    def one_request(_):
+        started = time.perf_counter()
+        page = loader(**kwargs)
+        return time.perf_counter() - started, page.get('failed', False)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one_request, range(total)))
+    return results, time.perf_counter() - started
+
+
+async def run_async(loader, kwargs, concurrency, total):
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one_request():
+        async with slots:
+            started = time.perf_counter()
+            page = await loader(**kwargs)
+            return time.perf_counter() - started, page.get('failed', False)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one_request() for _ in range(total)))
+    return results, time.perf_counter() - started
+
+
+def report(name, results, elapsed):
+    durations = [duration for duration, failed in results if not failed]
+    summarize(name, durations, len(results) - len(durations), elapsed)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Синхронний vs асинхронний шлях читання сторінок списків.")
+    parser.add_argument('--table', choices=sorted(LOADERS), default='helpers')
+    parser.add_argument('--query', default='', help="Рядок пошуку (як у полі пошуку на сторінці).")
+    parser.add_argument('--sort-by', default='')
+    parser.add_argument('--page-size', type=int, default=app.PAGE_SIZE_DEFAULT)
+    parser.add_argument('--concurrency', type=int, default=16, help="Одночасних запитів.")
+    parser.add_argument('--requests', type=int, default=200, help="Запитів на кожен шлях.")
+    parser.add_argument('--warmup', type=int, default=20, help="Запитів прогріву (не враховуються).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sync_loader, async_loader = LOADERS[args.table]
+    kwargs = {'query': args.query, 'sort_by': args.sort_by, 'page_size': args.page_size}
+
+    print(f"Таблиця {args.table}, пошук '{args.query}', сторінка {args.page_size}, "
+          f"одночасно {args.concurrency}, запитів {args.requests}; "
+          f"пули: sync {app.DB_POOL_MAX_SIZE}, async {app.ASYNC_DB_POOL_MAX_SIZE}")
+
+    # Прогрів: відкриття з'єднань пулів і кеш планів запитів у БД
+    run_sync(sync_loader, kwargs, args.concurrency, args.warmup)
+    async_loop = asyncio.new_event_loop()
+    try:
+        async_loop.run_until_complete(run_async(async_loader, kwargs, args.concurrency, args.warmup))
+
+        results, elapsed = run_sync(sync_loader, kwargs, args.concurrency, args.requests)
+        report('sync', results, elapsed)
+        results, elapsed = async_loop.run_until_complete(
+            run_async(async_loader, kwargs, args.concurrency, args.requests)
+        )
+        report('async', results, elapsed)
+    finally:
+        async_loop.close()
+        app.async_reader.close()
+        app.close_pool()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
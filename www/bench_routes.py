@@ -0,0 +1,363 @@
+"""
+Бенчмарк маршрутів і функцій доступу до даних на тимчасовій базі даних.
+
+    python bench_routes.py --scales 1k,100k,1m --iterations 50 --output results.json
+    python bench_routes.py --compare old.json --output new.json
+
+Для кожного запуску:
+1. initdb створює тимчасовий кластер (pg_ephemeral.py), у нього завантажується
+   схема з wdb.sql (pg_restore --schema-only) та застосовуються міграції;
+2. база дозаповнюється до кожного масштабу по черзі (1k -> 100k -> 1m тікетів,
+   помічників - у 100 разів менше) генератором python grud.py generate;
+3. кожен маршрут (через тестовий клієнт Flask під сесією SuperAdmin) і кожна
+   функція get_* вимірюються: прогрів, потім --iterations викликів у
+   --concurrency потоків; записуються p50/p95/p99, середнє та запити/с.
+
+Результати - JSON (метадані запуску + рядок на кожен масштаб і випадок), який
+можна порівняти з попереднім запуском через --compare.
+Кеш результатів і журнал повільних запитів за замовчуванням вимкнено
+(RESULT_CACHE_TTL=0, SLOW_QUERY_MS=0, TABLE_VERSIONS_ENABLED=0), щоб вимірювалась робота з БД.
+З --dsn бенчмарк працює з наявною базою без initdb і заповнення.
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+import psycopg
+from psycopg.conninfo import conninfo_to_dict
+
+from pg_ephemeral import EphemeralPostgres
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SCHEMA_PATH = os.path.join(BASE_DIR, 'wdb.sql')
+# Генератор синтетичних даних (python grud.py generate)
+GRUD_PATH = os.path.join(os.path.dirname(BASE_DIR), 'grud.py')
+BENCH_WEBADMINS = 50
+
+RANKS = ('Moder', 'Admin', 'Curator', 'Manager', 'SuperAdmin')
+
+# (назва, шлях); heavy - повільні випадки (експорт усієї таблиці), для них --heavy-iterations
+ROUTE_CASES = [
+    ('home', '/', False),
+    ('home_search', '/?' + urlencode({'query': 'Олена'}), False),
+    ('home_sort_warnings', '/?sort_by=warnings_count&sort_type=desc', False),
+    ('home_rank_filter', '/?rank_filter=Admin', False),
+    ('tickets', '/tickets', False),
+    ('tickets_search', '/tickets?' + urlencode({'query': 'вовк'}), False),
+    ('tickets_search_number', '/tickets?query=5', False),
+    ('tickets_sort_handler', '/tickets?sort_by=handler_name', False),
+    ('tickets_sort_time_desc', '/tickets?sort_by=time_spent&sort_type=desc', False),
+    ('admin_page', '/admin-page', False),
+    ('admin_page_search', '/admin-page?query=webadmin_1', False),
+    ('api_helpers', '/api/v1/helpers?limit=100', False),
+    ('api_tickets', '/api/v1/tickets?limit=100', False),
+    ('api_tickets_search', '/api/v1/tickets?' + urlencode({'limit': 100, 'query': 'frost'}), False),
+    ('api_helper_details', '/api/v1/helpers/1', False),
+    ('dashboard', '/dashboard', False),
+    ('dashboard_sort_rating', '/dashboard?sort_by=avg_rating&sort_type=asc', False),
+    ('api_helper_stats', '/api/v1/helper-stats?limit=100', False),
+    ('export_helperinfo_csv', '/export-helperinfo?format=csv', True),
+    ('export_ticketinfo_csv', '/export-ticketinfo?' + urlencode({'format': 'csv', 'query': 'wolf'}), True),
+]
+
+
+def function_cases(app):
+    """(назва, виклик, heavy) для функцій доступу до даних (поза HTTP-запитом)."""
+    return [
+        ('get_all_helpers', lambda: app.get_all_helpers(), True),
+        ('get_all_helpers_search', lambda: app.get_all_helpers(query='Коваленко'), False),
+        ('get_helpers_page', lambda: app.get_helpers_page(sort_by='warnings_count', sort_type='DESC'), False),
+        ('get_helper_by_id', lambda: app.get_helper_by_id(1), False),
+        ('get_all_tickets', lambda: app.get_all_tickets(), True),
+        ('get_all_tickets_search', lambda: app.get_all_tickets(query='вовк'), True),
+        ('get_tickets_by_multi_search', lambda: app.get_tickets_by_multi_search('5'), True),
+        ('get_tickets_page', lambda: app.get_tickets_page(), False),
+        ('get_tickets_page_search', lambda: app.get_tickets_page(query='вовк'), False),
+        ('get_tickets_page_sort_handler', lambda: app.get_tickets_page(sort_by='handler_name'), False),
+        ('get_webadmins_by_search', lambda: app.get_webadmins_by_search('webadmin_1'), False),
+        ('get_webadmins_by_rank', lambda: app.get_webadmins_by_rank('Admin'), False),
+    ]
+
+
+def parse_scale(value):
+    """'1k' -> 1000, '1m' -> 1000000, '2500' -> 2500."""
+    value = value.strip().lower()
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(value[-1:], 1)
+    number = value[:-1] if multiplier != 1 else value
+    return int(float(number) * multiplier)
+
+
+# ==========================================================
+# Заповнення бази даних
+# ==========================================================
+
+def seed_to_scale(db_env, tickets, seed=42):
+    """
+    Дозаповнює базу до tickets тікетів (помічників - tickets/100, але не менше 10)
+    генератором grud.py generate і додає 50 веб-адмінів. Той самий seed дає ті самі
+    дані. Повертає кількість рядків у таблицях.
+    """
+    helpers = max(10, tickets // 100)
+    subprocess.run(
+        [sys.executable, GRUD_PATH, 'generate', '--helpers', str(helpers), '--tickets', str(tickets),
+         '--seed', str(seed)],
+        env={**os.environ, **db_env}, check=True
+    )
+    with psycopg.connect(conninfo_from_env(db_env)) as conn:
+        have = conn.execute("SELECT count(*) FROM webadmin").fetchone()[0]
+        if have < BENCH_WEBADMINS:
+            # Пароль не є хешем - під цими обліковими записами увійти неможливо
+            conn.execute("""
+                INSERT INTO webadmin (webadmin_name, webadmin_rank, webadmin_password)
+                SELECT 'webadmin_' || g, (%s::text[])[1 + g %% 5], '!'
+                FROM generate_series(%s::int, %s::int) AS g
+            """, (list(RANKS), have + 1, BENCH_WEBADMINS))
+            conn.execute("ANALYZE webadmin")
+        conn.commit()
+        return table_counts(conn)
+
+
+def table_counts(conn):
+    return {
+        table: conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+        for table in ('helperinfo', 'ticketinfo', 'webadmin')
+    }
+
+
+def conninfo_from_env(db_env):
+    return (f"postgresql://{db_env['DB_USER']}:{db_env['DB_PASSWORD']}@{db_env['DB_HOST']}:"
+            f"{db_env['DB_PORT']}/{db_env['DB_NAME']}")
+
+
+# ==========================================================
+# Вимірювання
+# ==========================================================
+
+def measure(call, iterations, warmup, concurrency):
+    """Викликає call() warmup + iterations разів; call повертає (успіх, статус)."""
+    for _ in range(warmup):
+        call()
+
+    def timed(_):
+        started = time.perf_counter()
+        ok, status = call()
+        return time.perf_counter() - started, ok, status
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            samples = list(executor.map(timed, range(iterations)))
+    else:
+        samples = [timed(i) for i in range(iterations)]
+    elapsed = time.perf_counter() - started
+
+    durations = sorted(duration * 1000 for duration, _, _ in samples)
+
+    def percentile(p):
+        return round(durations[min(len(durations) - 1, int(len(durations) * p))], 3)
+
+    return {
+        'iterations': iterations,
+        'concurrency': concurrency,
+        'errors': sum(1 for _, ok, _ in samples if not ok),
+        'status': dict(Counter(str(status) for _, _, status in samples)),
+        'rps': round(iterations / elapsed, 2) if elapsed else None,
+        'mean_ms': round(statistics.mean(durations), 3),
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'min_ms': round(durations[0], 3),
+        'max_ms': round(durations[-1], 3),
+    }
+
+
+def route_call(client, path):
+    def call():
+        response = client.get(path)
+        # Потокові відповіді (експорт) генеруються лише під час читання тіла
+        response.get_data()
+        response.close()
+        return response.status_code == 200, response.status_code
+    return call
+
+
+def function_call(fn):
+    def call():
+        result = fn()
+        failed = isinstance(result, dict) and result.get('failed')
+        return not failed, 'failed' if failed else 'ok'
+    return call
+
+
+def run_cases(app, client, scale_name, counts, args):
+    results = []
+    cases = [(name, 'route', route_call(client, path), heavy) for name, path, heavy in ROUTE_CASES]
+    cases += [(name, 'function', function_call(fn), heavy) for name, fn, heavy in function_cases(app)]
+    for name, kind, call, heavy in cases:
+        if args.only and not any(part in name for part in args.only):
+            continue
+        iterations = args.heavy_iterations if heavy else args.iterations
+        stats = measure(call, iterations, min(args.warmup, iterations), 1 if heavy else args.concurrency)
+        row = {'scale': scale_name, **counts, 'case': name, 'kind': kind, **stats}
+        results.append(row)
+        print(f"  {kind:>8} {name:<32} p50 {stats['p50_ms']:>9.2f} мс  p95 {stats['p95_ms']:>9.2f} мс  "
+              f"{stats['rps'] or 0:>8.1f}/с  помилок {stats['errors']}")
+    return results
+
+
+def compare(results, baseline_path):
+    """Друкує зміну p50 і пропускної здатності відносно попереднього запуску."""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(row['scale'], row['case']): row for row in json.load(f)['results']}
+    print(f"\nПорівняння з {baseline_path} (p50: від'ємне - швидше):")
+    for row in results:
+        old = baseline.get((row['scale'], row['case']))
+        if old is None:
+            continue
+        p50_change = (row['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0
+        rps_change = (row['rps'] - old['rps']) / old['rps'] * 100 if old.get('rps') else 0
+        print(f"  {row['scale']:>6} {row['case']:<32} p50 {old['p50_ms']:>9.2f} -> {row['p50_ms']:>9.2f} мс "
+              f"({p50_change:+6.1f}%)  rps {rps_change:+6.1f}%")
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def import_app(db_env):
+    """app.py читає налаштування БД під час імпорту - імпортуємо після запуску кластера."""
+    os.environ.update(db_env)
+    # Вимірюємо роботу з БД, а не кеш; змінні середовища мають пріоритет
+    os.environ.setdefault('RESULT_CACHE_TTL', '0')
+    os.environ.setdefault('SLOW_QUERY_MS', '0')
+    # Без кешу версії таблиць не потрібні, а слухач LISTEN переживав би зупинку кластера
+    os.environ.setdefault('TABLE_VERSIONS_ENABLED', '0')
+    return importlib.import_module('app')
+
+
+def logged_in_client(app):
+    client = app.app.test_client()
+    with client.session_transaction() as flask_session:
+        flask_session['logged_in'] = True
+        flask_session['webadmin_id'] = 1
+        flask_session['username'] = 'bench'
+        flask_session['user_rank'] = 'SuperAdmin'
+    return client
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк маршрутів і функцій get_* на тимчасовій базі даних.")
+    parser.add_argument('--scales', default='1k,100k', help="Кількість тікетів через кому: 1k,100k,1m.")
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--heavy-iterations', type=int, default=3,
+                        help="Ітерацій для повільних випадків (експорт, повні списки).")
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=1, help="Потоків для звичайних випадків.")
+    parser.add_argument('--only', action='append', help="Лише випадки, назва яких містить рядок (можна кілька).")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--schema', default=SCHEMA_PATH, help="Схема: дамп custom-формату або SQL-файл.")
+    parser.add_argument('--pg-bin', help="Папка з initdb/pg_ctl/pg_restore (або PG_BIN_DIR).")
+    parser.add_argument('--shared-buffers', default='256MB')
+    parser.add_argument('--keep-cluster', action='store_true', help="Не видаляти тимчасовий кластер.")
+    parser.add_argument('--dsn', help="Наявна база даних замість тимчасової (без заповнення).")
+    parser.add_argument('--output', default=None, help="JSON з результатами (за замовчуванням bench-results-<час>.json).")
+    parser.add_argument('--compare', help="JSON попереднього запуску для порівняння.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    started_at = datetime.now(timezone.utc).astimezone()
+    output = args.output or f"bench-results-{started_at.strftime('%Y%m%d-%H%M%S')}.json"
+
+    cluster = None
+    if args.dsn:
+        params = conninfo_to_dict(args.dsn)
+        db_env = {
+            'DB_NAME': params.get('dbname', 'wdb'), 'DB_USER': params.get('user', 'webadmin'),
+            'DB_PASSWORD': params.get('password', ''), 'DB_HOST': params.get('host', 'localhost'),
+            'DB_PORT': str(params.get('port', '5432')),
+        }
+        scales = [('existing', None)]
+    else:
+        cluster = EphemeralPostgres(args.pg_bin, settings={'shared_buffers': args.shared_buffers},
+                                    keep=args.keep_cluster)
+        scales = [(name.strip(), parse_scale(name)) for name in args.scales.split(',') if name.strip()]
+        scales.sort(key=lambda item: item[1])
+
+    results = []
+    try:
+        if cluster is not None:
+            print(f"Тимчасовий PostgreSQL ({cluster.bin_dir}) ...")
+            cluster.start()
+            cluster.load_schema(args.schema)
+            db_env = cluster.env()
+
+        app = import_app(db_env)
+        if cluster is not None:
+            applied = app.apply_migrations()
+            print(f"Міграції: {', '.join(applied) or 'немає нових'}")
+
+        with psycopg.connect(app.CONN_STRING) as conn:
+            server_version = conn.execute("SHOW server_version").fetchone()[0]
+        client = logged_in_client(app)
+
+        for scale_name, tickets in scales:
+            if tickets is not None:
+                seed_started = time.perf_counter()
+                counts = seed_to_scale(db_env, tickets, args.seed)
+                print(f"\nМасштаб {scale_name}: {counts} (заповнення {time.perf_counter() - seed_started:.1f} с)")
+            else:
+                with psycopg.connect(app.CONN_STRING) as conn:
+                    counts = table_counts(conn)
+                print(f"\nНаявна база: {counts}")
+            results += run_cases(app, client, scale_name, counts, args)
+
+        report = {
+            'meta': {
+                'started_at': started_at.isoformat(timespec='seconds'),
+                'git_commit': git_commit(),
+                'python': platform.python_version(),
+                'psycopg': psycopg.__version__,
+                'postgres': server_version,
+                'platform': platform.platform(),
+                'env': {name: os.environ.get(name) for name in (
+                    'RESULT_CACHE_TTL', 'TABLE_VERSIONS_ENABLED', 'ASYNC_READS', 'DB_POOL_MAX_SIZE', 'SLOW_QUERY_MS', 'METRICS_ENABLED')},
+                'args': vars(args),
+            },
+            'results': results,
+        }
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nРезультати: {output}")
+        if args.compare:
+            compare(results, args.compare)
+    finally:
+        if 'app' in sys.modules:
+            app_module = sys.modules['app']
+            app_module.shutdown_worker()
+        if cluster is not None:
+            cluster.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
@@ -0,0 +1,137 @@
+"""
+Кеш результатів запитів списків у пам'яті процесу (LRU + TTL).
+
+Ключ запису - назви таблиць, від яких залежить результат, і параметри
+сторінки (пошук, сортування, фільтр, сторінка). Для кожної таблиці ведеться
+лічильник поколінь: маршрути, що змінюють таблицю, збільшують його, і всі
+записи, збережені зі старим поколінням, при наступному зверненні вважаються
+застарілими та видаляються. Обсяг кешу обмежений приблизним розміром у байтах.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def estimate_size(value):
+    """Приблизний розмір у пам'яті результату запиту (списки словників/кортежів зі скалярами)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += sys.getsizeof(key) + estimate_size(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += estimate_size(item)
+    return size
+
+
+class ResultCache:
+    """Потокобезпечний LRU-кеш з TTL, обмеженням обсягу та поколіннями таблиць."""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, ttl=30.0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        # (tables, key) -> (generations, expires_at, size, value); порядок - від давно використаних
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._bytes = 0
+        self._counters = {'hits': 0, 'misses': 0, 'stale': 0, 'expired': 0, 'evictions': 0}
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_bytes > 0
+
+    def _current_generations(self, tables):
+        return tuple(self._generations.get(table, 0) for table in tables)
+
+    def _drop(self, full_key):
+        entry = self._entries.pop(full_key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def _lookup(self, tables, full_key, now):
+        """(влучання, значення, покоління таблиць на момент пошуку)."""
+        with self._lock:
+            generations = self._current_generations(tables)
+            entry = self._entries.get(full_key)
+            if entry is not None:
+                if entry[0] != generations:
+                    self._drop(full_key)
+                    self._counters['stale'] += 1
+                elif entry[1] <= now:
+                    self._drop(full_key)
+                    self._counters['expired'] += 1
+                else:
+                    self._entries.move_to_end(full_key)
+                    self._counters['hits'] += 1
+                    return True, entry[3], generations
+            self._counters['misses'] += 1
+        return False, None, generations
+
+    def _store(self, tables, full_key, generations, now, value, cacheable):
+        if cacheable is not None and not cacheable(value):
+            return
+
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            # Поки йшов запит, таблицю могли змінити - тоді результат уже застарів
+            if self._current_generations(tables) != generations:
+                return
+            self._drop(full_key)
+            self._entries[full_key] = (generations, now + self.ttl, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._drop(oldest_key)
+                self._counters['evictions'] += 1
+
+    def get_or_load(self, tables, key, loader, cacheable=None):
+        """
+        Повертає результат із кешу або викликає loader() і зберігає результат.
+        tables - кортеж таблиць, зміни в яких роблять результат застарілим;
+        cacheable(value) -> False, якщо результат не можна кешувати (наприклад, помилка БД).
+        """
+        if not self.enabled:
+            return loader()
+
+        tables = tuple(tables)
+        full_key = (tables, key)
+        now = time.monotonic()
+        hit, value, generations = self._lookup(tables, full_key, now)
+        if hit:
+            return value
+
+        # Запит до БД виконується без блокування кешу
+        value = loader()
+        self._store(tables, full_key, generations, now, value, cacheable)
+        return value
+
+    def invalidate(self, *tables):
+        """Позначає всі закешовані результати, що залежать від таблиць, застарілими."""
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Лічильники влучань/промахів та поточний обсяг кешу."""
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                **self._counters,
+                'hit_ratio': round(self._counters['hits'] / lookups, 4) if lookups else None,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'generations': dict(self._generations),
+            }
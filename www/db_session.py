@@ -0,0 +1,229 @@
+"""
+Одиниця роботи (unit of work) з базою даних у межах одного HTTP-запиту.
+
+Функції доступу до даних у app.py самі беруть з'єднання (get_connection),
+фіксують чи відкочують зміни і повертають його (release_connection). Під час
+запиту вони отримують не окреме з'єднання з пулу, а обгортку над одним спільним
+з'єднанням запиту:
+
+- з'єднання береться з пулу лише при першому зверненні до БД;
+- commit() функції нічого не робить - транзакція фіксується один раз наприкінці
+  запиту (DbSession.commit), а release_connection не повертає з'єднання в пул;
+- rollback() функції відкочує лише її власні зміни: якщо до неї в транзакції вже
+  є зміни інших функцій, перед її першою інструкцією ставиться SAVEPOINT
+  (після самих лише читань достатньо відкотити транзакцію цілком);
+- інструкція, що завершилася помилкою, одразу відкочує одиницю своєї функції
+  (до SAVEPOINT або всю транзакцію з самими читаннями): функція, що перехопила
+  помилку і повернула [] / None, не залишає транзакцію запиту в стані помилки
+  для наступних функцій; якщо разом з нею довелося відкотити зміни інших функцій,
+  запит позначається як невдалий (DbSession.failed) і завершується помилкою;
+- кожна виконана інструкція рахується (DbSession.statements), а час їх
+  виконання сумується (DbSession.db_time, секунди; без COPY) і передається
+  в on_statement(sql, params, секунди) - журнал повільних запитів.
+"""
+import time
+from contextlib import contextmanager
+
+import psycopg
+
+TransactionStatus = psycopg.pq.TransactionStatus
+
+
+class DbSession:
+    """Спільне з'єднання запиту, відкладена фіксація та лічильник інструкцій."""
+
+    def __init__(self, acquire, release, on_statement=None):
+        # acquire() -> з'єднання з пулу або None; release(conn) - повернення в пул з відкатом
+        self._acquire = acquire
+        self._release = release
+        self._on_statement = on_statement
+        self._conn = None
+        self._savepoint_seq = 0
+        self._has_changes = False
+        self._after_commit = []
+        self.statements = 0
+        self.db_time = 0.0
+        self.failed = False
+
+    @property
+    def in_transaction(self):
+        return self._conn is not None and self._conn.info.transaction_status != TransactionStatus.IDLE
+
+    def unit(self):
+        """Обгортка з'єднання для однієї функції доступу до даних або None, якщо БД недоступна."""
+        if self._conn is None:
+            self._conn = self._acquire()
+            if self._conn is None:
+                return None
+        return UnitConnection(self, self._conn)
+
+    def observe(self, query, params, seconds):
+        """Враховує час виконаної інструкції."""
+        self.db_time += seconds
+        if self._on_statement is not None:
+            self._on_statement(query, params, seconds)
+
+    def after_commit(self, callback, *args):
+        """callback(*args) виконається лише після успішної фіксації транзакції запиту."""
+        self._after_commit.append((callback, args))
+
+    def commit(self):
+        """
+        Фіксує транзакцію запиту та виконує відкладені дії. Повертає False, якщо
+        фіксація не вдалася (тоді всі зміни запиту відкочено).
+        """
+        callbacks, self._after_commit = self._after_commit, []
+        self._has_changes = False
+        if self._conn is not None and self._conn.info.transaction_status == TransactionStatus.INERROR:
+            # COMMIT транзакції з помилкою мовчки відкотив би всі зміни запиту
+            print("❌ Транзакція запиту в стані помилки, зміни не зафіксовано.")
+            self._conn.rollback()
+            self.failed = True
+            return False
+        if self.in_transaction:
+            try:
+                self._conn.commit()
+            except psycopg.Error as e:
+                print(f"❌ Помилка фіксації транзакції запиту: {e}")
+                self.failed = True
+                return False
+
+        for callback, args in callbacks:
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"❌ Помилка дії після фіксації транзакції: {e}")
+        return True
+
+    def close(self):
+        """Повертає з'єднання в пул; незафіксовані зміни відкочуються, відкладені дії скасовуються."""
+        self._after_commit = []
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._release(conn)
+
+
+class UnitConnection:
+    """
+    З'єднання, яке бачить одна функція доступу до даних. Підтримує те, що
+    використовують функції app.py: cursor(), execute(), commit(), rollback();
+    решта атрибутів береться зі справжнього з'єднання.
+    """
+
+    def __init__(self, session, conn):
+        self._session = session
+        self._conn = conn
+        self._started = False
+        self._savepoint = None
+
+    def _begin(self, count=1):
+        """Викликається перед кожною інструкцією функції."""
+        self._session.statements += count
+        if self._started:
+            return
+        self._started = True
+        # Транзакція вже містить зміни інших функцій - відкат цієї не повинен їх зачепити
+        if self._session._has_changes and self._conn.info.transaction_status == TransactionStatus.INTRANS:
+            self._session._savepoint_seq += 1
+            self._savepoint = f"unit_{self._session._savepoint_seq}"
+            self._conn.execute(f"SAVEPOINT {self._savepoint}")
+            self._session.statements += 1
+
+    def _fail(self):
+        """
+        Інструкція функції завершилася помилкою: відкочуємо одиницю функції, щоб
+        наступні функції запиту працювали в робочій транзакції.
+        """
+        lost_changes = self._savepoint is None and self._session._has_changes
+        try:
+            self.rollback()
+        except psycopg.Error as e:
+            print(f"❌ Не вдалося відкотити інструкції після помилки: {e}")
+            lost_changes = True
+        if lost_changes:
+            # Разом з функцією відкочено (або втрачено) зміни попередніх функцій запиту
+            self._session.failed = True
+
+    def cursor(self, *args, **kwargs):
+        return CountingCursor(self._conn.cursor(*args, **kwargs), self)
+
+    def execute(self, query, params=None, **kwargs):
+        self._begin()
+        started = time.perf_counter()
+        try:
+            return self._conn.execute(query, params, **kwargs)
+        except psycopg.Error:
+            self._fail()
+            raise
+        finally:
+            self._session.observe(query, params, time.perf_counter() - started)
+
+    def commit(self):
+        # Фіксація відкладена до кінця запиту; наступні інструкції функції - нова одиниця для відкату
+        if self._started:
+            self._session._has_changes = True
+        self._started = False
+        self._savepoint = None
+
+    def rollback(self):
+        if self._started:
+            if self._savepoint is not None:
+                self._conn.execute(f"ROLLBACK TO SAVEPOINT {self._savepoint}")
+            else:
+                # До цієї функції в транзакції не було змін - відкочуємо її цілком
+                self._conn.rollback()
+        self._started = False
+        self._savepoint = None
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class CountingCursor:
+    """Курсор, що рахує інструкції та ставить SAVEPOINT перед першою з них."""
+
+    def __init__(self, cursor, unit):
+        self._cursor = cursor
+        self._unit = unit
+
+    def _timed(self, method, query, params, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(query, params, **kwargs)
+        except psycopg.Error:
+            self._unit._fail()
+            raise
+        finally:
+            self._unit._session.observe(query, params, time.perf_counter() - started)
+
+    def execute(self, query, params=None, **kwargs):
+        self._unit._begin()
+        self._timed(self._cursor.execute, query, params, **kwargs)
+        return self
+
+    def executemany(self, query, params_seq, **kwargs):
+        params_seq = list(params_seq)
+        self._unit._begin(len(params_seq))
+        self._timed(self._cursor.executemany, query, params_seq, **kwargs)
+
+    @contextmanager
+    def copy(self, statement, *args, **kwargs):
+        self._unit._begin()
+        try:
+            with self._cursor.copy(statement, *args, **kwargs) as copy:
+                yield copy
+        except psycopg.Error:
+            self._unit._fail()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._cursor.close()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
@@ -0,0 +1,72 @@
+"""
+Кеш відрендерених HTML-фрагментів (тіла таблиць <tbody>) у пам'яті процесу.
+
+Навіть коли рядки сторінки взято з кешу результатів, Jinja при кожному перегляді
+заново рендерить тисячі <tr>. Тіло таблиці залежить лише від набору рядків сторінки
+(та рангу користувача, від якого залежать кнопки), тому готовий HTML зберігається
+з тими самими поколіннями таблиць, LRU та обмеженням обсягу, що й у ResultCache,
+а шаблон сторінки вставляє його замість циклу по рядках.
+
+Власного TTL немає: ключ фрагмента містить версії таблиць (table_versions.py), які
+змінюються після кожної зафіксованої зміни в будь-якому воркері, тож застарілий
+фрагмент більше не знаходиться за ключем і лише чекає витіснення LRU.
+
+Разом з HTML запам'ятовується, скільки тривав його рендеринг: кожне влучання
+додає цей час до лічильника заощадженого часу.
+"""
+import time
+
+from markupsafe import Markup
+
+from cache import ResultCache
+
+
+class FragmentCache(ResultCache):
+    """ResultCache для HTML-фрагментів з обліком часу рендерингу."""
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        # Записи не старіють за часом - лише витісняються або скидаються поколіннями
+        super().__init__(max_bytes=max_bytes, ttl=float('inf'))
+        self._render_counters = {'renders': 0, 'render_seconds': 0.0, 'saved_seconds': 0.0}
+
+    def render(self, tables, key, renderer, cacheable=True):
+        """
+        Повертає HTML фрагмента з кешу або результат renderer() і зберігає його.
+        tables - таблиці, зміни в яких роблять фрагмент застарілим (як у get_or_load);
+        cacheable=False - рендерити без збереження (наприклад, сторінка з помилкою БД).
+        Результат - Markup: шаблон сторінки вставляє його без повторного екранування.
+        """
+        tables = tuple(tables)
+        full_key = (tables, key)
+        now = time.monotonic()
+        use_cache = self.enabled and cacheable
+        if use_cache:
+            hit, value, generations = self._lookup(tables, full_key, now)
+            if hit:
+                html, render_seconds = value
+                with self._lock:
+                    self._render_counters['saved_seconds'] += render_seconds
+                return Markup(html)
+
+        started = time.perf_counter()
+        html = str(renderer())
+        render_seconds = time.perf_counter() - started
+        with self._lock:
+            self._render_counters['renders'] += 1
+            self._render_counters['render_seconds'] += render_seconds
+
+        if use_cache:
+            self._store(tables, full_key, generations, now, (html, render_seconds), None)
+        return Markup(html)
+
+    def stats(self):
+        """Лічильники кешу та сумарний час рендерингу: витрачений та заощаджений влучаннями."""
+        stats = super().stats()
+        del stats['ttl']
+        with self._lock:
+            stats.update(
+                renders=self._render_counters['renders'],
+                render_seconds=round(self._render_counters['render_seconds'], 6),
+                render_saved_seconds=round(self._render_counters['saved_seconds'], 6),
+            )
+        return stats
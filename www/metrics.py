@@ -0,0 +1,164 @@
+"""
+Метрики застосунку у текстовому форматі Prometheus (без сторонніх залежностей).
+
+Лічильники та гістограми зберігаються в пам'яті процесу. Під gunicorn кожен
+воркер має власні значення, тому кожен рядок метрики має мітку worker (PID):
+Prometheus, що опитує /metrics через балансувальник, бачить воркерів окремо,
+а sum by (...) у запитах складає їх разом.
+
+Показники, які й так рахуються в іншому місці (пул з'єднань, кеш), не
+дублюються: їх повертає функція, передана в render(), у момент опитування.
+"""
+import os
+import threading
+
+# Межі гістограм затримки (секунди) - як у клієнтських бібліотеках Prometheus
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Лічильник, що лише зростає; значення окремі для кожного набору міток."""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+
+    def inc(self, label_values, amount=1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self, common):
+        for label_values, value in self._values.items():
+            yield self.name, common + tuple(zip(self.label_names, label_values)), value
+
+
+class Histogram:
+    """Гістограма: кількість спостережень у кожному кошику (накопичувально), сума та кількість."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, label_names, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # label_values -> [лічильники кошиків..., сума, кількість]
+        self._values = {}
+
+    def observe(self, label_values, value):
+        state = self._values.get(label_values)
+        if state is None:
+            state = self._values[label_values] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[i] += 1
+                break
+        state[-2] += value
+        state[-1] += 1
+
+    def samples(self, common):
+        for label_values, state in self._values.items():
+            labels = common + tuple(zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                yield f'{self.name}_bucket', labels + (('le', format_value(float(bound))),), cumulative
+            yield f'{self.name}_bucket', labels + (('le', '+Inf'),), state[-1]
+            yield f'{self.name}_sum', labels, state[-2]
+            yield f'{self.name}_count', labels, state[-1]
+
+
+class Gauge:
+    """Поточне значення, отримане в момент опитування (не зберігається між опитуваннями)."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, values, kind='gauge'):
+        # values - [(кортеж пар (мітка, значення), число), ...]
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self._values = values
+
+    def samples(self, common):
+        for labels, value in self._values:
+            yield self.name, common + tuple(labels), value
+
+
+class MetricsRegistry:
+    """Метрики HTTP-запитів та запитів до БД одного процесу."""
+
+    def __init__(self, prefix='webadmin', buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.requests = Counter(
+            f'{prefix}_http_requests_total', "Кількість HTTP-запитів.",
+            ('endpoint', 'method', 'status'))
+        self.latency = Histogram(
+            f'{prefix}_http_request_duration_seconds', "Час обробки HTTP-запиту.",
+            ('endpoint',), buckets)
+        self.db_queries = Counter(
+            f'{prefix}_db_queries_total', "Кількість SQL-інструкцій, виконаних під час запитів.",
+            ('endpoint',))
+        self.db_time = Histogram(
+            f'{prefix}_db_request_seconds', "Сумарний час SQL-інструкцій одного HTTP-запиту.",
+            ('endpoint',), buckets)
+        self._metrics = (self.requests, self.latency, self.db_queries, self.db_time)
+
+    def observe_request(self, endpoint, method, status, duration, db_queries=0, db_seconds=0.0):
+        with self._lock:
+            self.requests.inc((endpoint, method, str(status)))
+            self.latency.observe((endpoint,), duration)
+            if db_queries:
+                self.db_queries.inc((endpoint,), db_queries)
+                self.db_time.observe((endpoint,), db_seconds)
+
+    def gauge(self, name, help_text, values, kind='gauge'):
+        """Метрика для render(): values - [(пари міток, число), ...]; kind - gauge або counter."""
+        return Gauge(f'{self.prefix}_{name}', help_text, values, kind)
+
+    def render(self, collect=None):
+        """
+        Текст у форматі Prometheus. collect() повертає додаткові метрики (gauge())
+        зі станом, що рахується поза реєстром (пул з'єднань, кеш).
+        """
+        common = (('worker', str(os.getpid())),)
+        lines = []
+        with self._lock:
+            families = list(self._metrics)
+            chunks = [self._render_family(metric, common) for metric in families]
+        for metric in (collect() if collect else ()):
+            chunks.append(self._render_family(metric, common))
+        for chunk in chunks:
+            lines.extend(chunk)
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _render_family(metric, common):
+        lines = [f'# HELP {metric.name} {metric.help}', f'# TYPE {metric.name} {metric.kind}']
+        for name, labels, value in metric.samples(common):
+            lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+        return lines
@@ -0,0 +1,41 @@
+-- migrate: no-transaction
+-- Індекси для пошуку в helperinfo, ticketinfo та webadmin.
+-- ILIKE '%...%' по текстових колонках використовує GIN-індекси pg_trgm,
+-- числові запити (= / BETWEEN) - звичайні B-tree індекси по цілих колонках.
+-- Інструкції виконуються окремо і без транзакції: CREATE INDEX CONCURRENTLY не блокує
+-- запис у таблиці, поки будується індекс (GIN по великій таблиці будується довго).
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Перерваний CREATE INDEX CONCURRENTLY залишає недійсний (INVALID) індекс, який
+-- IF NOT EXISTS пропустив би, тому при повторному запуску індекси будуються заново (як у 0004)
+
+-- HelperInfo
+DROP INDEX CONCURRENTLY IF EXISTS public.helperinfo_admin_name_trgm_idx;
+CREATE INDEX CONCURRENTLY helperinfo_admin_name_trgm_idx
+    ON public.helperinfo USING gin (admin_name gin_trgm_ops);
+DROP INDEX CONCURRENTLY IF EXISTS public.helperinfo_admin_rank_trgm_idx;
+CREATE INDEX CONCURRENTLY helperinfo_admin_rank_trgm_idx
+    ON public.helperinfo USING gin (admin_rank gin_trgm_ops);
+DROP INDEX CONCURRENTLY IF EXISTS public.helperinfo_warnings_count_idx;
+CREATE INDEX CONCURRENTLY helperinfo_warnings_count_idx
+    ON public.helperinfo (warnings_count);
+
+-- TicketInfo
+DROP INDEX CONCURRENTLY IF EXISTS public.ticketinfo_submitter_username_trgm_idx;
+CREATE INDEX CONCURRENTLY ticketinfo_submitter_username_trgm_idx
+    ON public.ticketinfo USING gin (submitter_username gin_trgm_ops);
+DROP INDEX CONCURRENTLY IF EXISTS public.ticketinfo_time_spent_idx;
+CREATE INDEX CONCURRENTLY ticketinfo_time_spent_idx
+    ON public.ticketinfo (time_spent);
+DROP INDEX CONCURRENTLY IF EXISTS public.ticketinfo_resolution_rating_idx;
+CREATE INDEX CONCURRENTLY ticketinfo_resolution_rating_idx
+    ON public.ticketinfo (resolution_rating);
+
+-- WebAdmin
+DROP INDEX CONCURRENTLY IF EXISTS public.webadmin_webadmin_name_trgm_idx;
+CREATE INDEX CONCURRENTLY webadmin_webadmin_name_trgm_idx
+    ON public.webadmin USING gin (webadmin_name gin_trgm_ops);
+DROP INDEX CONCURRENTLY IF EXISTS public.webadmin_webadmin_rank_trgm_idx;
+CREATE INDEX CONCURRENTLY webadmin_webadmin_rank_trgm_idx
+    ON public.webadmin USING gin (webadmin_rank gin_trgm_ops);
@@ -0,0 +1,30 @@
+-- Реєстр фонових задач резервного копіювання.
+-- Статус зберігається в БД, а не в пам'яті процесу, тому його бачить будь-який
+-- воркер, на який потрапить запит опитування статусу.
+
+CREATE TABLE IF NOT EXISTS public.backup_jobs (
+    job_id uuid PRIMARY KEY,
+    database_name character varying(255) NOT NULL,
+    state character varying(16) NOT NULL DEFAULT 'queued',
+    backup_format character varying(16) NOT NULL,
+    output_path text,
+    output_size bigint,
+    message text,
+    requested_by_id integer,
+    requested_by_name character varying(255),
+    submitted_at timestamp with time zone NOT NULL DEFAULT now(),
+    started_at timestamp with time zone,
+    finished_at timestamp with time zone,
+    CONSTRAINT backup_jobs_state_check
+        CHECK (state IN ('queued', 'running', 'success', 'failed'))
+);
+
+-- Список останніх задач на сторінці адміністратора
+CREATE INDEX IF NOT EXISTS backup_jobs_submitted_at_idx
+    ON public.backup_jobs (submitted_at DESC);
+
+-- Не більше однієї активної задачі на базу даних (і пошук її перед постановкою нової);
+-- у вже розгорнутих базах неунікальний індекс замінює міграція 0007
+CREATE UNIQUE INDEX IF NOT EXISTS backup_jobs_active_idx
+    ON public.backup_jobs (database_name)
+    WHERE state IN ('queued', 'running');
@@ -0,0 +1,50 @@
+-- Лічильники версій таблиць для умовних GET (ETag/Last-Modified) та скидання кешу.
+-- Тригер рівня інструкції збільшує версію таблиці після кожної зміни і надсилає
+-- pg_notify у канал table_versions; повідомлення доставляється всім воркерам,
+-- що слухають канал, лише після COMMIT транзакції.
+
+CREATE TABLE IF NOT EXISTS public.table_versions (
+    table_name character varying(63) PRIMARY KEY,
+    version bigint NOT NULL DEFAULT 0,
+    modified_at timestamp with time zone NOT NULL DEFAULT now()
+);
+
+INSERT INTO public.table_versions (table_name)
+VALUES ('helperinfo'), ('ticketinfo'), ('webadmin')
+ON CONFLICT (table_name) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION public.bump_table_version() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    new_version bigint;
+    changed_at timestamp with time zone;
+BEGIN
+    UPDATE public.table_versions
+    SET version = version + 1, modified_at = now()
+    WHERE table_name = TG_TABLE_NAME
+    RETURNING version, modified_at INTO new_version, changed_at;
+
+    PERFORM pg_notify('table_versions', json_build_object(
+        'table', TG_TABLE_NAME,
+        'version', new_version,
+        'modified_at', changed_at
+    )::text);
+    RETURN NULL;
+END;
+$$;
+
+-- Один тригер на інструкцію (а не на рядок): масові зміни збільшують версію один раз
+DROP TRIGGER IF EXISTS helperinfo_bump_version ON public.helperinfo;
+CREATE TRIGGER helperinfo_bump_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.helperinfo
+    FOR EACH STATEMENT EXECUTE FUNCTION public.bump_table_version();
+
+DROP TRIGGER IF EXISTS ticketinfo_bump_version ON public.ticketinfo;
+CREATE TRIGGER ticketinfo_bump_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.ticketinfo
+    FOR EACH STATEMENT EXECUTE FUNCTION public.bump_table_version();
+
+DROP TRIGGER IF EXISTS webadmin_bump_version ON public.webadmin;
+CREATE TRIGGER webadmin_bump_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.webadmin
+    FOR EACH STATEMENT EXECUTE FUNCTION public.bump_table_version();
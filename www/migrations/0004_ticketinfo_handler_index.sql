@@ -0,0 +1,51 @@
+-- migrate: no-transaction
+-- Індекс на ticketinfo.handler_helper_id та перевірка зовнішнього ключа "HelperInfo.helper_id".
+-- Без індексу видалення тікетів помічника, перевірка ключа при видаленні помічника
+-- та JOIN у списку тікетів сканують усю таблицю.
+-- Інструкції виконуються окремо і без транзакції: CREATE INDEX CONCURRENTLY не блокує
+-- запис у ticketinfo, а VALIDATE CONSTRAINT - ні читання, ні запис.
+
+-- Перерваний CREATE INDEX CONCURRENTLY залишає недійсний (INVALID) індекс, який
+-- IF NOT EXISTS пропустив би, тому при повторному запуску індекс будується заново
+DROP INDEX CONCURRENTLY IF EXISTS public.ticketinfo_handler_helper_id_idx;
+CREATE INDEX CONCURRENTLY ticketinfo_handler_helper_id_idx
+    ON public.ticketinfo (handler_helper_id);
+
+-- Ключ було створено як NOT VALID: старі тікети можуть посилатися на видалених помічників.
+-- Такі тікети лишаються, але без хендлера (як і ті, що ще не призначені). Попереднє значення
+-- handler_helper_id кожного зміненого тікета зберігається в ticketinfo_detached_handlers,
+-- щоб оператор міг перевірити або відновити призначення
+CREATE TABLE IF NOT EXISTS public.ticketinfo_detached_handlers (
+    ticket_id integer PRIMARY KEY,
+    handler_helper_id integer NOT NULL,
+    detached_at timestamp with time zone NOT NULL DEFAULT now()
+);
+
+-- Запис у журнал і скидання хендлера - одна інструкція: без транзакції вони не розійдуться
+WITH orphaned AS (
+    SELECT t.ticket_id, t.handler_helper_id
+    FROM public.ticketinfo t
+    WHERE t.handler_helper_id IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM public.helperinfo h WHERE h.helper_id = t.handler_helper_id)
+    FOR UPDATE OF t
+), recorded AS (
+    INSERT INTO public.ticketinfo_detached_handlers (ticket_id, handler_helper_id)
+    SELECT ticket_id, handler_helper_id FROM orphaned
+    ON CONFLICT (ticket_id) DO NOTHING
+)
+UPDATE public.ticketinfo t
+SET handler_helper_id = NULL
+FROM orphaned o
+WHERE t.ticket_id = o.ticket_id;
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conrelid = 'public.ticketinfo'::regclass
+          AND conname = 'HelperInfo.helper_id'
+          AND NOT convalidated
+    ) THEN
+        ALTER TABLE public.ticketinfo VALIDATE CONSTRAINT "HelperInfo.helper_id";
+    END IF;
+END $$;
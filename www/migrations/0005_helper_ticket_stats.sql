@@ -0,0 +1,162 @@
+-- Зведена статистика тікетів по співробітниках для дашборду (/dashboard, /api/v1/helper-stats).
+-- Замість агрегації ticketinfo при кожному перегляді зберігаються суми та кількості,
+-- з яких середні рахуються при читанні. Таблицю підтримують тригери рівня інструкції
+-- з таблицями переходу: одна зміна (UPDATE, DELETE, COPY на мільйон рядків) дає одне
+-- групування змінених рядків і по одному оновленню на кожного зачепленого співробітника.
+-- Тригери виконуються в транзакції зміни, тож статистика завжди узгоджена з ticketinfo.
+
+CREATE TABLE IF NOT EXISTS public.helper_ticket_stats (
+    helper_id integer PRIMARY KEY,
+    tickets_count bigint NOT NULL DEFAULT 0,
+    -- Тікети з заповненим time_spent / resolution_rating: NULL не входять у середнє
+    time_spent_count bigint NOT NULL DEFAULT 0,
+    time_spent_sum bigint NOT NULL DEFAULT 0,
+    rated_count bigint NOT NULL DEFAULT 0,
+    rating_sum bigint NOT NULL DEFAULT 0,
+    updated_at timestamp with time zone NOT NULL DEFAULT now()
+);
+
+-- Застосовує зміни однієї інструкції: нові рядки додаються (+1), старі віднімаються (-1).
+-- Таблиці переходу new_rows/old_rows доступні й динамічному SQL тригерної функції;
+-- для INSERT існує лише new_rows, для DELETE - лише old_rows.
+CREATE OR REPLACE FUNCTION public.helper_ticket_stats_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    changed_rows text;
+BEGIN
+    changed_rows := CASE TG_OP
+        WHEN 'INSERT' THEN
+            'SELECT handler_helper_id, 1 AS sign, time_spent, resolution_rating FROM new_rows'
+        WHEN 'DELETE' THEN
+            'SELECT handler_helper_id, -1 AS sign, time_spent, resolution_rating FROM old_rows'
+        ELSE
+            'SELECT handler_helper_id, 1 AS sign, time_spent, resolution_rating FROM new_rows
+             UNION ALL
+             SELECT handler_helper_id, -1 AS sign, time_spent, resolution_rating FROM old_rows'
+    END;
+
+    -- Рядки оновлюються в порядку helper_id, щоб паралельні транзакції брали
+    -- блокування в однаковому порядку і не потрапляли у взаємне блокування.
+    -- Групи з нульовою зміною (UPDATE інших колонок) не чіпають статистику
+    EXECUTE format($sql$
+        INSERT INTO public.helper_ticket_stats AS s
+            (helper_id, tickets_count, time_spent_count, time_spent_sum, rated_count, rating_sum)
+        SELECT * FROM (
+            SELECT handler_helper_id,
+                   sum(sign),
+                   COALESCE(sum(sign) FILTER (WHERE time_spent IS NOT NULL), 0),
+                   COALESCE(sum(sign * time_spent), 0),
+                   COALESCE(sum(sign) FILTER (WHERE resolution_rating IS NOT NULL), 0),
+                   COALESCE(sum(sign * resolution_rating), 0)
+            FROM (%s) AS changed
+            WHERE handler_helper_id IS NOT NULL
+            GROUP BY handler_helper_id
+        ) AS delta (helper_id, tickets_count, time_spent_count, time_spent_sum, rated_count, rating_sum)
+        WHERE (tickets_count, time_spent_count, time_spent_sum, rated_count, rating_sum) <> (0, 0, 0, 0, 0)
+        ORDER BY helper_id
+        ON CONFLICT (helper_id) DO UPDATE SET
+            tickets_count = s.tickets_count + EXCLUDED.tickets_count,
+            time_spent_count = s.time_spent_count + EXCLUDED.time_spent_count,
+            time_spent_sum = s.time_spent_sum + EXCLUDED.time_spent_sum,
+            rated_count = s.rated_count + EXCLUDED.rated_count,
+            rating_sum = s.rating_sum + EXCLUDED.rating_sum,
+            updated_at = now()
+    $sql$, changed_rows);
+
+    -- Співробітники, у яких не лишилося тікетів, прибираються зі статистики
+    IF TG_OP <> 'INSERT' THEN
+        DELETE FROM public.helper_ticket_stats s
+        USING (SELECT DISTINCT handler_helper_id FROM old_rows) AS o
+        WHERE s.helper_id = o.handler_helper_id AND s.tickets_count = 0;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.helper_ticket_stats_truncate() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM public.helper_ticket_stats;
+    RETURN NULL;
+END;
+$$;
+
+-- Повний перерахунок статистики з ticketinfo (після ручних змін з вимкненими тригерами
+-- або для перевірки). Як REFRESH MATERIALIZED VIEW CONCURRENTLY: читачі статистики
+-- не блокуються і бачать старі значення до COMMIT, а змінюються лише рядки, що розійшлися.
+-- Запис у ticketinfo чекає завершення перерахунку (SHARE), інакше зміни, зроблені
+-- під час перерахунку, були б перезаписані значеннями зі старого знімка.
+-- Повертає кількість виправлених рядків статистики.
+CREATE OR REPLACE FUNCTION public.refresh_helper_ticket_stats() RETURNS bigint
+LANGUAGE plpgsql AS $$
+DECLARE
+    changed bigint;
+BEGIN
+    LOCK TABLE public.ticketinfo IN SHARE MODE;
+
+    WITH fresh AS (
+        SELECT handler_helper_id AS helper_id,
+               count(*) AS tickets_count,
+               count(time_spent) AS time_spent_count,
+               COALESCE(sum(time_spent), 0) AS time_spent_sum,
+               count(resolution_rating) AS rated_count,
+               COALESCE(sum(resolution_rating), 0) AS rating_sum
+        FROM public.ticketinfo
+        WHERE handler_helper_id IS NOT NULL
+        GROUP BY handler_helper_id
+    ),
+    upserted AS (
+        INSERT INTO public.helper_ticket_stats AS s
+            (helper_id, tickets_count, time_spent_count, time_spent_sum, rated_count, rating_sum)
+        SELECT * FROM fresh
+        ORDER BY helper_id
+        ON CONFLICT (helper_id) DO UPDATE SET
+            tickets_count = EXCLUDED.tickets_count,
+            time_spent_count = EXCLUDED.time_spent_count,
+            time_spent_sum = EXCLUDED.time_spent_sum,
+            rated_count = EXCLUDED.rated_count,
+            rating_sum = EXCLUDED.rating_sum,
+            updated_at = now()
+        WHERE (s.tickets_count, s.time_spent_count, s.time_spent_sum, s.rated_count, s.rating_sum)
+              IS DISTINCT FROM
+              (EXCLUDED.tickets_count, EXCLUDED.time_spent_count, EXCLUDED.time_spent_sum,
+               EXCLUDED.rated_count, EXCLUDED.rating_sum)
+        RETURNING 1
+    ),
+    removed AS (
+        DELETE FROM public.helper_ticket_stats s
+        WHERE NOT EXISTS (SELECT 1 FROM fresh f WHERE f.helper_id = s.helper_id)
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM upserted) + (SELECT count(*) FROM removed) INTO changed;
+
+    RETURN changed;
+END;
+$$;
+
+-- Таблиця переходу дозволена лише в тригері на одну подію, тому тригерів три
+DROP TRIGGER IF EXISTS ticketinfo_stats_insert ON public.ticketinfo;
+CREATE TRIGGER ticketinfo_stats_insert
+    AFTER INSERT ON public.ticketinfo
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.helper_ticket_stats_apply();
+
+DROP TRIGGER IF EXISTS ticketinfo_stats_update ON public.ticketinfo;
+CREATE TRIGGER ticketinfo_stats_update
+    AFTER UPDATE ON public.ticketinfo
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.helper_ticket_stats_apply();
+
+DROP TRIGGER IF EXISTS ticketinfo_stats_delete ON public.ticketinfo;
+CREATE TRIGGER ticketinfo_stats_delete
+    AFTER DELETE ON public.ticketinfo
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.helper_ticket_stats_apply();
+
+DROP TRIGGER IF EXISTS ticketinfo_stats_truncate ON public.ticketinfo;
+CREATE TRIGGER ticketinfo_stats_truncate
+    AFTER TRUNCATE ON public.ticketinfo
+    FOR EACH STATEMENT EXECUTE FUNCTION public.helper_ticket_stats_truncate();
+
+-- Початкове заповнення (у тій самій транзакції, що й тригери - без пропущених змін)
+SELECT public.refresh_helper_ticket_stats();
@@ -0,0 +1,58 @@
+-- Версія таблиці збільшується під час COMMIT, а не при першій зміні в транзакції.
+-- Раніше тригер рівня інструкції одразу оновлював рядок table_versions, і транзакція
+-- тримала його блокування до кінця: усі паралельні записи в таблицю (імпорт, пакетне
+-- видалення, збереження з панелі) виконувались по черзі.
+-- Тепер тригер лише ставить у чергу відкладену дію (один рядок на таблицю за транзакцію),
+-- а відкладений тригер обмеження виконує UPDATE та NOTIFY безпосередньо перед COMMIT:
+-- блокування тримається лише на час фіксації. Версії при цьому йдуть у порядку
+-- фіксації, тож слухач не пропускає повідомлення, що прийшло пізніше за більшу версію
+-- (з послідовністю nextval номер видається при зміні, а фіксації йдуть в іншому порядку).
+
+CREATE UNLOGGED TABLE IF NOT EXISTS public.table_version_bumps (
+    table_name character varying(63) NOT NULL
+);
+
+-- Тригери helperinfo_bump_version, ticketinfo_bump_version, webadmin_bump_version
+-- (міграція 0003) лишаються, змінюється функція, яку вони викликають
+CREATE OR REPLACE FUNCTION public.bump_table_version() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    -- Прапорець транзакції (відкочується разом із SAVEPOINT, як і рядок черги)
+    IF current_setting('table_versions.queued_' || TG_TABLE_NAME, true) IS DISTINCT FROM '1' THEN
+        PERFORM set_config('table_versions.queued_' || TG_TABLE_NAME, '1', true);
+        INSERT INTO public.table_version_bumps (table_name) VALUES (TG_TABLE_NAME);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.apply_table_version_bump() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    new_version bigint;
+    changed_at timestamp with time zone;
+BEGIN
+    -- clock_timestamp(), а не now(): час фіксації, а не початку транзакції,
+    -- щоб Last-Modified зростав разом із версією
+    UPDATE public.table_versions
+    SET version = version + 1, modified_at = clock_timestamp()
+    WHERE table_name = NEW.table_name
+    RETURNING version, modified_at INTO new_version, changed_at;
+
+    -- Рядки черги інших транзакцій невидимі до їх фіксації, тож видаляється лише свій
+    DELETE FROM public.table_version_bumps WHERE table_name = NEW.table_name;
+
+    PERFORM pg_notify('table_versions', json_build_object(
+        'table', NEW.table_name,
+        'version', new_version,
+        'modified_at', changed_at
+    )::text);
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS table_version_bumps_apply ON public.table_version_bumps;
+CREATE CONSTRAINT TRIGGER table_version_bumps_apply
+    AFTER INSERT ON public.table_version_bumps
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION public.apply_table_version_bump();
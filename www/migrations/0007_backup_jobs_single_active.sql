@@ -0,0 +1,22 @@
+-- Одна активна (queued/running) задача резервного копіювання на базу даних.
+-- Перевірка активної задачі та INSERT у submit_backup_job - два кроки: два воркери
+-- могли обидва не знайти активну задачу й обидва поставити нову (друга потім
+-- завершувалася помилкою "Інший бекап уже виконується"). Унікальний частковий
+-- індекс робить другий INSERT помилкою UniqueViolation, яку обробляє застосунок.
+
+-- Зайві активні задачі, що вже могли з'явитися, позначаються невдалими (лишається найновіша)
+UPDATE public.backup_jobs AS j
+SET state = 'failed', finished_at = now(),
+    message = 'Задачу скасовано: для бази даних уже була активна задача.'
+WHERE j.state IN ('queued', 'running')
+  AND EXISTS (
+      SELECT 1 FROM public.backup_jobs AS newer
+      WHERE newer.database_name = j.database_name
+        AND newer.state IN ('queued', 'running')
+        AND (newer.submitted_at, newer.job_id) > (j.submitted_at, j.job_id)
+  );
+
+DROP INDEX IF EXISTS public.backup_jobs_active_idx;
+CREATE UNIQUE INDEX backup_jobs_active_idx
+    ON public.backup_jobs (database_name)
+    WHERE state IN ('queued', 'running');
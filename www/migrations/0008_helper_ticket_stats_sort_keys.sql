@@ -0,0 +1,215 @@
+-- Дашборд без сортування всієї статистики та перерахунок без блокування запису тікетів.
+--
+-- 1. helper_ticket_stats містить рядок для КОЖНОГО співробітника (нульовий, якщо тікетів
+--    немає): його додають і видаляють тригери helperinfo. Тому дашборд з'єднує таблиці
+--    звичайним JOIN, а сторінка за колонкою статистики читається індексом helper_ticket_stats
+--    і з'єднується з helperinfo лише для рядків сторінки.
+-- 2. Середні зберігаються у згенерованих колонках avg_time_spent_key / avg_rating_key
+--    (NOT NULL, -1 - немає даних): сортування йде по збереженій колонці з індексом,
+--    а не по COALESCE над підзапитом.
+-- 3. refresh_helper_ticket_stats(helper_ids) перераховує лише вказаних співробітників під
+--    блокуванням їхніх рядків статистики (як тригери). Застосунок викликає її партіями,
+--    кожну в окремій транзакції: запис у ticketinfo чекає лише на рядки своєї партії,
+--    а не на SHARE-блокування всієї таблиці на весь перерахунок (як у 0005).
+
+ALTER TABLE public.helper_ticket_stats
+    ADD COLUMN IF NOT EXISTS avg_time_spent_key double precision NOT NULL GENERATED ALWAYS AS (
+        CASE WHEN time_spent_count > 0
+             THEN round(time_spent_sum::numeric / time_spent_count, 1)::float8
+             ELSE -1 END
+    ) STORED,
+    ADD COLUMN IF NOT EXISTS avg_rating_key double precision NOT NULL GENERATED ALWAYS AS (
+        CASE WHEN rated_count > 0
+             THEN round(rating_sum::numeric / rated_count, 2)::float8
+             ELSE -1 END
+    ) STORED;
+
+-- Колонка сортування + helper_id: той самий порядок, що й ORDER BY keyset-пагінації.
+-- Таблиця невелика (рядок на співробітника), тож індекси будуються в транзакції міграції
+CREATE INDEX IF NOT EXISTS helper_ticket_stats_tickets_count_idx
+    ON public.helper_ticket_stats (tickets_count, helper_id);
+CREATE INDEX IF NOT EXISTS helper_ticket_stats_avg_time_spent_idx
+    ON public.helper_ticket_stats (avg_time_spent_key, helper_id);
+CREATE INDEX IF NOT EXISTS helper_ticket_stats_avg_rating_idx
+    ON public.helper_ticket_stats (avg_rating_key, helper_id);
+
+-- Тригер тікетів більше не видаляє рядки з нульовою статистикою (інакше - як у 0005)
+CREATE OR REPLACE FUNCTION public.helper_ticket_stats_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    changed_rows text;
+BEGIN
+    changed_rows := CASE TG_OP
+        WHEN 'INSERT' THEN
+            'SELECT handler_helper_id, 1 AS sign, time_spent, resolution_rating FROM new_rows'
+        WHEN 'DELETE' THEN
+            'SELECT handler_helper_id, -1 AS sign, time_spent, resolution_rating FROM old_rows'
+        ELSE
+            'SELECT handler_helper_id, 1 AS sign, time_spent, resolution_rating FROM new_rows
+             UNION ALL
+             SELECT handler_helper_id, -1 AS sign, time_spent, resolution_rating FROM old_rows'
+    END;
+
+    -- Рядки оновлюються в порядку helper_id, щоб паралельні транзакції брали
+    -- блокування в однаковому порядку і не потрапляли у взаємне блокування
+    EXECUTE format($sql$
+        INSERT INTO public.helper_ticket_stats AS s
+            (helper_id, tickets_count, time_spent_count, time_spent_sum, rated_count, rating_sum)
+        SELECT * FROM (
+            SELECT handler_helper_id,
+                   sum(sign),
+                   COALESCE(sum(sign) FILTER (WHERE time_spent IS NOT NULL), 0),
+                   COALESCE(sum(sign * time_spent), 0),
+                   COALESCE(sum(sign) FILTER (WHERE resolution_rating IS NOT NULL), 0),
+                   COALESCE(sum(sign * resolution_rating), 0)
+            FROM (%s) AS changed
+            WHERE handler_helper_id IS NOT NULL
+            GROUP BY handler_helper_id
+        ) AS delta (helper_id, tickets_count, time_spent_count, time_spent_sum, rated_count, rating_sum)
+        WHERE (tickets_count, time_spent_count, time_spent_sum, rated_count, rating_sum) <> (0, 0, 0, 0, 0)
+        ORDER BY helper_id
+        ON CONFLICT (helper_id) DO UPDATE SET
+            tickets_count = s.tickets_count + EXCLUDED.tickets_count,
+            time_spent_count = s.time_spent_count + EXCLUDED.time_spent_count,
+            time_spent_sum = s.time_spent_sum + EXCLUDED.time_spent_sum,
+            rated_count = s.rated_count + EXCLUDED.rated_count,
+            rating_sum = s.rating_sum + EXCLUDED.rating_sum,
+            updated_at = now()
+    $sql$, changed_rows);
+    RETURN NULL;
+END;
+$$;
+
+-- TRUNCATE ticketinfo обнуляє статистику, але рядки співробітників лишаються
+CREATE OR REPLACE FUNCTION public.helper_ticket_stats_truncate() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE public.helper_ticket_stats
+    SET tickets_count = 0, time_spent_count = 0, time_spent_sum = 0,
+        rated_count = 0, rating_sum = 0, updated_at = now()
+    WHERE (tickets_count, time_spent_count, time_spent_sum, rated_count, rating_sum) <> (0, 0, 0, 0, 0);
+    RETURN NULL;
+END;
+$$;
+
+-- Рядки статистики співробітників: додаються разом із співробітником, видаляються разом з ним
+CREATE OR REPLACE FUNCTION public.helper_ticket_stats_add_helpers() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO public.helper_ticket_stats (helper_id)
+    SELECT helper_id FROM new_rows
+    ORDER BY helper_id
+    ON CONFLICT (helper_id) DO NOTHING;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.helper_ticket_stats_remove_helpers() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM public.helper_ticket_stats;
+    ELSE
+        DELETE FROM public.helper_ticket_stats s
+        USING old_rows o
+        WHERE s.helper_id = o.helper_id;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS helperinfo_stats_insert ON public.helperinfo;
+CREATE TRIGGER helperinfo_stats_insert
+    AFTER INSERT ON public.helperinfo
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.helper_ticket_stats_add_helpers();
+
+DROP TRIGGER IF EXISTS helperinfo_stats_delete ON public.helperinfo;
+CREATE TRIGGER helperinfo_stats_delete
+    AFTER DELETE ON public.helperinfo
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.helper_ticket_stats_remove_helpers();
+
+DROP TRIGGER IF EXISTS helperinfo_stats_truncate ON public.helperinfo;
+CREATE TRIGGER helperinfo_stats_truncate
+    AFTER TRUNCATE ON public.helperinfo
+    FOR EACH STATEMENT EXECUTE FUNCTION public.helper_ticket_stats_remove_helpers();
+
+-- Нульові рядки для співробітників без тікетів (CREATE TRIGGER вище вже не пропускає нових)
+INSERT INTO public.helper_ticket_stats (helper_id)
+SELECT helper_id FROM public.helperinfo
+ORDER BY helper_id
+ON CONFLICT (helper_id) DO NOTHING;
+
+-- Перерахунок усієї таблиці під SHARE-блокуванням ticketinfo замінюється партіями
+DROP FUNCTION IF EXISTS public.refresh_helper_ticket_stats();
+
+-- Перераховує статистику вказаних співробітників з ticketinfo.
+-- Рядки статистики блокуються (FOR UPDATE, у порядку helper_id, як у тригері) ДО читання
+-- ticketinfo: зміна тікетів цих співробітників, що вже виконалась, або зафіксована до
+-- перерахунку (і входить у його знімок), або чекає на блокування й додасть свою різницю
+-- вже до перерахованого значення. Запис тікетів інших співробітників не чекає.
+-- Повертає кількість виправлених рядків статистики.
+CREATE OR REPLACE FUNCTION public.refresh_helper_ticket_stats(helper_ids integer[]) RETURNS bigint
+LANGUAGE plpgsql AS $$
+DECLARE
+    added integer[];
+    removed_count bigint;
+    updated_count bigint;
+BEGIN
+    -- Співробітники, для яких рядка статистики чомусь немає
+    WITH inserted AS (
+        INSERT INTO public.helper_ticket_stats (helper_id)
+        SELECT h.helper_id FROM public.helperinfo h
+        WHERE h.helper_id = ANY (helper_ids)
+        ORDER BY h.helper_id
+        ON CONFLICT (helper_id) DO NOTHING
+        RETURNING helper_id
+    )
+    SELECT COALESCE(array_agg(helper_id), '{}') INTO added FROM inserted;
+
+    PERFORM 1 FROM public.helper_ticket_stats
+    WHERE helper_id = ANY (helper_ids)
+    ORDER BY helper_id
+    FOR UPDATE;
+
+    -- Рядки співробітників, яких уже немає в helperinfo
+    DELETE FROM public.helper_ticket_stats s
+    WHERE s.helper_id = ANY (helper_ids)
+      AND NOT EXISTS (SELECT 1 FROM public.helperinfo h WHERE h.helper_id = s.helper_id);
+    GET DIAGNOSTICS removed_count = ROW_COUNT;
+
+    -- Новий знімок (функція VOLATILE, READ COMMITTED) - вже після отримання блокувань
+    WITH fresh AS (
+        SELECT s.helper_id,
+               count(t.handler_helper_id) AS tickets_count,
+               count(t.time_spent) AS time_spent_count,
+               COALESCE(sum(t.time_spent), 0) AS time_spent_sum,
+               count(t.resolution_rating) AS rated_count,
+               COALESCE(sum(t.resolution_rating), 0) AS rating_sum
+        FROM public.helper_ticket_stats s
+        LEFT JOIN public.ticketinfo t ON t.handler_helper_id = s.helper_id
+        WHERE s.helper_id = ANY (helper_ids)
+        GROUP BY s.helper_id
+    ),
+    updated AS (
+        UPDATE public.helper_ticket_stats s SET
+            tickets_count = f.tickets_count,
+            time_spent_count = f.time_spent_count,
+            time_spent_sum = f.time_spent_sum,
+            rated_count = f.rated_count,
+            rating_sum = f.rating_sum,
+            updated_at = now()
+        FROM fresh f
+        WHERE s.helper_id = f.helper_id
+          AND (s.tickets_count, s.time_spent_count, s.time_spent_sum, s.rated_count, s.rating_sum)
+              IS DISTINCT FROM
+              (f.tickets_count, f.time_spent_count, f.time_spent_sum, f.rated_count, f.rating_sum)
+        RETURNING s.helper_id
+    )
+    -- Доданий і одразу перерахований рядок рахується один раз
+    SELECT count(*) FILTER (WHERE helper_id <> ALL (added)) INTO updated_count FROM updated;
+
+    RETURN cardinality(added) + removed_count + updated_count;
+END;
+$$;
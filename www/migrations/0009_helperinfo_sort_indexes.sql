@@ -0,0 +1,18 @@
+-- migrate: no-transaction
+-- B-tree індекси для сортування списку співробітників і дашборду за колонками helperinfo.
+-- Колонки збігаються з ORDER BY keyset-пагінації (колонка сортування, helper_id), тож
+-- сторінка читається індексом, а не сортуванням усієї таблиці. warnings_count сортується
+-- як COALESCE(warnings_count, 0) (HELPER_SORT_FIELDS), тому індекс - за тим самим виразом.
+-- CREATE INDEX CONCURRENTLY не блокує запис у helperinfo (див. 0001, 0004).
+
+DROP INDEX CONCURRENTLY IF EXISTS public.helperinfo_admin_name_sort_idx;
+CREATE INDEX CONCURRENTLY helperinfo_admin_name_sort_idx
+    ON public.helperinfo (admin_name, helper_id);
+
+DROP INDEX CONCURRENTLY IF EXISTS public.helperinfo_admin_rank_sort_idx;
+CREATE INDEX CONCURRENTLY helperinfo_admin_rank_sort_idx
+    ON public.helperinfo (admin_rank, helper_id);
+
+DROP INDEX CONCURRENTLY IF EXISTS public.helperinfo_warnings_count_sort_idx;
+CREATE INDEX CONCURRENTLY helperinfo_warnings_count_sort_idx
+    ON public.helperinfo ((COALESCE(warnings_count, 0)), helper_id);
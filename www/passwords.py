@@ -0,0 +1,123 @@
+"""
+Хешування та перевірка паролів в обмеженому пулі потоків.
+
+generate_password_hash / check_password_hash навмисно повільні (scrypt, pbkdf2).
+Вони виконуються у фоновому пулі з кількох потоків: hashlib відпускає GIL під час
+обчислення, тож інші запити воркера не зупиняються. Кількість одночасних
+обчислень обмежена; запит, що не дочекався вільного місця за queue_timeout
+секунд, отримує TimeoutError замість того, щоб стояти в черзі необмежено.
+"""
+import hashlib
+import hmac
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Збережений хеш werkzeug - 'метод$сіль$хеш': 'scrypt:n:r:p', 'pbkdf2:hash:ітерації',
+# а також застарілі методи ('sha256$сіль$hex' тощо), які check_password_hash ще перевіряє.
+# Сіль - літери та цифри (werkzeug gen_salt), хеш - шістнадцятковий
+_HASH_RE = re.compile(r'([a-z0-9_:-]+)\$[A-Za-z0-9]+\$[0-9a-f]+', re.ASCII)
+_SCRYPT_METHOD_RE = re.compile(r'scrypt(:\d+:\d+:\d+)?', re.ASCII)
+_PBKDF2_METHOD_RE = re.compile(r'pbkdf2(:([a-z0-9_-]+)(:\d+)?)?', re.ASCII)
+
+
+def _is_hash_method(method):
+    """Чи є method методом, який пише werkzeug: scrypt, pbkdf2 або назва алгоритму hashlib."""
+    if _SCRYPT_METHOD_RE.fullmatch(method):
+        return True
+    pbkdf2 = _PBKDF2_METHOD_RE.fullmatch(method)
+    if pbkdf2:
+        return pbkdf2.group(2) is None or pbkdf2.group(2) in hashlib.algorithms_available
+    return method in hashlib.algorithms_available
+
+
+def is_password_hash(stored):
+    """
+    Чи має збережене значення формат хешу werkzeug (а не пароля простим текстом).
+    Пароль на кшталт 'a$b$c' хешем не вважається: метод має бути відомим werkzeug.
+    """
+    match = _HASH_RE.fullmatch(stored or '')
+    return match is not None and _is_hash_method(match.group(1))
+
+
+class PasswordHasher:
+    """Обмежений пул для хешування паролів з повторним хешуванням застарілих хешів."""
+
+    def __init__(self, method='scrypt', max_workers=2, queue_timeout=5.0, allow_plaintext=False):
+        self.method = method
+        self.max_workers = max_workers
+        self.queue_timeout = queue_timeout
+        # Лише на час переходу: паролі, збережені простим текстом, приймаються і одразу хешуються.
+        # Постійний спосіб - команда flask hash-plaintext-passwords
+        self.allow_plaintext = allow_plaintext
+
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+        self._pid = None
+        self._current_method = None
+
+    def _ensure_started(self):
+        """Пул потоків створюється при першому зверненні та заново після fork."""
+        pid = os.getpid()
+        if self._executor is None or self._pid != pid:
+            with self._lock:
+                if self._executor is None or self._pid != pid:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix='password-hash')
+                    self._slots = threading.BoundedSemaphore(self.max_workers)
+                    self._pid = pid
+        return self._executor, self._slots
+
+    def _run(self, fn, *args):
+        executor, slots = self._ensure_started()
+        # Очікування вільного місця - це черга; довше queue_timeout не чекаємо
+        if not slots.acquire(timeout=self.queue_timeout):
+            raise TimeoutError("Забагато одночасних перевірок пароля, спробуйте пізніше.")
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        return future.result()
+
+    @property
+    def current_method(self):
+        """Метод з повними параметрами ('scrypt:32768:8:1'), яким зараз хешуються нові паролі."""
+        if self._current_method is None:
+            self._current_method = self.hash('').split('$', 1)[0]
+        return self._current_method
+
+    def hash(self, password):
+        """Хеш пароля поточним методом. TimeoutError, якщо пул перевантажений."""
+        return self._run(generate_password_hash, password, self.method)
+
+    def needs_rehash(self, stored):
+        """Збережений хеш отримано іншим методом або з іншими параметрами."""
+        return not is_password_hash(stored) or stored.split('$', 1)[0] != self.current_method
+
+    def verify(self, stored, password):
+        """
+        Перевіряє пароль. Повертає (збігається, потрібно_перехешувати).
+        TimeoutError, якщо пул перевантажений.
+        """
+        if not stored:
+            return False, False
+        if not is_password_hash(stored):
+            if not self.allow_plaintext:
+                return False, False
+            # Порівняння за сталий час, щоб не підказувати довжину збігу
+            valid = hmac.compare_digest(stored.encode('utf-8'), password.encode('utf-8'))
+            return valid, valid
+        try:
+            valid = self._run(check_password_hash, stored, password)
+        except ValueError:
+            # Метод, якого немає в hashlib/werkzeug: такий хеш не збігається з жодним паролем
+            return False, False
+        if not valid:
+            return False, False
+        return True, self.needs_rehash(stored)
@@ -0,0 +1,151 @@
+// ==========================================================
+// ФОНОВЕ РЕЗЕРВНЕ КОПІЮВАННЯ: ЗАПУСК ТА ОПИТУВАННЯ СТАТУСУ
+// ==========================================================
+(function() {
+    const POLL_INTERVAL_MS = 3000;
+    const STATE_LABELS = {
+        queued: '⏳ В черзі',
+        running: '🔄 Виконується',
+        success: '✅ Успішно',
+        failed: '❌ Помилка'
+    };
+
+    let jobs = [];
+    let pollTimer = null;
+
+    function formatSize(bytes) {
+        if (bytes === null || bytes === undefined) return '—';
+        const units = ['Б', 'КБ', 'МБ', 'ГБ', 'ТБ'];
+        let size = bytes;
+        let unit = 0;
+        while (size >= 1024 && unit < units.length - 1) {
+            size /= 1024;
+            unit++;
+        }
+        return `${size.toFixed(unit === 0 ? 0 : 1)} ${units[unit]}`;
+    }
+
+    function formatDuration(seconds) {
+        if (seconds === null || seconds === undefined) return '—';
+        const minutes = Math.floor(seconds / 60);
+        const rest = Math.round(seconds % 60);
+        return minutes ? `${minutes} хв ${rest} с` : `${rest} с`;
+    }
+
+    function isActive(job) {
+        return job.state === 'queued' || job.state === 'running';
+    }
+
+    function cell(text) {
+        const td = document.createElement('td');
+        td.textContent = text;
+        return td;
+    }
+
+    function renderJobs() {
+        const tbody = document.querySelector('#backupJobsTable tbody');
+        if (!tbody) return;
+
+        tbody.innerHTML = '';
+        if (!jobs.length) {
+            const row = document.createElement('tr');
+            const td = cell('Резервних копій ще не створювалося.');
+            td.colSpan = 7;
+            td.style.textAlign = 'center';
+            row.appendChild(td);
+            tbody.appendChild(row);
+        }
+
+        jobs.forEach(job => {
+            const row = document.createElement('tr');
+            row.appendChild(cell(new Date(job.submitted_at).toLocaleString('uk-UA')));
+            row.appendChild(cell(job.requested_by_name || '—'));
+            row.appendChild(cell(job.backup_format));
+            row.appendChild(cell(STATE_LABELS[job.state] || job.state));
+            row.appendChild(cell(formatDuration(job.duration_seconds)));
+            row.appendChild(cell(formatSize(job.output_size)));
+            row.appendChild(cell(job.state === 'failed' ? (job.message || '') : (job.output_path || '')));
+            tbody.appendChild(row);
+        });
+
+        const statusText = document.getElementById('backupStatusText');
+        if (statusText) {
+            const active = jobs.find(isActive);
+            statusText.textContent = active ? `Поточна задача: ${STATE_LABELS[active.state]}` : '';
+        }
+    }
+
+    function schedulePoll() {
+        clearTimeout(pollTimer);
+        if (jobs.some(isActive)) {
+            pollTimer = setTimeout(pollActiveJobs, POLL_INTERVAL_MS);
+        }
+    }
+
+    async function fetchJson(url, options) {
+        const response = await fetch(url, Object.assign({
+            credentials: 'same-origin',
+            headers: { 'Accept': 'application/json' }
+        }, options));
+        const body = await response.json();
+        if (!response.ok) {
+            throw new Error(body.message || `HTTP ${response.status}`);
+        }
+        return body;
+    }
+
+    async function loadJobs() {
+        try {
+            const body = await fetchJson('/backup/jobs');
+            jobs = body.data;
+            renderJobs();
+            schedulePoll();
+        } catch (error) {
+            console.error('❌ Не вдалося отримати список бекапів:', error);
+        }
+    }
+
+    // Опитуємо лише активні задачі через ендпоінт статусу однієї задачі
+    async function pollActiveJobs() {
+        const active = jobs.filter(isActive);
+        try {
+            const updates = await Promise.all(
+                active.map(job => fetchJson(`/backup/jobs/${job.job_id}`))
+            );
+            updates.forEach(({ data }) => {
+                const index = jobs.findIndex(job => job.job_id === data.job_id);
+                if (index !== -1) jobs[index] = data;
+            });
+            renderJobs();
+        } catch (error) {
+            console.error('❌ Не вдалося оновити статус бекапу:', error);
+        }
+        schedulePoll();
+    }
+
+    async function submitBackup(event) {
+        event.preventDefault();
+        try {
+            const body = await fetchJson(event.target.action, { method: 'POST' });
+            const index = jobs.findIndex(job => job.job_id === body.data.job_id);
+            if (index === -1) {
+                jobs.unshift(body.data);
+            } else {
+                jobs[index] = body.data;
+            }
+            renderJobs();
+            schedulePoll();
+            alert(body.message);
+        } catch (error) {
+            alert(`Помилка резервного копіювання: ${error.message}`);
+        }
+    }
+
+    document.addEventListener('DOMContentLoaded', () => {
+        const form = document.getElementById('backupForm');
+        if (form) {
+            form.addEventListener('submit', submitBackup);
+        }
+        loadJobs();
+    });
+})();
@@ -0,0 +1,82 @@
+"""
+Production-запуск застосунку: gunicorn з кількома процесами-воркерами.
+
+    python serve.py
+
+Master-процес лише керує воркерами; кожен воркер сам імпортує app.py після fork,
+тому пул з'єднань, черга журналу та слухач версій таблиць у кожного свої.
+Налаштування - змінні середовища WEB_* (див. build_options).
+
+Плавний перезапуск (з новим кодом, без обриву запитів): kill -HUP <pid master-процесу>.
+Плавна зупинка: kill -TERM - воркери дочікуються поточних запитів (до WEB_GRACEFUL_TIMEOUT с).
+"""
+import os
+
+from gunicorn.app.base import BaseApplication
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, str(default)))
+
+
+def post_worker_init(worker):
+    # Виконується у воркері після fork і завантаження застосунку
+    from app import init_worker
+    init_worker()
+
+
+def worker_exit(server, worker):
+    from app import shutdown_worker
+    shutdown_worker()
+
+
+def build_options():
+    """Налаштування gunicorn зі змінних середовища."""
+    return {
+        'bind': os.environ.get('WEB_BIND', '0.0.0.0:5000'),
+        # Процеси-воркери (за замовчуванням - кількість ядер) та потоки в кожному
+        'workers': env_int('WEB_WORKERS', os.cpu_count() or 1),
+        'worker_class': 'gthread',
+        'threads': env_int('WEB_THREADS', 4),
+        # Воркер, що не відповідає довше timeout секунд, перезапускається
+        'timeout': env_int('WEB_TIMEOUT', 60),
+        'graceful_timeout': env_int('WEB_GRACEFUL_TIMEOUT', 30),
+        'keepalive': env_int('WEB_KEEPALIVE', 5),
+        # Перезапуск воркера після N запитів (0 - вимкнено), jitter - щоб не всі одночасно
+        'max_requests': env_int('WEB_MAX_REQUESTS', 0),
+        'max_requests_jitter': env_int('WEB_MAX_REQUESTS_JITTER', 0),
+        'accesslog': os.environ.get('WEB_ACCESS_LOG', '-'),
+        'errorlog': '-',
+        'loglevel': os.environ.get('WEB_LOG_LEVEL', 'info'),
+        'proc_name': 'webadmin',
+        # Без preload: застосунок імпортується в кожному воркері, і HUP підхоплює новий код
+        'preload_app': False,
+        'post_worker_init': post_worker_init,
+        'worker_exit': worker_exit,
+    }
+
+
+class WebApplication(BaseApplication):
+    """gunicorn з налаштуваннями з build_options замість командного рядка."""
+
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        from app import create_app
+        return create_app()
+
+
+if __name__ == '__main__':
+    options = build_options()
+    pool_max_size = env_int('DB_POOL_MAX_SIZE', 10)
+    if options['threads'] > pool_max_size:
+        print(f"⚠️ WEB_THREADS={options['threads']} більше за DB_POOL_MAX_SIZE={pool_max_size}: "
+              "частина потоків чекатиме вільного з'єднання.")
+    WebApplication(options).run()
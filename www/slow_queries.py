@@ -0,0 +1,267 @@
+"""
+Журнал повільних SQL-запитів (slow_queries.log) з вибірковим захопленням плану.
+
+Курсори одиниці роботи (db_session.py) та асинхронний пул (async_db.py) міряють
+час кожної інструкції і передають її в observe(). Інструкція, довша за
+threshold_ms, записується в журнал: нормалізований SQL (пробіли стиснуто,
+літерали замінено на ?), типи параметрів (не значення - серед них бувають
+паролі), маршрут і тривалість.
+
+Для частини повільних SELECT (explain_sample, не частіше explain_interval
+секунд для одного й того ж SQL) фоновий потік виконує
+EXPLAIN (ANALYZE, BUFFERS) з тими самими параметрами на окремому з'єднанні в
+транзакції, яка відкочується, з обмеженням statement_timeout. Запити, що
+змінюють дані чи беруть блокування, не аналізуються: EXPLAIN ANALYZE виконує
+запит насправді.
+
+Журнал - рядки JSON; файл ротується при досягненні max_bytes (path.1 ... path.N),
+ротація і запис кількох воркерів узгоджуються через flock на path.lock.
+"""
+import hashlib
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+import psycopg
+
+try:
+    import fcntl
+except ImportError:  # Windows: без блокування між процесами
+    fcntl = None
+
+_STOP = object()
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL_RE = re.compile(r'(?<![\w$.])\d+(?:\.\d+)?(?![\w.])')
+# EXPLAIN ANALYZE виконує запит: лише читання без блокувань і побічних ефектів
+_EXPLAIN_UNSAFE_RE = re.compile(
+    r'\b(INSERT|UPDATE|DELETE|MERGE|TRUNCATE|FOR\s+(NO\s+KEY\s+)?UPDATE|FOR\s+(KEY\s+)?SHARE|'
+    r'pg_(try_)?advisory\w*|setval|nextval|pg_notify|pg_sleep|pg_terminate_backend|pg_cancel_backend)\b',
+    re.IGNORECASE
+)
+
+
+def normalize_sql(sql):
+    """Однаковий текст для запитів, що відрізняються лише форматуванням чи літералами."""
+    sql = _STRING_LITERAL_RE.sub('?', sql)
+    sql = _NUMBER_LITERAL_RE.sub('?', sql)
+    return _WHITESPACE_RE.sub(' ', sql).strip().rstrip(';').strip()
+
+
+def params_shape(params):
+    """Типи параметрів без значень: ['str', 'int', ...]; для executemany - кількість наборів і типи першого."""
+    if params is None:
+        return []
+    if isinstance(params, dict):
+        return {name: type(value).__name__ for name, value in params.items()}
+    if isinstance(params, (list, tuple)) and params and all(isinstance(p, (list, tuple, dict)) for p in params):
+        return {'rows': len(params), 'first': params_shape(params[0])}
+    return [type(value).__name__ for value in params]
+
+
+def is_explainable(sql):
+    normalized = sql.lstrip().upper()
+    return normalized.startswith(('SELECT', 'WITH')) and not _EXPLAIN_UNSAFE_RE.search(sql)
+
+
+class SlowQueryLog:
+    """Запис повільних інструкцій у фоновому потоці та читання журналу для сторінки адміністратора."""
+
+    def __init__(self, path, conninfo, threshold_ms=500, explain_sample=0.1, explain_interval=300.0,
+                 explain_timeout_ms=10000, max_bytes=5 * 1024 * 1024, backup_count=3, max_queue=1000):
+        self.path = path
+        self.conninfo = conninfo
+        self.threshold_ms = threshold_ms
+        self.explain_sample = explain_sample
+        self.explain_interval = explain_interval
+        self.explain_timeout_ms = explain_timeout_ms
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.max_queue = max_queue
+
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._explain_conn = None
+        # Відбиток SQL -> час останнього EXPLAIN (monotonic)
+        self._explained_at = {}
+        self._counters = {'recorded': 0, 'explained': 0, 'dropped': 0}
+
+    @property
+    def enabled(self):
+        return self.threshold_ms > 0
+
+    def _ensure_started(self):
+        """Потік запису запускається при першому зверненні та заново після fork."""
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid:
+            return self._queue
+        with self._lock:
+            if self._thread is None or self._pid != pid:
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._explain_conn = None
+                self._explained_at = {}
+                self._thread = threading.Thread(target=self._run, args=(self._queue,),
+                                                name='slow-queries', daemon=True)
+                self._pid = pid
+                self._thread.start()
+        return self._queue
+
+    def observe(self, sql, params, seconds, route=None):
+        """Викликається після кожної інструкції; повільні ставить у чергу на запис."""
+        duration_ms = seconds * 1000
+        if not self.enabled or duration_ms < self.threshold_ms or not isinstance(sql, str):
+            return
+
+        normalized = normalize_sql(sql)
+        fingerprint = hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+        entry = {
+            'time': datetime.now(timezone.utc).astimezone().isoformat(timespec='seconds'),
+            'route': route,
+            'duration_ms': round(duration_ms, 1),
+            'fingerprint': fingerprint,
+            'sql': normalized,
+            'params': params_shape(params),
+            'pid': os.getpid(),
+        }
+
+        explain = None
+        if self.explain_sample > 0 and random.random() < self.explain_sample and is_explainable(sql):
+            now = time.monotonic()
+            with self._lock:
+                last = self._explained_at.get(fingerprint)
+                if last is None or now - last >= self.explain_interval:
+                    self._explained_at[fingerprint] = now
+                    # Параметри лишаються лише в пам'яті до виконання EXPLAIN
+                    explain = (sql, params)
+
+        try:
+            self._ensure_started().put_nowait((entry, explain))
+        except queue.Full:
+            with self._lock:
+                self._counters['dropped'] += 1
+
+    def _run(self, entries_queue):
+        while True:
+            item = entries_queue.get()
+            if item is _STOP:
+                entries_queue.task_done()
+                break
+            entry, explain = item
+            try:
+                if explain is not None:
+                    self._explain(entry, *explain)
+                self._append(json.dumps(entry, ensure_ascii=False, default=str))
+                with self._lock:
+                    self._counters['recorded'] += 1
+                    if 'plan' in entry:
+                        self._counters['explained'] += 1
+            except OSError as e:
+                print(f"❌ Помилка запису журналу повільних запитів: {e}")
+            finally:
+                entries_queue.task_done()
+        if self._explain_conn is not None:
+            self._explain_conn.close()
+
+    def _explain(self, entry, sql, params):
+        """Додає до запису план виконання (plan) або текст помилки (plan_error)."""
+        try:
+            if self._explain_conn is None or self._explain_conn.closed:
+                self._explain_conn = psycopg.connect(self.conninfo, connect_timeout=5)
+            conn = self._explain_conn
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(f"SET LOCAL statement_timeout = {int(self.explain_timeout_ms)}")
+                    cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + sql.strip().rstrip(';'), params)
+                    entry['plan'] = '\n'.join(row[0] for row in cur.fetchall())
+            finally:
+                # Транзакція EXPLAIN ніколи не фіксується
+                conn.rollback()
+        except psycopg.Error as e:
+            if self._explain_conn is not None and self._explain_conn.broken:
+                self._explain_conn = None
+            entry['plan_error'] = str(e)
+
+    def _append(self, line):
+        data = (line + '\n').encode('utf-8')
+        lock_fd = os.open(self.path + '.lock', os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            try:
+                if os.path.getsize(self.path) + len(data) > self.max_bytes:
+                    self._rotate()
+            except FileNotFoundError:
+                pass
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+        finally:
+            os.close(lock_fd)
+
+    def _rotate(self):
+        """path -> path.1 -> ... -> path.N (найстаріший видаляється)."""
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def read(self, limit=200, route=None, min_ms=None):
+        """Найновіші записи (спершу поточний файл, потім ротовані), з фільтром за маршрутом і тривалістю."""
+        entries = []
+        for i in range(self.backup_count + 1):
+            path = self.path if i == 0 else f"{self.path}.{i}"
+            try:
+                with open(path, encoding='utf-8') as f:
+                    lines = f.readlines()
+            except FileNotFoundError:
+                continue
+            for line in reversed(lines):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if route and entry.get('route') != route:
+                    continue
+                if min_ms is not None and entry.get('duration_ms', 0) < min_ms:
+                    continue
+                entries.append(entry)
+                if len(entries) >= limit:
+                    return entries
+        return entries
+
+    def flush(self, timeout=5.0):
+        """Чекає, поки черга поточного процесу буде записана (для сторінки журналу)."""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def stats(self):
+        with self._lock:
+            return {**self._counters, 'threshold_ms': self.threshold_ms,
+                    'explain_sample': self.explain_sample}
+
+    def close(self, timeout=5.0):
+        """Дописує чергу та зупиняє потік (при завершенні воркера)."""
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                return
+            thread, entries_queue = self._thread, self._queue
+            self._thread = self._queue = None
+        entries_queue.put(_STOP)
+        thread.join(timeout)
@@ -0,0 +1,150 @@
+"""
+Карта версій таблиць у пам'яті процесу, яку оновлює LISTEN/NOTIFY PostgreSQL.
+
+Тригери з міграцій 0003/0006 збільшують table_versions.version під час COMMIT
+кожної транзакції, що змінила таблицю, та надсилають повідомлення в канал
+table_versions; версії йдуть у порядку фіксації. Кожен процес-воркер
+тримає одне окреме з'єднання (не з пулу), яке слухає канал у фоновому потоці,
+тому маршрути дізнаються, чи змінилися дані, не звертаючись до бази даних.
+
+Повідомлення приходить асинхронно, тож після власного запису воркер перечитує
+версії змінених таблиць (refresh), щоб наступна перевірка ETag не отримала
+застарілу відповідь 304.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import psycopg
+
+CHANNEL = 'table_versions'
+
+
+class TableVersionTracker:
+    """Версії таблиць {table: (version, modified_at)} та фоновий потік, що їх оновлює."""
+
+    def __init__(self, conninfo, channel=CHANNEL, retry_interval=5.0):
+        self.conninfo = conninfo
+        self.channel = channel
+        self.retry_interval = retry_interval
+
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._connected = False
+        self._listeners = []
+        self._thread = None
+        self._pid = None
+
+    def add_listener(self, callback):
+        """callback(table) викликається з фонового потоку, коли версія таблиці змінилася."""
+        self._listeners.append(callback)
+
+    def _ensure_started(self):
+        """Потік слухача запускається при першому зверненні та заново після fork."""
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid:
+            return
+        with self._lock:
+            if self._thread is None or self._pid != pid:
+                # Версії, отримані батьківським процесом, у дочірньому не оновлюються
+                self._versions = {}
+                self._connected = False
+                self._thread = threading.Thread(target=self._run, name='table-versions', daemon=True)
+                self._pid = pid
+                self._thread.start()
+
+    def snapshot(self, tables):
+        """
+        Повертає [(version, modified_at), ...] для таблиць або None, якщо слухач
+        ще не підключився чи втратив з'єднання (тоді версіям не можна довіряти).
+        """
+        self._ensure_started()
+        with self._lock:
+            if not self._connected:
+                return None
+            try:
+                return [self._versions[table] for table in tables]
+            except KeyError:
+                return None
+
+    def status(self):
+        """Стан слухача та поточні версії (для моніторингу)."""
+        with self._lock:
+            return {
+                'connected': self._connected,
+                'versions': {
+                    table: {'version': version, 'modified_at': modified_at.isoformat()}
+                    for table, (version, modified_at) in self._versions.items()
+                }
+            }
+
+    def refresh(self, conn, tables):
+        """
+        Перечитує версії таблиць через з'єднання conn (після COMMIT власних змін),
+        не чекаючи повідомлення слухача.
+        """
+        rows = conn.execute(
+            "SELECT table_name, version, modified_at FROM public.table_versions WHERE table_name = ANY(%s);",
+            (list(tables),)
+        ).fetchall()
+        for table, version, modified_at in rows:
+            self._apply(table, version, modified_at)
+
+    def _apply(self, table, version, modified_at):
+        """Оновлює версію таблиці (повідомлення можуть прийти не по порядку) та сповіщає слухачів."""
+        with self._lock:
+            current = self._versions.get(table)
+            if current is not None and current[0] >= version:
+                return
+        # Спершу кеші скидаються, потім публікується версія: запит, що вже побачив
+        # нову версію, не отримає з кешу дані, прочитані до зміни
+        for callback in self._listeners:
+            try:
+                callback(table)
+            except Exception as e:
+                print(f"❌ Помилка обробника версії таблиці {table}: {e}")
+        with self._lock:
+            current = self._versions.get(table)
+            if current is not None and current[0] >= version:
+                return
+            # Last-Modified не повинен зменшуватися разом з новою версією
+            if current is not None and current[1] > modified_at:
+                modified_at = current[1]
+            self._versions[table] = (version, modified_at)
+
+    def _run(self):
+        while True:
+            try:
+                # keepalives - щоб обрив з'єднання помітити, а не чекати повідомлень вічно
+                with psycopg.connect(self.conninfo, autocommit=True, keepalives=1,
+                                     keepalives_idle=30, keepalives_interval=10,
+                                     keepalives_count=3) as conn:
+                    # Спершу LISTEN, потім знімок: зміни між ними не загубляться
+                    conn.execute(f"LISTEN {self.channel};")
+                    rows = conn.execute(
+                        "SELECT table_name, version, modified_at FROM public.table_versions;"
+                    ).fetchall()
+                    for table, version, modified_at in rows:
+                        self._apply(table, version, modified_at)
+                    with self._lock:
+                        self._connected = True
+
+                    for notify in conn.notifies():
+                        try:
+                            payload = json.loads(notify.payload)
+                            self._apply(
+                                payload['table'],
+                                int(payload['version']),
+                                datetime.fromisoformat(payload['modified_at'])
+                            )
+                        except (ValueError, KeyError, TypeError) as e:
+                            print(f"⚠️ Некоректне повідомлення {self.channel}: {notify.payload} ({e})")
+            except psycopg.Error as e:
+                print(f"❌ Слухач версій таблиць: {e}")
+
+            # Поки з'єднання немає, повідомлення губляться - версіям не довіряємо до перепідключення
+            with self._lock:
+                self._connected = False
+            time.sleep(self.retry_interval)
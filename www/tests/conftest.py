@@ -0,0 +1,119 @@
+import os
+import sys
+
+import psycopg
+import pytest
+
+# Модулі застосунку (cache.py, db_session.py ...) імпортуються з www/ напряму, як у app.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as webapp  # noqa: E402
+
+TransactionStatus = psycopg.pq.TransactionStatus
+
+
+class FakeInfo:
+    def __init__(self):
+        self.transaction_status = TransactionStatus.IDLE
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self._conn = conn
+        self._rows = []
+        self.rowcount = -1
+
+    def execute(self, query, params=None, **kwargs):
+        self._conn.queries.append((query, params))
+        self._conn.info.transaction_status = TransactionStatus.INTRANS
+        self._rows = [dict(row) for row in self._conn.pool.rows]
+        self.rowcount = len(self._rows)
+        return self
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchmany(self, size):
+        batch, self._rows = self._rows[:size], self._rows[size:]
+        return batch
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class FakeConnection:
+    """З'єднання з пулу: записує запити, на кожен повертає pool.rows."""
+
+    closed = False
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.queries = []
+        self.committed = False
+        self.info = FakeInfo()
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self)
+
+    def execute(self, query, params=None, **kwargs):
+        return self.cursor().execute(query, params)
+
+    def commit(self):
+        if self.pool.commit_error is not None:
+            raise self.pool.commit_error
+        self.committed = True
+        self.info.transaction_status = TransactionStatus.IDLE
+
+    def rollback(self):
+        self.info.transaction_status = TransactionStatus.IDLE
+
+
+class FakePool:
+    def __init__(self):
+        self.rows = []
+        self.commit_error = None
+        self.connections = []
+
+    def getconn(self):
+        conn = FakeConnection(self)
+        self.connections.append(conn)
+        return conn
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    """
+    Підміняє пул застосунку: з'єднання записують запити й повертають fake_pool.rows.
+    Кеші й версії таблиць вимкнено - кожен запит доходить до БД.
+    """
+    pool = FakePool()
+    monkeypatch.setattr(webapp, 'get_pool_connection', pool.getconn)
+    monkeypatch.setattr(webapp, 'put_pool_connection', lambda conn: None)
+    monkeypatch.setattr(webapp, 'TABLE_VERSIONS_ENABLED', False)
+    monkeypatch.setattr(webapp.result_cache, 'ttl', 0)
+    # Журнал дій пишеться у файл після COMMIT - у тестах лише збирається
+    monkeypatch.setattr(webapp.audit_log, 'write', lambda entry: None)
+    return pool
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setitem(webapp.app.config, 'TESTING', True)
+    return webapp.app.test_client()
+
+
+@pytest.fixture
+def admin_client(client):
+    """Клієнт з сесією SuperAdmin."""
+    with client.session_transaction() as session:
+        session.update(logged_in=True, webadmin_id=1, username='tester', user_rank='SuperAdmin')
+    return client
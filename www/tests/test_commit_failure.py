@@ -0,0 +1,85 @@
+"""
+Зміни запиту фіксуються один раз після обробки (commit_db_session). Якщо COMMIT
+не вдався, маршрут уже поставив у чергу повідомлення про успіх - воно не повинне
+дійти до користувача.
+"""
+import psycopg
+import pytest
+
+HELPER_ROW = {'helper_id': 5, 'admin_name': 'Old', 'admin_rank': 'Moder', 'warnings_count': 0}
+
+
+@pytest.fixture
+def helper_pool(fake_pool):
+    fake_pool.rows = [HELPER_ROW]
+    return fake_pool
+
+
+def update_helper(client):
+    return client.post('/update_helper', data={
+        'helper_id': '5', 'admin_name': 'New', 'admin_rank': 'Moder', 'warnings_count': '1'
+    })
+
+
+def flashes(client):
+    with client.session_transaction() as session:
+        return list(session.get('_flashes', []))
+
+
+def test_successful_update_commits_and_flashes_success(admin_client, helper_pool):
+    response = update_helper(admin_client)
+
+    assert response.status_code == 302
+    assert helper_pool.connections[0].committed
+    assert [category for category, _ in flashes(admin_client)] == ['success']
+
+
+def test_update_runs_read_and_write_in_one_transaction(admin_client, helper_pool):
+    response = update_helper(admin_client)
+
+    assert response.status_code == 302
+    # Перевірка співробітника та UPDATE - одне з'єднання запиту й один COMMIT
+    assert len(helper_pool.connections) == 1
+    queries = [query for query, _ in helper_pool.connections[0].queries]
+    assert len(queries) == 2
+    assert queries[0].lstrip().startswith('SELECT')
+    assert 'UPDATE public.helperinfo' in queries[1]
+
+
+def test_update_webadmin_goes_through_data_function(admin_client, fake_pool):
+    fake_pool.rows = [{'webadmin_id': 2}]
+
+    response = admin_client.post('/update_webadmin', data={
+        'webadmin_id': '2', 'username': 'renamed', 'webadmin_rank': 'Admin', 'password': ''
+    })
+
+    assert response.status_code == 302
+    queries = [query for query, _ in fake_pool.connections[0].queries]
+    assert len(queries) == 1 and 'UPDATE public.webadmin' in queries[0]
+    assert 'webadmin_password' not in queries[0]
+    assert fake_pool.connections[0].committed
+    assert [category for category, _ in flashes(admin_client)] == ['success']
+
+
+def test_successful_requests_print_nothing(admin_client, fake_pool, capsys):
+    # Під gunicorn stdout - журнал сервера: успішні запити (і поля форм) туди не пишуться
+    fake_pool.rows = [{'webadmin_id': 2}]
+    admin_client.post('/update_webadmin', data={
+        'webadmin_id': '2', 'username': 'renamed', 'webadmin_rank': 'Admin', 'password': 'secret'
+    })
+    fake_pool.rows = [HELPER_ROW]
+    update_helper(admin_client)
+
+    assert capsys.readouterr().out == ''
+
+
+def test_failed_commit_keeps_redirect_and_replaces_success_flash(admin_client, helper_pool):
+    helper_pool.commit_error = psycopg.OperationalError('connection lost')
+
+    response = update_helper(admin_client)
+
+    assert response.status_code == 302
+    assert not helper_pool.connections[0].committed
+    messages = flashes(admin_client)
+    assert [category for category, _ in messages] == ['error']
+    assert 'зміни не застосовано' in messages[0][1]
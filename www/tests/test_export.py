@@ -0,0 +1,32 @@
+import app as webapp
+
+
+def test_export_without_connection_redirects_with_error(admin_client, fake_pool, monkeypatch):
+    # Пул не видав з'єднання: замість порожнього файлу зі статусом 200 - повернення на сторінку
+    monkeypatch.setattr(webapp, 'get_pool_connection', lambda: None)
+
+    for fmt in ('csv', 'xlsx'):
+        response = admin_client.get(f'/export-ticketinfo?format={fmt}')
+        assert response.status_code == 302
+        assert response.headers['Location'].endswith('/tickets')
+        with admin_client.session_transaction() as session:
+            flashes = session.pop('_flashes', [])
+        assert [category for category, _ in flashes] == ['error']
+
+
+def test_export_csv_streams_rows_and_returns_connection(admin_client, fake_pool, monkeypatch):
+    returned = []
+    monkeypatch.setattr(webapp, 'put_pool_connection', returned.append)
+    fake_pool.rows = [
+        {'helper_id': 1, 'admin_name': 'Admin', 'admin_rank': 'Helper', 'warnings_count': 0},
+        {'helper_id': 2, 'admin_name': 'Other', 'admin_rank': 'Moderator', 'warnings_count': 2},
+    ]
+
+    response = admin_client.get('/export-helperinfo?format=csv')
+    body = response.get_data().decode('utf-8-sig')
+    response.close()
+
+    assert response.status_code == 200
+    assert body.splitlines()[1:] == ['1;Admin;Helper;0', '2;Other;Moderator;2']
+    # Кожне видане з'єднання (і експортне, і з'єднання запиту) повертається в пул рівно один раз
+    assert sorted(map(id, returned)) == sorted(map(id, fake_pool.connections))
@@ -0,0 +1,34 @@
+import pytest
+from werkzeug.security import generate_password_hash
+
+from passwords import PasswordHasher, is_password_hash
+
+
+@pytest.mark.parametrize('method', ['scrypt', 'pbkdf2', 'pbkdf2:sha1:1000'])
+def test_werkzeug_hashes_are_recognised(method):
+    assert is_password_hash(generate_password_hash('secret', method))
+
+
+@pytest.mark.parametrize('stored', [
+    'a$b$c',
+    'pass$word$1234',
+    'pbkdf2:nosuchhash:1000$salt$abcdef',
+    'scrypt:1:2$salt$abcdef',
+    'sha256$salt$not-hex',
+    '',
+    None,
+])
+def test_plaintext_with_dollars_is_not_a_hash(stored):
+    assert not is_password_hash(stored)
+
+
+def test_legacy_hashlib_method_is_a_hash():
+    # Застарілий формат werkzeug < 2.3: назва алгоритму hashlib без pbkdf2
+    assert is_password_hash('sha256$abcDEF12$' + '0' * 64)
+
+
+def test_plaintext_with_dollars_can_log_in_and_needs_rehash():
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000', allow_plaintext=True)
+    assert hasher.verify('a$b$c', 'a$b$c') == (True, True)
+    assert hasher.verify('a$b$c', 'other') == (False, False)
+    assert hasher.needs_rehash('a$b$c')
@@ -0,0 +1,73 @@
+"""
+Кількість SQL-інструкцій на сторінку тікетів (DbSession.statements, заголовок X-DB-Statements).
+
+Пул з'єднань підмінено з'єднанням-заглушкою (conftest.py), яке записує виконані запити
+й повертає готові рядки, тож тест не потребує PostgreSQL і перевіряє саме кількість
+звернень маршруту до БД: пошук, сортування, сторінка й лічильник - один запит.
+"""
+import pytest
+
+import app as webapp
+
+TICKET_ROW = {
+    'total_count': 1,
+    'ticket_id': 7,
+    'submitter_username': 'tester',
+    'handler_helper_id': 3,
+    'handler_name': 'Helper',
+    'time_spent': 15,
+    'resolution_rating': 4,
+    '_sort_key': 7,
+    '_pk_key': 7,
+}
+
+
+@pytest.fixture
+def ticket_pool(fake_pool):
+    fake_pool.rows = [TICKET_ROW]
+    return fake_pool
+
+
+@pytest.mark.parametrize('url', [
+    '/tickets',
+    '/tickets?query=tester',
+    '/tickets?query=15',
+    '/tickets?query=tester&sort_by=time_spent&sort_type=desc',
+])
+def test_tickets_page_is_one_statement(client, ticket_pool, url):
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert response.headers['X-DB-Statements'] == '1'
+    # Одне з'єднання на запит і в ньому рівно одна інструкція
+    assert len(ticket_pool.connections) == 1
+    assert len(ticket_pool.connections[0].queries) == 1
+    assert 'total_count' in ticket_pool.connections[0].queries[0][0]
+    assert 'tester' in response.get_data(as_text=True)
+
+
+def test_statements_counted_by_db_session(client, ticket_pool):
+    sessions = []
+    real_get_db_session = webapp.get_db_session
+
+    def get_db_session():
+        session = real_get_db_session()
+        sessions.append(session)
+        return session
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(webapp, 'get_db_session', get_db_session)
+        response = client.get('/tickets?query=tester')
+
+    assert response.status_code == 200
+    assert sessions and sessions[-1].statements == 1
+    assert not sessions[-1].failed
+
+
+def test_statements_header_hidden_in_production(client, ticket_pool, monkeypatch):
+    monkeypatch.setitem(webapp.app.config, 'TESTING', False)
+
+    response = client.get('/tickets')
+
+    assert response.status_code == 200
+    assert 'X-DB-Statements' not in response.headers
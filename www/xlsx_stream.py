@@ -0,0 +1,315 @@
+"""
+Потоковий запис і читання файлів Excel (.xlsx) без сторонніх бібліотек.
+
+Аркуш пишеться у zip-контейнер рядок за рядком, а готові стиснені байти
+віддаються частинами, тому в пам'яті не тримається ні весь аркуш, ні весь файл.
+Рядки записуються як inline strings (без таблиці sharedStrings, яку довелося б
+накопичувати до кінця експорту), числа - як типізовані числові клітинки.
+
+Читання (для імпорту) розбирає перший аркуш подієвим парсером рядок за рядком;
+у пам'яті тримається лише таблиця sharedStrings, якщо файл її містить.
+"""
+import io
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+
+# Символи, заборонені в XML 1.0 (керуючі, крім табуляції та переносів рядка)
+_ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+_CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+_ROOT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+# Стиль 0 - звичайна клітинка, стиль 1 - жирний шрифт для заголовка
+_STYLES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class _ChunkSink(io.RawIOBase):
+    """Файлоподібний приймач без seek: накопичує записані байти до наступного drain()."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        """Повертає накопичені байти та очищає буфер."""
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def column_letter(index):
+    """Номер колонки (з 0) -> літерне позначення Excel: 0 -> A, 27 -> AB."""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _cell_xml(ref, value, style):
+    """XML однієї клітинки: числа - типізовані, решта - inline string, None - порожня."""
+    style_attr = f' s="{style}"' if style else ''
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"{style_attr}><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{ref}"{style_attr}><v>{value}</v></c>'
+    text = _ILLEGAL_XML_CHARS.sub('', str(value))
+    return f'<c r="{ref}" t="inlineStr"{style_attr}><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+
+def _row_xml(row_number, values, letters, style=0):
+    """XML одного рядка аркуша."""
+    cells = ''.join(
+        _cell_xml(f'{letters[i]}{row_number}', value, style)
+        for i, value in enumerate(values)
+    )
+    return f'<row r="{row_number}">{cells}</row>'
+
+
+def _workbook_xml(sheet_name):
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(sheet_name[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+
+
+def _sheet_head_xml(header):
+    """Початок аркуша: ширина колонок за довжиною заголовків та закріплений перший рядок."""
+    cols = ''.join(
+        f'<col min="{i + 1}" max="{i + 1}" width="{max(10, len(str(title)) + 4)}" customWidth="1"/>'
+        for i, title in enumerate(header)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<sheetViews><sheetView workbookViewId="0">'
+        '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+        '</sheetView></sheetViews>'
+        f'<cols>{cols}</cols>'
+        '<sheetData>'
+    )
+
+
+def stream_xlsx(header, batches, row_builder, sheet_name='Export'):
+    """
+    Генератор байтових частин .xlsx-файлу.
+
+    header - назви колонок (перший, жирний рядок);
+    batches - ітерабельний об'єкт партій рядків (наприклад, QueryBatches з app.py);
+    row_builder - функція, що перетворює рядок партії на список значень клітинок.
+    """
+    sink = _ChunkSink()
+    letters = [column_letter(i) for i in range(len(header))]
+
+    try:
+        with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr('[Content_Types].xml', _CONTENT_TYPES_XML)
+            zf.writestr('_rels/.rels', _ROOT_RELS_XML)
+            zf.writestr('xl/workbook.xml', _workbook_xml(sheet_name))
+            zf.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS_XML)
+            zf.writestr('xl/styles.xml', _STYLES_XML)
+            yield sink.drain()
+
+            # force_zip64: розмір аркуша наперед невідомий і може перевищити 4 ГБ
+            with zf.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+                sheet.write(_sheet_head_xml(header).encode('utf-8'))
+                sheet.write(_row_xml(1, header, letters, style=1).encode('utf-8'))
+
+                row_number = 1
+                for batch in batches:
+                    rows = []
+                    for row in batch:
+                        row_number += 1
+                        rows.append(_row_xml(row_number, row_builder(row), letters))
+                    sheet.write(''.join(rows).encode('utf-8'))
+
+                    chunk = sink.drain()
+                    if chunk:
+                        yield chunk
+
+                sheet.write(b'</sheetData></worksheet>')
+
+        # Залишок стисненого аркуша та центральний каталог zip-архіву
+        yield sink.drain()
+    finally:
+        # Якщо клієнт перервав завантаження - закриваємо джерело рядків (курсор/з'єднання)
+        close = getattr(batches, 'close', None)
+        if close:
+            close()
+
+
+# ==========================================================
+# Читання .xlsx (перший аркуш)
+# ==========================================================
+
+_MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_DOC_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+_CELL_REF_RE = re.compile(r'^([A-Z]+)')
+
+
+def column_index(ref):
+    """Позначення клітинки Excel -> номер колонки з 0: 'A1' -> 0, 'AB12' -> 27."""
+    letters = _CELL_REF_RE.match(ref).group(1)
+    index = 0
+    for letter in letters:
+        index = index * 26 + (ord(letter) - 64)
+    return index - 1
+
+
+def _first_sheet_path(zf):
+    """Шлях до першого аркуша книги всередині архіву."""
+    try:
+        workbook = ET.fromstring(zf.read('xl/workbook.xml'))
+        sheet = workbook.find(f'{_MAIN_NS}sheets/{_MAIN_NS}sheet')
+        rel_id = sheet.get(f'{_DOC_REL_NS}id')
+        rels = ET.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+        for rel in rels.iter(f'{_PKG_REL_NS}Relationship'):
+            if rel.get('Id') == rel_id:
+                target = rel.get('Target')
+                if target.startswith('/'):
+                    return target.lstrip('/')
+                return posixpath.normpath(posixpath.join('xl', target))
+    except (KeyError, AttributeError, ET.ParseError):
+        pass
+    return 'xl/worksheets/sheet1.xml'
+
+
+def _shared_strings(zf):
+    """Таблиця sharedStrings (Excel зберігає в ній більшість текстових клітинок)."""
+    try:
+        source = zf.open('xl/sharedStrings.xml')
+    except KeyError:
+        return []
+    strings = []
+    with source:
+        for _, elem in ET.iterparse(source):
+            if elem.tag == f'{_MAIN_NS}si':
+                # Текст клітинки - це <t> або кілька форматованих фрагментів <r><t>; <rPh> - фонетика, пропускаємо
+                parts = [elem.findtext(f'{_MAIN_NS}t') or '']
+                parts += [run.findtext(f'{_MAIN_NS}t') or '' for run in elem.findall(f'{_MAIN_NS}r')]
+                strings.append(''.join(parts))
+                elem.clear()
+    return strings
+
+
+def _cell_value(cell, shared):
+    cell_type = cell.get('t', 'n')
+    if cell_type == 'inlineStr':
+        return ''.join(t.text or '' for t in cell.iter(f'{_MAIN_NS}t'))
+    raw = cell.findtext(f'{_MAIN_NS}v')
+    if raw is None:
+        return None
+    if cell_type == 's':
+        return shared[int(raw)]
+    if cell_type == 'b':
+        return raw == '1'
+    if cell_type in ('str', 'e'):
+        return raw
+    try:
+        number = float(raw)
+    except ValueError:
+        return raw
+    return int(number) if number.is_integer() and 'E' not in raw.upper() and '.' not in raw else number
+
+
+def iter_xlsx_rows(fileobj):
+    """
+    Генератор рядків першого аркуша як списків значень (str/int/float/bool/None).
+    Пропущені клітинки заповнюються None, тому індекс у списку відповідає колонці.
+    fileobj має підтримувати seek (файл на диску або завантажений файл Flask).
+    Пошкоджений або не .xlsx файл - ValueError.
+    """
+    try:
+        yield from _iter_sheet_rows(fileobj)
+    except (zipfile.BadZipFile, KeyError, IndexError, ET.ParseError) as e:
+        raise ValueError(f"некоректний файл .xlsx ({e})") from e
+
+
+def _iter_sheet_rows(fileobj):
+    with zipfile.ZipFile(fileobj) as zf:
+        shared = _shared_strings(zf)
+        with zf.open(_first_sheet_path(zf)) as sheet:
+            sheet_data = None
+            for event, elem in ET.iterparse(sheet, events=('start', 'end')):
+                if event == 'start':
+                    if elem.tag == f'{_MAIN_NS}sheetData':
+                        sheet_data = elem
+                    continue
+                if elem.tag != f'{_MAIN_NS}row':
+                    continue
+
+                values = []
+                for cell in elem.findall(f'{_MAIN_NS}c'):
+                    ref = cell.get('r')
+                    index = column_index(ref) if ref else len(values)
+                    values.extend([None] * (index - len(values)))
+                    values.append(_cell_value(cell, shared))
+                yield values
+
+                # Прочитані рядки видаляються з дерева, щоб пам'ять не росла з розміром аркуша
+                if sheet_data is not None:
+                    sheet_data.clear()